@@ -1,4 +1,22 @@
 import heapq
+import time
+from typing import Dict, List, MutableMapping, Optional, Tuple
+
+from heuristics import manhattan, octile
+from terrain import DIRECTIONS, INF, edge_cost
+
+Position = Tuple[int, int]
+
+# past this many cells a search keeps its scores in dicts that grow with
+# the search, instead of two tables the size of the map
+DENSE_SEARCH_LIMIT = 2**18
+
+
+class Scores(dict):
+    # search scores by cell index, INF for cells not reached yet
+
+    def __missing__(self, index: int) -> float:
+        return INF
 
 
 class AStar:
@@ -13,27 +31,14 @@ class AStar:
         return abs(a[0] - b[0]) + abs(a[1] - b[1])
 
     def cost(self, from_tile, to_tile):
-        maneuver_penalty = max(0, to_tile.maneuver_score * -1)
-        elevation_difference: int = to_tile.elevation - from_tile.elevation
-
-        # if elevation_difference > 200:
-        #     return float("inf")
-
-        elevation_penalty = (
-            abs(elevation_difference) * 1.5
-            if elevation_difference > 0
-            else abs(elevation_difference)
-        )
-
-        concealment_penalty: int = (
-            100 - to_tile.concealment_score
-        ) * self.stealth_priority
-        cover_maneuver_penalty: int = 1 + to_tile.cover_score // 100
-        return float(
-            maneuver_penalty
-            + (elevation_penalty * self.unit_weight)
-            + concealment_penalty
-            + cover_maneuver_penalty
+        return edge_cost(
+            from_tile.elevation,
+            to_tile.elevation,
+            to_tile.maneuver_score,
+            to_tile.concealment_score,
+            to_tile.cover_score,
+            self.unit_weight,
+            self.stealth_priority,
         )
 
     def find_path(self):
@@ -49,16 +54,8 @@ class AStar:
             if current == self.goal:
                 return self.reconstruct_path(came_from, current)
 
-            for dx, dy in [
-                (0, 1),
-                (1, 0),
-                (0, -1),
-                (-1, 0),
-                (1, 1),
-                (-1, -1),
-                (1, -1),
-                (-1, 1),
-            ]:
+            from_tile = self.map.get_tile(current)
+            for dx, dy in DIRECTIONS:
                 neighbor = (current[0] + dx, current[1] + dy)
                 if not (
                     0 <= neighbor[0] < self.map.size
@@ -66,7 +63,6 @@ class AStar:
                 ):
                     continue
 
-                from_tile = self.map.get_tile(current)
                 to_tile = self.map.get_tile(neighbor)
                 if to_tile.isWater:
                     continue
@@ -88,3 +84,238 @@ class AStar:
             current = came_from[current]
             path.append(current)
         return path[::-1]
+
+
+class GridAStar:
+    """
+    Drop-in replacement for ``AStar`` that searches the map's flat terrain
+    layers instead of ``Tile`` objects. Nodes are integer indices, neighbors
+    come from the map's ``NeighborGraph`` and edge costs from the terrain's
+    per-profile ``EdgeCosts``, so each edge is priced at most once per
+    terrain state. Expansion order, tie-breaking and the returned path are
+    identical to ``AStar.find_path``.
+    """
+
+    def __init__(
+        self,
+        game_map,
+        start,
+        goal,
+        unit_weight=1.0,
+        stealth_priority=0.0,
+        heuristic="manhattan",
+    ):
+        self.map = game_map
+        self.start = start
+        self.goal = goal
+        self.unit_weight = unit_weight
+        self.stealth_priority = stealth_priority
+        self.heuristic = heuristic
+        # nodes taken off the open list by the last find_path
+        self.expanded = 0
+
+    def heuristic_function(self, goal):
+        size = self.map.terrain.size
+        if self.heuristic == "manhattan":
+            return manhattan(size, goal)
+        if self.heuristic == "octile":
+            return octile(size, goal)
+        if self.heuristic == "alt":
+            landmarks = self.map.landmarks(self.unit_weight, self.stealth_priority)
+            return landmarks.heuristic(goal)
+        raise ValueError(f"Unknown heuristic: {self.heuristic}")
+
+    def find_path(self):
+        layers = self.map.terrain
+        graph = self.map.neighbor_graph()
+        edges = graph.edge_costs(self.unit_weight, self.stealth_priority)
+        costs = edges.costs
+        ready = edges.ready
+        fill = edges.fill
+        indptr = graph.indptr
+        ends = graph.ends
+        indices = graph.indices
+        cost_slots = graph.cost_slots
+
+        start = layers.index(self.start)
+        goal = layers.index(self.goal)
+        estimate = self.heuristic_function(goal)
+
+        if layers.size * layers.size > DENSE_SEARCH_LIMIT:
+            g_score: MutableMapping[int, float] = Scores()
+            f_score: MutableMapping[int, float] = Scores()
+        else:
+            g_score = layers.cell_table("d", INF)
+            # an index sorts like its (x, y) tuple, so heap ties resolve as
+            # in AStar
+            f_score = layers.cell_table("d", INF)
+        came_from = {}
+
+        g_score[start] = 0.0
+        f_score[start] = 0
+        open_set = [(0, start)]
+        heappush = heapq.heappush
+        heappop = heapq.heappop
+        self.expanded = 0
+
+        while open_set:
+            f, current = heappop(open_set)
+            if f > f_score[current]:
+                # superseded entry; expanding it again cannot improve anything
+                continue
+            self.expanded += 1
+
+            if current == goal:
+                return self.reconstruct_path(came_from, current)
+
+            if not ready[current]:
+                fill(current)
+            current_g = g_score[current]
+            for edge in range(indptr[current], ends[current]):
+                step = costs[cost_slots[edge]]
+                if step == INF:
+                    continue
+                neighbor = indices[edge]
+                tentative_g = current_g + step
+                if tentative_g < g_score[neighbor]:
+                    nf = tentative_g + estimate(neighbor)
+                    if nf == INF:
+                        # landmarks prove the goal is unreachable from here
+                        continue
+                    came_from[neighbor] = current
+                    g_score[neighbor] = tentative_g
+                    f_score[neighbor] = nf
+                    heappush(open_set, (nf, neighbor))
+
+        return []
+
+    def reconstruct_path(self, came_from, current):
+        size = self.map.terrain.size
+        path = [divmod(current, size)]
+        while current in came_from:
+            current = came_from[current]
+            path.append(divmod(current, size))
+        return path[::-1]
+
+
+class ResumableAStar(GridAStar):
+    """
+    ``GridAStar`` that can be run in slices. Each ``step`` expands at most
+    ``max_nodes`` nodes or runs for at most ``max_micros`` microseconds, and
+    the open/closed state is kept until the next call. While the search is
+    unfinished ``best_partial_path`` leads to the expanded node that looks
+    closest to the goal.
+
+    If the map's terrain changes between slices the search starts over, as
+    the costs gathered so far no longer hold.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.done = False
+        self.path: List[Position] = []
+        self._reset()
+
+    def _reset(self):
+        layers = self.map.terrain
+        self.version = self.map.terrain_version
+        self._graph = self.map.neighbor_graph()
+        self._edges = self._graph.edge_costs(self.unit_weight, self.stealth_priority)
+        self._start = layers.index(self.start)
+        self._goal = layers.index(self.goal)
+        self._estimate = self.heuristic_function(self._goal)
+        self._g_score = {self._start: 0.0}
+        self._f_score = {self._start: 0}
+        self._came_from: Dict[int, int] = {}
+        self._open = [(0, self._start)]
+        self._best = self._start
+        self._best_h = self._estimate(self._start)
+        self.expanded = 0
+
+    def finish(self, path: List[Position]):
+        self.done = True
+        self.path = path
+        self._open = []
+
+    @property
+    def open_size(self) -> int:
+        return len(self._open)
+
+    def step(
+        self, max_nodes: Optional[int] = None, max_micros: Optional[int] = None
+    ) -> bool:
+        if self.done:
+            return True
+        if self.map.terrain_version != self.version:
+            self._reset()
+
+        deadline = None
+        if max_micros is not None:
+            deadline = time.perf_counter() + max_micros / 1_000_000
+        budget = max_nodes
+
+        costs = self._edges.costs
+        ready = self._edges.ready
+        fill = self._edges.fill
+        indptr = self._graph.indptr
+        ends = self._graph.ends
+        indices = self._graph.indices
+        cost_slots = self._graph.cost_slots
+        estimate = self._estimate
+        g_score = self._g_score
+        f_score = self._f_score
+        came_from = self._came_from
+        open_set = self._open
+        goal = self._goal
+
+        while open_set:
+            if budget is not None:
+                if budget <= 0:
+                    return False
+                budget -= 1
+            if deadline is not None and time.perf_counter() >= deadline:
+                return False
+
+            f, current = heapq.heappop(open_set)
+            if f > f_score[current]:
+                continue
+            self.expanded += 1
+
+            if current == goal:
+                self.finish(self.reconstruct_path(came_from, current))
+                return True
+
+            h = estimate(current)
+            if h < self._best_h:
+                self._best, self._best_h = current, h
+
+            if not ready[current]:
+                fill(current)
+            current_g = g_score[current]
+            for edge in range(indptr[current], ends[current]):
+                step = costs[cost_slots[edge]]
+                if step == INF:
+                    continue
+                neighbor = indices[edge]
+                tentative_g = current_g + step
+                if tentative_g < g_score.get(neighbor, INF):
+                    nf = tentative_g + estimate(neighbor)
+                    if nf == INF:
+                        continue
+                    came_from[neighbor] = current
+                    g_score[neighbor] = tentative_g
+                    f_score[neighbor] = nf
+                    heapq.heappush(open_set, (nf, neighbor))
+
+        self.finish([])
+        return True
+
+    def best_partial_path(self) -> List[Position]:
+        if self.done:
+            return self.path
+        return self.reconstruct_path(self._came_from, self._best)
+
+    def find_path(self):
+        while not self.step():
+            pass
+        return self.path
@@ -0,0 +1,51 @@
+import math
+import resource
+import time
+
+from game_map import GameMap
+
+# the map size the hierarchical planner is meant for, generated chunk by chunk
+# as it is touched
+map_size = 4000
+chunk_size = 64
+chunk_memory = 512 * 2**20
+
+rolling = lambda x, y: (
+    10 * math.sin(0.1 * x) * math.cos(0.05 * y) + math.sin(0.5 * x) + 5
+)
+
+
+def timed(label, funct, *args):
+    start_time = time.perf_counter()
+    result = funct(*args)
+    elapsed = time.perf_counter() - start_time
+    print(f"{label}: {elapsed * 1000:.1f} ms")
+    return result
+
+
+game_map = timed(
+    f"Build {map_size}x{map_size}",
+    lambda: GameMap(
+        map_size,
+        generation_funct=rolling,
+        seed=1,
+        chunk_size=chunk_size,
+        chunk_memory=chunk_memory,
+        hierarchical_range=64,
+    ),
+)
+planner = game_map.hierarchical_planner(1.0)
+
+start, goal = (100, 100), (400, 400)
+# the first query generates the chunks it crosses, prices their edges and
+# builds the cluster borders it touches
+path = timed("Long-range query, cold", game_map.find_path, 1.0, start, goal)
+print(f"  {len(path)} tiles, {planner.last_expanded} abstract nodes expanded")
+game_map.path_cache.clear()
+timed("Same query, warm", game_map.find_path, 1.0, start, goal)
+timed("Abstract search only", planner.find_abstract_path, start, goal)
+timed("Nearby query", game_map.find_path, 1.0, (120, 90), (420, 410))
+
+store = game_map.terrain.store
+print(f"Chunks generated: {store.generated}, in memory: {len(store.chunks)}")
+print(f"Peak memory: {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss // 1024} MB")
@@ -0,0 +1,233 @@
+import os
+import pickle
+import random
+import tempfile
+import weakref
+from array import array
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from terrain import LAYERS, TerrainLayers
+
+Position = Tuple[int, int]
+ChunkKey = Tuple[int, int]
+# fills a chunk's layers given its origin cell and seed
+ChunkGenerator = Callable[[TerrainLayers, Position, int], None]
+
+
+def chunk_seed(seed: int, key: ChunkKey) -> int:
+    # string seeding is hashed, so neighboring chunks get unrelated streams
+    return random.Random(f"{seed}:{key[0]}:{key[1]}").getrandbits(63)
+
+
+def layer_bytes(layers: TerrainLayers) -> int:
+    total = 0
+    for name in LAYERS:
+        layer = getattr(layers, name)
+        total += len(layer) * getattr(layer, "itemsize", 1)
+    return total
+
+
+class ChunkStore:
+    """
+    Square chunks of terrain, each a small ``TerrainLayers``, generated the
+    first time one of their cells is read or written. Generation only
+    depends on ``(seed, chunk)``, so a chunk that was never edited can be
+    dropped and rebuilt at will; edited chunks are written to ``spill_dir``
+    when evicted and read back on the next touch.
+
+    At most ``memory_budget`` bytes of chunk layers are kept in memory, the
+    least recently touched chunks are evicted first.
+    """
+
+    def __init__(
+        self,
+        size: int,
+        chunk_size: int,
+        generate: ChunkGenerator,
+        seed: int = 0,
+        memory_budget: int = 64 * 2**20,
+        spill_dir: Optional[str] = None,
+    ):
+        self.size = size
+        self.chunk_size = chunk_size
+        self.generate = generate
+        self.seed = seed
+
+        chunk_bytes = layer_bytes(TerrainLayers(chunk_size))
+        self.max_chunks = max(1, memory_budget // chunk_bytes)
+
+        self._spill_dir = spill_dir
+        self._tempdir: Optional[tempfile.TemporaryDirectory] = None
+        self.chunks: "OrderedDict[ChunkKey, TerrainLayers]" = OrderedDict()
+        self.dirty: Set[ChunkKey] = set()
+        self.spilled: Set[ChunkKey] = set()
+        self.generated = 0
+        # tables of values derived from the terrain, which give up a chunk's
+        # values when the chunk is evicted
+        self.derived: "weakref.WeakSet[ChunkedTable]" = weakref.WeakSet()
+
+    @property
+    def spill_dir(self) -> str:
+        if self._spill_dir is None:
+            self._tempdir = tempfile.TemporaryDirectory(prefix="omen-chunks-")
+            self._spill_dir = self._tempdir.name
+        return self._spill_dir
+
+    def _spill_path(self, key: ChunkKey) -> str:
+        return os.path.join(self.spill_dir, f"{key[0]}_{key[1]}.chunk")
+
+    def locate(self, index: int, write: bool = False) -> Tuple[TerrainLayers, int]:
+        # chunk holding map cell ``index`` and the cell's index inside it
+        x, y = divmod(index, self.size)
+        chunk_size = self.chunk_size
+        key = (x // chunk_size, y // chunk_size)
+        chunk = self.chunks.get(key)
+        if chunk is None:
+            chunk = self._load(key)
+        else:
+            self.chunks.move_to_end(key)
+        if write:
+            self.dirty.add(key)
+        return chunk, (x % chunk_size) * chunk_size + y % chunk_size
+
+    def _load(self, key: ChunkKey) -> TerrainLayers:
+        chunk = TerrainLayers(self.chunk_size)
+        if key in self.spilled:
+            with open(self._spill_path(key), "rb") as f:
+                layers: Dict[str, array] = pickle.load(f)
+            for name, layer in layers.items():
+                setattr(chunk, name, layer)
+            # the file is dropped once loaded, so the chunk must be re-spilled
+            os.remove(self._spill_path(key))
+            self.spilled.discard(key)
+            self.dirty.add(key)
+        else:
+            origin = (key[0] * self.chunk_size, key[1] * self.chunk_size)
+            self.generate(chunk, origin, chunk_seed(self.seed, key))
+            self.generated += 1
+        self.chunks[key] = chunk
+        while len(self.chunks) > self.max_chunks:
+            self._evict()
+        return chunk
+
+    def _evict(self):
+        key, chunk = self.chunks.popitem(last=False)
+        for table in self.derived:
+            table.tables.pop(key, None)
+        if key not in self.dirty:
+            return
+        with open(self._spill_path(key), "wb") as f:
+            pickle.dump({name: getattr(chunk, name) for name in LAYERS}, f)
+        self.dirty.discard(key)
+        self.spilled.add(key)
+
+
+class ChunkedLayer:
+    # one terrain layer indexed like a flat ``x * size + y`` array
+
+    __slots__ = ("store", "name")
+
+    def __init__(self, store: ChunkStore, name: str):
+        self.store = store
+        self.name = name
+
+    def __len__(self):
+        return self.store.size * self.store.size
+
+    def __getitem__(self, index: int):
+        chunk, local = self.store.locate(index)
+        return getattr(chunk, self.name)[local]
+
+    def __setitem__(self, index: int, value):
+        chunk, local = self.store.locate(index, write=True)
+        getattr(chunk, self.name)[local] = value
+
+
+class ChunkedTable:
+    """
+    Per-cell table with ``width`` values per cell, indexed like a flat
+    ``array`` (``cell * width + k``), for chunked terrain. Storage is kept
+    per chunk and only allocated the first time a value in that chunk is
+    written; everything else reads as ``default``.
+    """
+
+    __slots__ = (
+        "size",
+        "chunk_size",
+        "width",
+        "typecode",
+        "default",
+        "tables",
+        "__weakref__",
+    )
+
+    def __init__(
+        self, size: int, chunk_size: int, typecode: str, default, width: int = 1
+    ):
+        self.size = size
+        self.chunk_size = chunk_size
+        self.width = width
+        self.typecode = typecode
+        self.default = default
+        self.tables: Dict[ChunkKey, array] = {}
+
+    def __len__(self):
+        return self.size * self.size * self.width
+
+    @property
+    def nbytes(self) -> int:
+        return sum(len(table) * table.itemsize for table in self.tables.values())
+
+    def _locate(self, index: int) -> Tuple[ChunkKey, int]:
+        cell, k = divmod(index, self.width)
+        x, y = divmod(cell, self.size)
+        chunk_size = self.chunk_size
+        local = (x % chunk_size) * chunk_size + y % chunk_size
+        return (x // chunk_size, y // chunk_size), local * self.width + k
+
+    def __getitem__(self, index: int):
+        key, local = self._locate(index)
+        table = self.tables.get(key)
+        if table is None:
+            return self.default
+        return table[local]
+
+    def __setitem__(self, index: int, value):
+        key, local = self._locate(index)
+        table = self.tables.get(key)
+        if table is None:
+            length = self.chunk_size * self.chunk_size * self.width
+            table = array(self.typecode, [self.default]) * length
+            self.tables[key] = table
+        table[local] = value
+
+
+class ChunkedTerrain(TerrainLayers):
+    """
+    ``TerrainLayers`` whose layers live in a ``ChunkStore``. Every reader
+    of the flat layers works unchanged; cells cost a chunk lookup each and
+    their chunk is generated on first touch.
+    """
+
+    def __init__(self, store: ChunkStore):
+        self._setup(store.size)
+        self.store = store
+        for name in LAYERS:
+            setattr(self, name, ChunkedLayer(store, name))
+
+    def cell_table(self, typecode: str, default, width: int = 1, derived=False):
+        table = ChunkedTable(self.size, self.store.chunk_size, typecode, default, width)
+        if derived:
+            self.store.derived.add(table)
+        return table
+
+    def snapshot(self) -> TerrainLayers:
+        # flat copy, this generates every chunk
+        copy = TerrainLayers(self.size)
+        for name in ("elevation", "maneuver", "concealment", "cover", "water"):
+            layer = getattr(self, name)
+            flat = getattr(copy, name)
+            for index in range(self.size * self.size):
+                flat[index] = layer[index]
+        return copy
@@ -0,0 +1,329 @@
+from array import array
+from typing import Dict, List, TYPE_CHECKING, Union
+
+from terrain import DIRECTIONS
+
+if TYPE_CHECKING:
+    from terrain import TerrainLayers
+
+WATER = -1
+# BoundedComponents label of components too large to walk
+OPEN = 0
+
+# maps with more tiles than this are labeled on demand by BoundedComponents,
+# labeling every tile up front would flood the whole map
+FULL_LABELING_LIMIT = 2**20
+
+
+class _LandAdjacency:
+    # 8-connected land neighbors, shared by both labelings
+
+    layers: "TerrainLayers"
+
+    def _land_neighbors(self, index: int) -> List[int]:
+        size = self.layers.size
+        water = self.layers.water
+        x, y = divmod(index, size)
+        neighbors = []
+        for dx, dy in DIRECTIONS:
+            nx, ny = x + dx, y + dy
+            if 0 <= nx < size and 0 <= ny < size:
+                neighbor = nx * size + ny
+                if not water[neighbor]:
+                    neighbors.append(neighbor)
+        return neighbors
+
+
+class LandComponents(_LandAdjacency):
+    """
+    Component id per tile for land reachable by 8-connected moves; water
+    tiles are labeled ``WATER``. Every step onto land is allowed, so two
+    land tiles are mutually reachable exactly when they share a label.
+
+    Labels are kept current as tiles turn to or from water: a new land tile
+    merges its neighbors' components (the smaller ones are relabeled), and
+    when a flooded tile may have split its component only the pieces that
+    came loose are relabeled, see ``_split``. ``version`` is bumped
+    whenever any label changes.
+    """
+
+    def __init__(self, layers: "TerrainLayers"):
+        self.layers = layers
+        self.labels = array("i", [WATER]) * (layers.size * layers.size)
+        self.sizes: Dict[int, int] = {}
+        self._next_label = 0
+        self.version = 0
+        for index in range(layers.size * layers.size):
+            if self.labels[index] == WATER and not layers.water[index]:
+                self._flood(index, self._new_label())
+
+    def state(self) -> dict:
+        return {
+            "labels": self.labels,
+            "sizes": self.sizes,
+            "next_label": self._next_label,
+        }
+
+    @classmethod
+    def from_state(cls, layers: "TerrainLayers", state: dict) -> "LandComponents":
+        # labels saved with ``state`` for the same, unedited terrain
+        components = cls.__new__(cls)
+        components.layers = layers
+        components.labels = state["labels"]
+        components.sizes = state["sizes"]
+        components._next_label = state["next_label"]
+        components.version = 0
+        return components
+
+    def _new_label(self) -> int:
+        label = self._next_label
+        self._next_label += 1
+        return label
+
+    def _relabel(self, index: int, label: int):
+        old = self.labels[index]
+        if old != WATER:
+            self.sizes[old] -= 1
+            if not self.sizes[old]:
+                del self.sizes[old]
+        self.labels[index] = label
+        self.sizes[label] = self.sizes.get(label, 0) + 1
+
+    def _flood(self, index: int, label: int):
+        # give ``label`` to all land connected to ``index``
+        labels = self.labels
+        self._relabel(index, label)
+        stack = [index]
+        while stack:
+            current = stack.pop()
+            for neighbor in self._land_neighbors(current):
+                if labels[neighbor] != label:
+                    self._relabel(neighbor, label)
+                    stack.append(neighbor)
+
+    def label(self, index: int) -> int:
+        return self.labels[index]
+
+    def reachable(self, start: int, goal: int) -> bool:
+        if start == goal:
+            return True
+        target = self.labels[goal]
+        if target == WATER:
+            return False
+        if self.labels[start] != WATER:
+            return self.labels[start] == target
+        # units may stand on water, they just cannot step back onto it
+        return any(self.labels[n] == target for n in self._land_neighbors(start))
+
+    def start_labels(self, index: int) -> List[int]:
+        # components a unit standing on ``index`` can end up in
+        if self.labels[index] != WATER:
+            return [self.labels[index]]
+        return list({self.labels[n] for n in self._land_neighbors(index)})
+
+    def _split(self, old: int, starts: List[int]):
+        # ``starts`` were connected through a tile of component ``old`` that
+        # just flooded. A search runs from each group of them in turn, one
+        # tile at a time; searches that meet are merged, and a search that
+        # runs out of tiles before meeting the rest holds a piece that came
+        # loose, which gets a new label. Once a single search is left, what
+        # it has not reached keeps ``old``, so the largest piece is never
+        # walked in full.
+        labels = self.labels
+        owner: Dict[int, int] = {}
+        parent: List[int] = []
+        queues: List[List[int]] = []
+        members: List[List[int]] = []
+        for start in starts:
+            if start in owner:
+                continue
+            search = len(parent)
+            parent.append(search)
+            owner[start] = search
+            queues.append([start])
+            members.append([start])
+
+        def root(search: int) -> int:
+            while parent[search] != search:
+                search = parent[search]
+            return search
+
+        running = set(range(len(parent)))
+        while len(running) > 1:
+            for search in list(running):
+                if search not in running:
+                    continue
+                queue = queues[search]
+                if not queue:
+                    label = self._new_label()
+                    for index in members[search]:
+                        self._relabel(index, label)
+                    running.discard(search)
+                    continue
+                current = queue.pop()
+                for neighbor in self._land_neighbors(current):
+                    if labels[neighbor] != old:
+                        continue
+                    other = owner.get(neighbor)
+                    if other is None:
+                        owner[neighbor] = search
+                        members[search].append(neighbor)
+                        queue.append(neighbor)
+                        continue
+                    other = root(other)
+                    if other != search:
+                        parent[other] = search
+                        queue.extend(queues[other])
+                        members[search].extend(members[other])
+                        queues[other] = []
+                        members[other] = []
+                        running.discard(other)
+
+    def tile_changed(self, index: int):
+        labels = self.labels
+        if self.layers.water[index]:
+            old = labels[index]
+            if old == WATER:
+                return
+            labels[index] = WATER
+            self.sizes[old] -= 1
+            if not self.sizes[old]:
+                del self.sizes[old]
+            self.version += 1
+            neighbors = self._land_neighbors(index)
+            # neighbors that touch each other stay connected without the
+            # flooded tile, only separate groups of them may have split
+            size = self.layers.size
+            groups: List[List[int]] = []
+            for neighbor in neighbors:
+                nx, ny = divmod(neighbor, size)
+                touching = [
+                    group
+                    for group in groups
+                    if any(
+                        max(abs(nx - gx), abs(ny - gy)) == 1
+                        for gx, gy in (divmod(other, size) for other in group)
+                    )
+                ]
+                joined = [neighbor]
+                for group in touching:
+                    groups.remove(group)
+                    joined.extend(group)
+                groups.append(joined)
+            if len(groups) > 1:
+                self._split(old, [group[0] for group in groups])
+            return
+
+        if labels[index] != WATER:
+            return
+        self.version += 1
+        merged = {labels[n] for n in self._land_neighbors(index)}
+        if not merged:
+            self._relabel(index, self._new_label())
+            return
+        # keep the largest label so the fewest tiles have to be relabeled
+        largest = max(merged, key=lambda label: self.sizes[label])
+        self._relabel(index, largest)
+        for neighbor in self._land_neighbors(index):
+            if labels[neighbor] != largest:
+                self._flood(neighbor, largest)
+
+
+class BoundedComponents(_LandAdjacency):
+    """
+    Stand-in for ``LandComponents`` on lazily generated maps, where
+    labeling every tile would generate every chunk. A tile's component is
+    found by flooding from it the first time it is asked about, stopping
+    after ``max_tiles`` tiles. Components that fit are labeled in full,
+    so a goal on an island is rejected after walking the island only.
+    Larger ones, and anything that reaches a tile already found to be in
+    one, are labeled ``OPEN``. Two ``OPEN`` tiles are taken to be
+    connected and are left to the planner.
+
+    A water edit that may split or grow a component labeled in full forgets
+    every label. ``version`` is bumped whenever a label that was handed
+    out changes.
+    """
+
+    def __init__(self, layers: "TerrainLayers", max_tiles: int = 2**16):
+        self.layers = layers
+        self.max_tiles = max_tiles
+        self.labels: Dict[int, int] = {}
+        self._next_label = OPEN + 1
+        self.version = 0
+
+    def _flood(self, index: int) -> int:
+        labels = self.labels
+        seen = {index}
+        stack = [index]
+        label = None
+        while stack:
+            current = stack.pop()
+            for neighbor in self._land_neighbors(current):
+                if neighbor in seen:
+                    continue
+                if labels.get(neighbor) == OPEN or len(seen) >= self.max_tiles:
+                    label = OPEN
+                    break
+                seen.add(neighbor)
+                stack.append(neighbor)
+            if label is not None:
+                break
+        if label is None:
+            label = self._next_label
+            self._next_label += 1
+        for tile in seen:
+            labels[tile] = label
+        return label
+
+    def label(self, index: int) -> int:
+        label = self.labels.get(index)
+        if label is None:
+            if self.layers.water[index]:
+                label = self.labels[index] = WATER
+            else:
+                label = self._flood(index)
+        return label
+
+    def reachable(self, start: int, goal: int) -> bool:
+        if start == goal:
+            return True
+        target = self.label(goal)
+        if target == WATER:
+            return False
+        return target in self.start_labels(start)
+
+    def start_labels(self, index: int) -> List[int]:
+        if not self.layers.water[index]:
+            return [self.label(index)]
+        return list({self.label(n) for n in self._land_neighbors(index)})
+
+    def tile_changed(self, index: int):
+        # an ``OPEN`` label is never wrong enough to reject a goal, only
+        # components labeled in full can split or grow stale
+        labels = self.labels
+        label = labels.get(index)
+        water = self.layers.water[index]
+        if label == WATER:
+            if water:
+                return
+            del labels[index]
+            self.version += 1
+        elif label is not None:
+            if not water:
+                return
+            self.version += 1
+            if label == OPEN:
+                labels[index] = WATER
+                return
+            labels.clear()
+            return
+        if not water and any(
+            labels.get(n, OPEN) != OPEN for n in self._land_neighbors(index)
+        ):
+            labels.clear()
+            self.version += 1
+
+
+# what GameMap.components holds, depending on whether the map is chunked
+Components = Union[LandComponents, BoundedComponents]
@@ -0,0 +1,270 @@
+import heapq
+from collections import OrderedDict
+from typing import Hashable, Iterable, List, Optional, Tuple, TYPE_CHECKING
+
+from terrain import DIRECTIONS, INF, table_bytes
+
+if TYPE_CHECKING:
+    from terrain import TerrainLayers
+
+Position = Tuple[int, int]
+
+
+class DistanceField:
+    """
+    Dijkstra search from one or more source tiles using the same edge costs
+    as ``AStar.cost``. Every settled tile keeps its cost and predecessor, so
+    the cheapest path from the nearest source to any target can be read off
+    without another search.
+
+    The search is lazy: tiles are only settled as far as needed to answer a
+    query, and later queries resume from where the previous one stopped.
+    """
+
+    def __init__(
+        self,
+        layers: "TerrainLayers",
+        sources: Iterable[Position],
+        unit_weight: float = 1.0,
+        stealth_priority: float = 0.0,
+    ):
+        self.layers = layers
+        self.unit_weight = unit_weight
+        self.stealth_priority = stealth_priority
+        self.edges = layers.edge_costs(unit_weight, stealth_priority)
+
+        self.cost = layers.cell_table("d", INF)
+        self.came_from = layers.cell_table("i", -1)
+        self.settled = layers.cell_table("B", 0)
+
+        self.sources: List[int] = []
+        self._open: List[Tuple[float, int]] = []
+        for position in sources:
+            index = layers.index(position)
+            if self.cost[index] == 0.0:
+                continue
+            self.sources.append(index)
+            self.cost[index] = 0.0
+            self._open.append((0.0, index))
+        heapq.heapify(self._open)
+
+    @property
+    def complete(self) -> bool:
+        return not self._open
+
+    @property
+    def nbytes(self) -> int:
+        return sum(map(table_bytes, (self.cost, self.came_from, self.settled)))
+
+    def expand(self, until: Optional[int] = None):
+        """
+        Settle tiles in cost order until index ``until`` is settled, or until
+        every reachable tile is settled when ``until`` is None.
+        """
+        settled = self.settled
+        if until is not None and settled[until]:
+            return
+
+        costs = self.edges.costs
+        ready = self.edges.ready
+        fill = self.edges.fill
+        offsets = self.layers.offsets
+        cost = self.cost
+        came_from = self.came_from
+        open_set = self._open
+        heappush = heapq.heappush
+        heappop = heapq.heappop
+
+        while open_set:
+            current_cost, current = heappop(open_set)
+            if settled[current]:
+                continue
+            settled[current] = 1
+
+            if not ready[current]:
+                fill(current)
+            base = current * 8
+            for d in range(8):
+                step = costs[base + d]
+                if step == INF:
+                    continue
+                neighbor = current + offsets[d]
+                tentative = current_cost + step
+                if tentative < cost[neighbor]:
+                    cost[neighbor] = tentative
+                    came_from[neighbor] = current
+                    heappush(open_set, (tentative, neighbor))
+
+            if current == until:
+                return
+
+    def distance(self, position: Position) -> float:
+        index = self.layers.index(position)
+        self.expand(index)
+        return self.cost[index]
+
+    def path_to(self, position: Position) -> List[Position]:
+        index = self.layers.index(position)
+        self.expand(index)
+        if self.cost[index] == INF:
+            return []
+
+        size = self.layers.size
+        came_from = self.came_from
+        path = [divmod(index, size)]
+        while came_from[index] != -1:
+            index = came_from[index]
+            path.append(divmod(index, size))
+        return path[::-1]
+
+
+class FlowField:
+    """
+    Reverse Dijkstra search from a goal tile. Every settled tile stores its
+    cost to the goal and the next tile to step onto, so any number of units
+    heading for the same goal can follow the field without searching.
+
+    Like ``DistanceField`` the search only settles tiles as far as needed
+    and resumes on later queries.
+    """
+
+    def __init__(
+        self,
+        layers: "TerrainLayers",
+        goal: Position,
+        unit_weight: float = 1.0,
+        stealth_priority: float = 0.0,
+    ):
+        self.layers = layers
+        self.goal = goal
+        self.unit_weight = unit_weight
+        self.stealth_priority = stealth_priority
+        self.edges = layers.edge_costs(unit_weight, stealth_priority)
+
+        self.cost = layers.cell_table("d", INF)
+        self.next_index = layers.cell_table("i", -1)
+        self.settled = layers.cell_table("B", 0)
+
+        index = layers.index(goal)
+        self.cost[index] = 0.0
+        self._open: List[Tuple[float, int]] = [(0.0, index)]
+
+    @property
+    def complete(self) -> bool:
+        return not self._open
+
+    @property
+    def nbytes(self) -> int:
+        return sum(map(table_bytes, (self.cost, self.next_index, self.settled)))
+
+    def expand(self, until: Optional[int] = None):
+        settled = self.settled
+        if until is not None and settled[until]:
+            return
+
+        size = self.layers.size
+        water = self.layers.water
+        costs = self.edges.costs
+        ready = self.edges.ready
+        fill = self.edges.fill
+        offsets = self.layers.offsets
+        cost = self.cost
+        next_index = self.next_index
+        open_set = self._open
+        heappush = heapq.heappush
+        heappop = heapq.heappop
+
+        while open_set:
+            current_cost, current = heappop(open_set)
+            if settled[current]:
+                continue
+            settled[current] = 1
+
+            if not water[current]:
+                x, y = divmod(current, size)
+                for d, (dx, dy) in enumerate(DIRECTIONS):
+                    # tiles that reach ``current`` by stepping DIRECTIONS[d]
+                    px, py = x - dx, y - dy
+                    if not (0 <= px < size and 0 <= py < size):
+                        continue
+                    previous = current - offsets[d]
+                    if not ready[previous]:
+                        fill(previous)
+                    tentative = current_cost + costs[previous * 8 + d]
+                    if tentative < cost[previous]:
+                        cost[previous] = tentative
+                        next_index[previous] = current
+                        heappush(open_set, (tentative, previous))
+
+            if current == until:
+                return
+
+    def distance(self, position: Position) -> float:
+        index = self.layers.index(position)
+        self.expand(index)
+        return self.cost[index]
+
+    def next_step(self, position: Position) -> Optional[Position]:
+        index = self.layers.index(position)
+        self.expand(index)
+        step = self.next_index[index]
+        if step == -1:
+            return None
+        return divmod(step, self.layers.size)
+
+    def path_from(self, position: Position) -> List[Position]:
+        index = self.layers.index(position)
+        self.expand(index)
+        if self.cost[index] == INF:
+            return []
+
+        size = self.layers.size
+        next_index = self.next_index
+        path = [divmod(index, size)]
+        while next_index[index] != -1:
+            index = next_index[index]
+            path.append(divmod(index, size))
+        return path
+
+
+class DistanceFieldCache:
+    # small LRU of fields, each stamped with the terrain version it was built
+    # on; with max_bytes set, the oldest fields are also dropped while the
+    # fields kept hold more than that (measured as entries are added, a
+    # lazy field on chunked terrain grows as it is expanded)
+
+    def __init__(self, max_entries: int = 64, max_bytes: Optional[int] = None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Hashable, Tuple[int, DistanceField]]" = (
+            OrderedDict()
+        )
+
+    def get(self, key: Hashable, version: int) -> Optional[DistanceField]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] != version:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    def put(self, key: Hashable, version: int, field: DistanceField):
+        if self.max_entries <= 0:
+            return
+        self._entries[key] = (version, field)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        if self.max_bytes is None:
+            return
+        while len(self._entries) > 1 and self.nbytes > self.max_bytes:
+            self._entries.popitem(last=False)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(field.nbytes for _, field in self._entries.values())
+
+    def clear(self):
+        self._entries.clear()
@@ -0,0 +1,117 @@
+from array import array
+from typing import List, Tuple, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from terrain import TerrainLayers
+
+Position = Tuple[int, int]
+
+# right, left, down, up; the rays RegionControl.is_coord_bound casts
+RAY_DIRECTIONS = ((1, 0), (-1, 0), (0, 1), (0, -1))
+
+
+class EnclosureRaster:
+    """
+    Which cells have a marked cell within ``reach`` steps in each of the
+    four ``RAY_DIRECTIONS``. ``counts[d][i]`` is the number of marked cells
+    within reach of cell ``i`` along direction ``d`` and ``open_sides[i]``
+    the number of directions with none, so a cell is enclosed when it has
+    no open side.
+
+    Marking or unmarking a cell only touches the ``4 * reach`` cells whose
+    rays can reach it. The tables cover a window around the marked cells
+    rather than the whole map, and the window grows as cells are marked
+    outside it; cells beyond it have no marked cell in reach at all.
+    """
+
+    def __init__(self, layers: "TerrainLayers", reach: int):
+        self.size = layers.size
+        self.reach = reach
+        # window corner and extent, see _cover
+        self.x0 = self.y0 = 0
+        self.width = self.height = 0
+        self.counts: List[array] = [array("H") for _ in RAY_DIRECTIONS]
+        self.open_sides = array("B")
+
+    def _cover(self, position: Position):
+        # grows the window to hold every cell within reach of ``position``
+        px, py = position
+        reach = self.reach
+        size = self.size
+        x0 = max(px - reach, 0)
+        y0 = max(py - reach, 0)
+        x1 = min(px + reach + 1, size)
+        y1 = min(py + reach + 1, size)
+        old_x0, old_y0 = self.x0, self.y0
+        old_x1, old_y1 = old_x0 + self.width, old_y0 + self.height
+        if self.width and self.height:
+            if old_x0 <= x0 and x1 <= old_x1 and old_y0 <= y0 and y1 <= old_y1:
+                return
+            # grow by half again on each side that has to move, so a region
+            # spreading tile by tile copies its tables only a few times
+            if x0 < old_x0:
+                x0 = max(min(x0, old_x0 - self.width // 2), 0)
+            else:
+                x0 = old_x0
+            if x1 > old_x1:
+                x1 = min(max(x1, old_x1 + self.width // 2), size)
+            else:
+                x1 = old_x1
+            if y0 < old_y0:
+                y0 = max(min(y0, old_y0 - self.height // 2), 0)
+            else:
+                y0 = old_y0
+            if y1 > old_y1:
+                y1 = min(max(y1, old_y1 + self.height // 2), size)
+            else:
+                y1 = old_y1
+
+        width, height = x1 - x0, y1 - y0
+        counts = [array("H", [0]) * (width * height) for _ in RAY_DIRECTIONS]
+        open_sides = array("B", [len(RAY_DIRECTIONS)]) * (width * height)
+        for x in range(old_x0, old_x1):
+            start = (x - x0) * height + old_y0 - y0
+            old = (x - old_x0) * self.height
+            for new, kept in zip(counts, self.counts):
+                new[start : start + self.height] = kept[old : old + self.height]
+            open_sides[start : start + self.height] = self.open_sides[
+                old : old + self.height
+            ]
+        self.x0, self.y0 = x0, y0
+        self.width, self.height = width, height
+        self.counts = counts
+        self.open_sides = open_sides
+
+    def _update(self, position: Position, change: int):
+        size = self.size
+        open_sides = self.open_sides
+        x0, y0, height = self.x0, self.y0, self.height
+        px, py = position
+        for counts, (dx, dy) in zip(self.counts, RAY_DIRECTIONS):
+            # the cells whose ray along (dx, dy) passes through ``position``
+            for step in range(1, self.reach + 1):
+                x, y = px - dx * step, py - dy * step
+                if not (0 <= x < size and 0 <= y < size):
+                    break
+                i = (x - x0) * height + y - y0
+                counts[i] += change
+                if change > 0 and counts[i] == 1:
+                    open_sides[i] -= 1
+                elif change < 0 and counts[i] == 0:
+                    open_sides[i] += 1
+
+    def mark(self, position: Position):
+        self._cover(position)
+        self._update(position, 1)
+
+    def unmark(self, position: Position):
+        # only marked cells are unmarked, the window already holds them
+        self._update(position, -1)
+
+    def enclosed(self, position: Position) -> bool:
+        x, y = position
+        x -= self.x0
+        y -= self.y0
+        if not (0 <= x < self.width and 0 <= y < self.height):
+            return False
+        return not self.open_sides[x * self.height + y]
@@ -0,0 +1,473 @@
+import math
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import (
+    Dict,
+    FrozenSet,
+    Generic,
+    Hashable,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    TypeVar,
+    TYPE_CHECKING,
+)
+
+try:
+    import numpy as np
+
+    HAVE_NUMPY = True
+except ImportError:  # observers are evaluated one ray at a time
+    HAVE_NUMPY = False
+
+if TYPE_CHECKING:
+    from terrain import TerrainLayers
+
+Position = Tuple[int, int]
+# (position, direction in degrees, vision cone in degrees, vision range)
+Observer = Tuple[Position, int, int, int]
+
+# angle between two rays of a vision cone
+RAY_SPACING = 10
+
+# recursive shadowcasting sees every tile in range, sampled rays can miss
+# tiles between two rays far from the observer
+VISION_MODELS = ("rays", "shadowcast")
+
+# what one observer sees, as sorted cell indices and as tile positions
+Seen = Tuple[Tuple[int, ...], FrozenSet[Position]]
+# what an observer that sees nothing sees
+UNSEEN: Seen = ((), frozenset())
+
+
+class RayTemplate:
+    """
+    Rays of one (direction, cone, range), as cell offsets from the observer:
+    ``steps[ray][r - 1]`` is the cell ``r`` tiles out along ``ray``. The
+    offsets are rounded exactly like a ray cast from scratch, so a template
+    can stand in for the trigonometry of every observer that shares it.
+    """
+
+    def __init__(self, size: int, direction: int, cone: int, vision_range: int):
+        self.direction = direction
+        self.cone = cone
+        self.range = vision_range
+        self.steps: List[List[Position]] = []
+        half_cone = cone // 2
+        for angle in range(
+            direction - half_cone, direction + half_cone + 1, RAY_SPACING
+        ):
+            radians = math.radians(angle)
+            dx, dy = math.cos(radians), math.sin(radians)
+            self.steps.append(
+                [(round(dx * r), round(dy * r)) for r in range(1, vision_range + 1)]
+            )
+        # the same steps as flat index offsets, for observers far enough from
+        # the edge that no ray can leave the map
+        self.offsets = [[ox * size + oy for ox, oy in ray] for ray in self.steps]
+        self._arrays = None
+
+    def arrays(self):
+        # (rays, range) numpy arrays of the x and y offsets
+        if self._arrays is None:
+            self._arrays = (
+                np.array([[ox for ox, _ in ray] for ray in self.steps], dtype=np.intp),
+                np.array([[oy for _, oy in ray] for ray in self.steps], dtype=np.intp),
+            )
+        return self._arrays
+
+
+Template = TypeVar("Template")
+
+
+class TemplateCache(ABC, Generic[Template]):
+    """
+    Template cache of one map size. Units face one of eight compass
+    directions and share a handful of cones and ranges, so a small cache
+    covers every observer.
+    """
+
+    def __init__(self, size: int, max_entries: int = 64):
+        self.size = size
+        self.max_entries = max_entries
+        self._templates: "OrderedDict[Tuple[int, int, int], Template]" = (
+            OrderedDict()
+        )
+
+    def get(self, direction: int, cone: int, vision_range: int) -> Template:
+        key = (direction % 360, cone, vision_range)
+        template = self._templates.get(key)
+        if template is None:
+            template = self._build(*key)
+            self._templates[key] = template
+            if len(self._templates) > self.max_entries:
+                self._templates.popitem(last=False)
+        else:
+            self._templates.move_to_end(key)
+        return template
+
+    @abstractmethod
+    def _build(self, direction: int, cone: int, vision_range: int) -> Template:
+        # the template get caches for (direction, cone, vision_range)
+        ...
+
+
+class RayTemplates(TemplateCache[RayTemplate]):
+    # RayTemplate per (direction, cone, range)
+
+    def _build(self, direction: int, cone: int, vision_range: int) -> RayTemplate:
+        return RayTemplate(self.size, direction, cone, vision_range)
+
+
+def _layer_array(layer):
+    try:
+        return np.frombuffer(layer, dtype=np.intc)
+    except TypeError:
+        # chunked layers have no buffer of their own
+        return None
+
+
+def cast_rays(
+    layers: "TerrainLayers",
+    template: RayTemplate,
+    position: Position,
+    max_occlusion: int,
+    elevation_threshold: int,
+) -> List[int]:
+    """
+    Sorted indices of the cells visible from ``position`` along
+    ``template``'s rays. A ray stops at the map edge, at the first cell
+    more than ``elevation_threshold`` above the observer, or once the
+    concealment and cover it has passed through add up to ``max_occlusion``.
+    """
+    size = layers.size
+    elevation = layers.elevation
+    concealment = layers.concealment
+    cover = layers.cover
+    px, py = position
+    origin = px * size + py
+    start_elev = elevation[origin]
+    visible = set()
+
+    reach = template.range
+    if reach <= px < size - reach and reach <= py < size - reach:
+        for ray in template.offsets:
+            occlusion = 0
+            for offset in ray:
+                i = origin + offset
+                if elevation[i] - start_elev > elevation_threshold:
+                    break
+                occlusion += concealment[i] + cover[i]
+                if occlusion >= max_occlusion:
+                    break
+                visible.add(i)
+        return sorted(visible)
+
+    for steps in template.steps:
+        occlusion = 0
+        for ox, oy in steps:
+            tx = px + ox
+            ty = py + oy
+            if tx < 0 or tx >= size or ty < 0 or ty >= size:
+                break
+            i = tx * size + ty
+            if elevation[i] - start_elev > elevation_threshold:
+                break
+            occlusion += concealment[i] + cover[i]
+            if occlusion >= max_occlusion:
+                break
+            visible.add(i)
+    return sorted(visible)
+
+
+def _cast_rays_arrays(
+    layers: "TerrainLayers",
+    template: RayTemplate,
+    positions: Sequence[Position],
+    max_occlusion: int,
+    elevation_threshold: int,
+    elevation,
+    concealment,
+    cover,
+) -> List[List[int]]:
+    # every observer sharing ``template`` at once, as (observer, ray, step)
+    # arrays; a cell is visible when nothing stopped its ray before or at it
+    size = layers.size
+    offsets_x, offsets_y = template.arrays()
+    origins = np.array(positions, dtype=np.intp).reshape(-1, 2)
+    xs = origins[:, 0, None, None] + offsets_x
+    ys = origins[:, 1, None, None] + offsets_y
+    inside = (xs >= 0) & (xs < size) & (ys >= 0) & (ys < size)
+    cells = np.where(inside, xs * size + ys, 0)
+
+    start_elev = elevation[origins[:, 0] * size + origins[:, 1]]
+    stopped = ~inside | (
+        elevation[cells] - start_elev[:, None, None] > elevation_threshold
+    )
+    occlusion = np.cumsum(concealment[cells] + cover[cells], axis=2)
+    stopped |= occlusion >= max_occlusion
+    visible = ~np.logical_or.accumulate(stopped, axis=2)
+
+    # rays overlap near the observer; one sort drops the repeats of every
+    # observer, keyed by observer first so each one's cells stay together
+    observer = np.nonzero(visible)[0]
+    keys = np.unique(observer * (size * size) + cells[visible])
+    owners, found = np.divmod(keys, size * size)
+    bounds = np.searchsorted(owners, np.arange(len(positions) + 1))
+    found = found.tolist()
+    return [found[bounds[i] : bounds[i + 1]] for i in range(len(positions))]
+
+
+def visible_cells(
+    layers: "TerrainLayers",
+    templates: RayTemplates,
+    observers: Sequence[Observer],
+    max_occlusion: int = 100,
+    elevation_threshold: int = 5,
+) -> List[List[int]]:
+    """
+    Visible cell indices of every observer, in observer order. Observers
+    sharing a ray template are evaluated together as numpy arrays when
+    numpy is available and the layers are flat; otherwise each observer
+    walks its template's rays.
+    """
+    results: List[List[int]] = [[] for _ in observers]
+    groups: "OrderedDict[RayTemplate, List[int]]" = OrderedDict()
+    for i, (position, direction, cone, vision_range) in enumerate(observers):
+        template = templates.get(direction, cone, vision_range)
+        groups.setdefault(template, []).append(i)
+
+    arrays = None
+    if HAVE_NUMPY:
+        arrays = [
+            _layer_array(layers.elevation),
+            _layer_array(layers.concealment),
+            _layer_array(layers.cover),
+        ]
+        if any(layer is None for layer in arrays):
+            arrays = None
+
+    for template, members in groups.items():
+        positions = [observers[i][0] for i in members]
+        if arrays is not None and template.steps and template.range:
+            found = _cast_rays_arrays(
+                layers,
+                template,
+                positions,
+                max_occlusion,
+                elevation_threshold,
+                *arrays,
+            )
+        else:
+            found = [
+                cast_rays(
+                    layers, template, position, max_occlusion, elevation_threshold
+                )
+                for position in positions
+            ]
+        for i, cells in zip(members, found):
+            results[i] = cells
+    return results
+
+
+# (xx, xy, yx, yy) transforms taking the first octant onto each of the eight
+OCTANTS = (
+    (1, 0, 0, 1),
+    (0, 1, 1, 0),
+    (0, -1, 1, 0),
+    (-1, 0, 0, 1),
+    (-1, 0, 0, -1),
+    (0, -1, -1, 0),
+    (0, 1, -1, 0),
+    (1, 0, 0, -1),
+)
+
+
+class ViewshedTemplate:
+    """
+    Cells a viewshed of one (direction, cone, range) may include, as
+    offsets from the observer. A cell is in view when its center lies
+    within ``range + 0.5`` and any part of it lies within the cone.
+
+    Occlusion is summed along each cell's line back to the observer:
+    ``parents[offset]`` is the cell one step closer on that line, and
+    ``order`` lists every cell whose sum is needed, nearest first.
+    """
+
+    def __init__(self, direction: int, cone: int, vision_range: int):
+        self.direction = direction
+        self.cone = cone
+        self.range = vision_range
+        limit = (vision_range + 0.5) ** 2
+        half_cone = cone / 2
+
+        self.in_view = set()
+        for ox in range(-vision_range, vision_range + 1):
+            for oy in range(-vision_range, vision_range + 1):
+                distance_sq = ox * ox + oy * oy
+                if not distance_sq or distance_sq > limit:
+                    continue
+                if cone < 360:
+                    angle = math.degrees(math.atan2(oy, ox))
+                    off_axis = abs((angle - direction + 180) % 360 - 180)
+                    width = math.degrees(math.atan2(0.5, math.sqrt(distance_sq)))
+                    if off_axis > half_cone + width:
+                        continue
+                self.in_view.add((ox, oy))
+
+        self.parents: Dict[Position, Position] = {}
+        for ox, oy in self.in_view:
+            while (ox, oy) != (0, 0) and (ox, oy) not in self.parents:
+                steps = max(abs(ox), abs(oy))
+                parent = (
+                    round(ox * (steps - 1) / steps),
+                    round(oy * (steps - 1) / steps),
+                )
+                self.parents[(ox, oy)] = parent
+                ox, oy = parent
+        self.order = sorted(self.parents, key=lambda o: max(abs(o[0]), abs(o[1])))
+
+
+class ViewshedTemplates(TemplateCache[ViewshedTemplate]):
+    # ViewshedTemplate per (direction, cone, range)
+
+    def _build(self, direction: int, cone: int, vision_range: int) -> ViewshedTemplate:
+        return ViewshedTemplate(direction, cone, vision_range)
+
+
+def shadowcast(
+    layers: "TerrainLayers",
+    template: ViewshedTemplate,
+    position: Position,
+    max_occlusion: int,
+    elevation_threshold: int,
+) -> List[int]:
+    """
+    Sorted indices of the cells visible from ``position``, by recursive
+    shadowcasting over the eight octants. Cells more than
+    ``elevation_threshold`` above the observer block sight and are not
+    visible themselves, as with rays. A cell is also hidden once the
+    concealment and cover summed along its line to the observer reach
+    ``max_occlusion``. Unlike sampled rays, no cell in range is skipped.
+    """
+    size = layers.size
+    elevation = layers.elevation
+    concealment = layers.concealment
+    cover = layers.cover
+    px, py = position
+    start_elev = elevation[px * size + py]
+    in_view = template.in_view
+    vision_range = template.range
+
+    occlusion = {(0, 0): 0}
+    for offset in template.order:
+        tx, ty = px + offset[0], py + offset[1]
+        if 0 <= tx < size and 0 <= ty < size:
+            i = tx * size + ty
+            occlusion[offset] = (
+                occlusion[template.parents[offset]] + concealment[i] + cover[i]
+            )
+        else:
+            occlusion[offset] = max_occlusion
+
+    visible = set()
+
+    def opaque(tx: int, ty: int) -> bool:
+        if 0 <= tx < size and 0 <= ty < size:
+            return elevation[tx * size + ty] - start_elev > elevation_threshold
+        return True
+
+    def scan(row: int, start: float, end: float, xx: int, xy: int, yx: int, yy: int):
+        # one octant from ``row`` outward, between slopes ``start`` and ``end``
+        if start < end:
+            return
+        new_start = start
+        for j in range(row, vision_range + 1):
+            blocked = False
+            dy = -j
+            for dx in range(-j, 1):
+                left = (dx - 0.5) / (dy + 0.5)
+                right = (dx + 0.5) / (dy - 0.5)
+                if start < right:
+                    continue
+                if end > left:
+                    break
+                offset = (dx * xx + dy * xy, dx * yx + dy * yy)
+                tx, ty = px + offset[0], py + offset[1]
+                wall = opaque(tx, ty)
+                if (
+                    not wall
+                    and offset in in_view
+                    and occlusion[offset] < max_occlusion
+                ):
+                    visible.add(tx * size + ty)
+                if blocked:
+                    if wall:
+                        new_start = right
+                    else:
+                        blocked = False
+                        start = new_start
+                elif wall and j < vision_range:
+                    blocked = True
+                    scan(j + 1, start, left, xx, xy, yx, yy)
+                    new_start = right
+            if blocked:
+                break
+
+    if vision_range > 0:
+        for transform in OCTANTS:
+            scan(1, 1.0, 0.0, *transform)
+    return sorted(visible)
+
+
+class VisibilityCache:
+    """
+    Bounded LRU of what observers see, as sorted cell indices and as tile
+    positions. Entries are stamped with the terrain version they were
+    computed on and treated as misses once it moves on, so observers that
+    hold still are answered without casting again until the terrain changes.
+    """
+
+    def __init__(self, max_entries: int = 4096):
+        self.max_entries = max_entries
+        # key -> (version, cells, positions)
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key: Hashable, version: int) -> Optional[Seen]:
+        entry = self._entries.get(key)
+        if entry is None or entry[0] != version:
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1], entry[2]
+
+    def put(self, key: Hashable, version: int, cells: Sequence[int], size: int) -> Seen:
+        seen = tuple(cells), frozenset(divmod(i, size) for i in cells)
+        if self.max_entries > 0:
+            self._entries[key] = (version, *seen)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return seen
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+        }
@@ -1,14 +1,57 @@
 from tile import Tile
-from a_star import AStar
-import json
+from a_star import GridAStar, ResumableAStar
+from chunks import ChunkedTerrain, ChunkStore
+from connectivity import (
+    FULL_LABELING_LIMIT,
+    BoundedComponents,
+    Components,
+    LandComponents,
+)
+from field_of_view import (
+    Observer,
+    RayTemplates,
+    Seen,
+    UNSEEN,
+    ViewshedTemplates,
+    VisibilityCache,
+    shadowcast,
+    visible_cells,
+)
+from distance_field import DistanceField, DistanceFieldCache, FlowField
+from heuristics import Landmarks
+from hierarchical import HierarchicalPlanner
+from map_cache import MapCache, generation_key
+from neighbors import DenseGraph, Graph, NeighborGraph
+from ownership import Ownership
+from map_format import (
+    MapFormatError,
+    is_binary_map,
+    open_terrain,
+    read_json_lines,
+    save_terrain,
+)
+from incremental import DStarLite
+from path_batch import PathRequest, PathWorkerPool
+from path_cache import PathCache
+from resource_index import ResourceIndex
+from side_vision import SideVision
+from terrain import Occupation, TerrainLayers
+from unit_index import UnitIndex
+from array import array
 import string
 import sys
+import weakref
 
 import random
 
-import math
-from typing import List, Tuple, Set, TYPE_CHECKING, Optional
+from typing import Dict, FrozenSet, Iterable, List, Tuple, Set, TYPE_CHECKING, Optional
 
+try:
+    import numpy as np
+
+    HAVE_NUMPY = True
+except ImportError:  # generation falls back to the per-tile loop
+    HAVE_NUMPY = False
 
 if TYPE_CHECKING:
     from unit import Unit
@@ -57,60 +100,626 @@ class bcolors:
     DEFAULT = "\033[99m"
 
 
-def unit_vector_from_angle(degrees: int) -> Tuple[float, float]:
-    radians = math.radians(degrees)
-    return math.cos(radians), math.sin(radians)
+def vectorized(height_func):
+    # marks a generation function that takes whole numpy coordinate arrays
+    height_func.vectorized = True
+    return height_func
+
+
+def resource_rolls(seed, count) -> bytes:
+    # one byte per roll, fuel rolls first, then manpower, then resources;
+    # both generation paths read their 0/1 rolls from here, so the same seed
+    # gives the same map with or without numpy
+    rng = random if seed is None else random.Random(seed)
+    return rng.randbytes(3 * count)
 
 
-def apply_elevation_function(tiles: List[List["Tile"]], size, height_func):
+def apply_elevation_function(
+    terrain: TerrainLayers, size, height_func, seed=None, origin=(0, 0)
+):
+    # writes the layers directly, the map is not live yet; ``origin`` is the
+    # map cell that lands at (0, 0) of ``terrain``
+    if HAVE_NUMPY and getattr(height_func, "vectorized", False):
+        return apply_elevation_arrays(terrain, size, height_func, seed, origin)
+
+    count = size * size
+    rolls = resource_rolls(seed, count)
+    ox, oy = origin
     for x in range(size):
         for y in range(size):
-            elevation = int(height_func(x, y))
-            tiles[x][y].elevation = elevation
-            tiles[x][y].maneuver_score = 0 if elevation > 0 else 5
-            tiles[x][y].concealment_score = 50
-            tiles[x][y].cover_score = 50
-            tiles[x][y].fuel = random.randint(0, 1) if elevation < 10 else 0
-            tiles[x][y].manpower = random.randint(0, 1) if elevation < 10 else 0
-            tiles[x][y].resources = random.randint(0, 1) if elevation < 10 else 0
-            tiles[x][y].isWater = True if elevation < 0 else False
+            i = x * size + y
+            elevation = int(height_func(ox + x, oy + y))
+            low = elevation < 10
+            terrain.elevation[i] = elevation
+            terrain.maneuver[i] = 0 if elevation > 0 else 5
+            terrain.concealment[i] = 50
+            terrain.cover[i] = 50
+            terrain.fuel[i] = rolls[i] & 1 if low else 0
+            terrain.manpower[i] = rolls[count + i] & 1 if low else 0
+            terrain.resources[i] = rolls[2 * count + i] & 1 if low else 0
+            terrain.water[i] = 1 if elevation < 0 else 0
+
+
+def apply_elevation_arrays(
+    terrain: TerrainLayers, size, height_func, seed=None, origin=(0, 0)
+):
+    # x-major grids so that flattening matches the x * size + y layout
+    ox, oy = origin
+    xs, ys = np.meshgrid(
+        np.arange(ox, ox + size), np.arange(oy, oy + size), indexing="ij"
+    )
+    heights = np.broadcast_to(np.asarray(height_func(xs, ys)), (size, size))
+    # int() truncates toward zero, so does trunc
+    elevation = np.trunc(heights).astype(np.intc).ravel()
+    low = elevation < 10
+    rolls = np.frombuffer(resource_rolls(seed, elevation.size), dtype=np.uint8)
+    rolls = (rolls.reshape(3, elevation.size) & 1) * low
+
+    def to_layer(values):
+        return array("i", values.astype(np.intc).tobytes())
+
+    terrain.elevation[:] = to_layer(elevation)
+    terrain.maneuver[:] = to_layer(np.where(elevation > 0, 0, 5))
+    terrain.concealment[:] = array("i", [50]) * elevation.size
+    terrain.cover[:] = array("i", [50]) * elevation.size
+    terrain.fuel[:] = to_layer(rolls[0])
+    terrain.manpower[:] = to_layer(rolls[1])
+    terrain.resources[:] = to_layer(rolls[2])
+    terrain.water[:] = (elevation < 0).astype(np.uint8).tobytes()
 
 
 class GameMap:
     def __init__(
-        self, size, map_encoding=None, generation_funct=None, points_of_interest=[]
+        self,
+        size,
+        map_encoding=None,
+        generation_funct=None,
+        points_of_interest=[],
+        path_cache_size=4096,
+        flow_fields=False,
+        incremental_routes=False,
+        path_workers=1,
+        heuristic="manhattan",
+        plan_max_nodes=None,
+        plan_max_micros=None,
+        hierarchical_range=None,
+        seed=None,
+        chunk_size=None,
+        chunk_memory=64 * 2**20,
+        chunk_dir=None,
+        cache_dir=None,
+        cache_size=512 * 2**20,
+        vision_model="rays",
+        visibility_cache_size=4096,
+        field_memory=256 * 2**20,
     ):
         self.size = size
-        if map_encoding:
-            self.load_map(map_encoding, size)
+        # with chunk_size set, terrain is generated chunk by chunk on first
+        # touch and cold chunks are evicted past chunk_memory bytes
+        self.chunk_size = chunk_size
+        if chunk_size:
+            store = ChunkStore(
+                size,
+                chunk_size,
+                self._chunk_generator(generation_funct),
+                seed or 0,
+                chunk_memory,
+                chunk_dir,
+            )
+            self.terrain: TerrainLayers = ChunkedTerrain(store)
         else:
-            self.tiles = [[Tile((x, y)) for y in range(size)] for x in range(size)]
-            apply_elevation_function(self.tiles, self.size, generation_funct)
+            self.terrain = TerrainLayers(size)
+        # land connectivity, set once the terrain is in place
+        self.components: Components
+        # where every unit stands, see Unit.move
+        self.unit_index = UnitIndex(size)
+        # region id -> RegionControl, told about tiles they gain or lose
+        self.regions: Dict[str, "RegionControl"] = {}
+        # per-side fog of war, counted from the units' views, see update_vision
+        self.side_vision = SideVision(self.unit_index, self.terrain)
+        # "rays" (the sampled rays units have always used) or "shadowcast",
+        # see field_of_view.VISION_MODELS; what each observer saw is kept
+        # until the terrain changes
+        self.vision_model = vision_model
+        self.ray_templates = RayTemplates(size)
+        self.viewshed_templates = ViewshedTemplates(size)
+        self.visibility_cache = VisibilityCache(visibility_cache_size)
+        # bumped whenever a tile attribute that pathfinding reads changes
+        self.terrain_version = 0
+        self.path_cache = PathCache(path_cache_size)
+        # distance fields, flow fields and landmark tables each keep at most
+        # field_memory bytes of fields
+        self.distance_fields = DistanceFieldCache(max_bytes=field_memory)
+        # when set, find_path reads routes off shared per-goal flow fields
+        self.flow_field_mode = flow_fields
+        self.flow_fields = DistanceFieldCache(max_bytes=field_memory)
+        # when set, units keep a DStarLite per route and repair it in place
+        self.incremental_routes = incremental_routes
+        self.incremental_planners: "weakref.WeakSet[DStarLite]" = weakref.WeakSet()
+        # find_paths plans cache misses in this many processes
+        self.path_workers = path_workers
+        self.path_pool = PathWorkerPool(path_workers)
+        # default GridAStar heuristic, see heuristics.HEURISTICS
+        self.heuristic = heuristic
+        self.landmark_sets = DistanceFieldCache(max_entries=8, max_bytes=field_memory)
+        # per-call budget for units planning through resumable_planner; with
+        # neither set units plan their whole route at once
+        self.plan_max_nodes = plan_max_nodes
+        self.plan_max_micros = plan_max_micros
+        # heuristic -> {"queries": ..., "expanded": ...}
+        self.heuristic_stats: Dict[str, Dict[str, int]] = {}
+        # find_path hands goals at least this many tiles away (Chebyshev)
+        # to the hierarchical planner; None searches every route in full
+        self.hierarchical_range = hierarchical_range
+        self.hierarchical_planners: Dict[
+            Tuple[float, float], HierarchicalPlanner
+        ] = {}
+        # diagonal -> land adjacency, see neighbor_graph
+        self.neighbor_graphs: Dict[bool, Graph] = {}
+        # (unit_weight, stealth_priority) of the units on the map; their
+        # edge costs are priced up front, see field_profile
+        self.fielded_profiles: Set[Tuple[float, float]] = set()
+        # generated maps and their derived layers are reused across runs
+        # from cache_dir, keyed by the generation parameters
+        self.map_cache: Optional[MapCache] = None
+        self.cache_key: Optional[str] = None
+        cached: Optional[TerrainLayers] = None
+        # unseeded maps get no key, see generation_key
+        if cache_dir and not (map_encoding or chunk_size):
+            self.cache_key = generation_key(
+                size,
+                generation_funct,
+                points_of_interest,
+                seed,
+                HAVE_NUMPY and getattr(generation_funct, "vectorized", False),
+            )
+        if self.cache_key is not None:
+            self.map_cache = MapCache(cache_dir, cache_size)
+            cached = self.map_cache.load_terrain(self.cache_key)
+
+        if cached is not None:
+            self.terrain = cached
+        elif map_encoding:
+            self.terrain = self._read_map(map_encoding, size)
+        elif not chunk_size:
+            apply_elevation_function(
+                self.terrain, self.size, generation_funct, seed
+            )
 
         self.points_of_interest = points_of_interest
-        for point in points_of_interest:
-            x, y = point
-            self.tiles[x][y].fuel = 100
-            self.tiles[x][y].manpower = 100
-            self.tiles[x][y].resources = 100
+        if cached is None:
+            for point in points_of_interest:
+                i = self.terrain.index(point)
+                self.terrain.fuel[i] = 100
+                self.terrain.manpower[i] = 100
+                self.terrain.resources[i] = 100
+
+        if self.map_cache is not None and self.cache_key is not None:
+            self.restore_cached_layers(
+                self.map_cache, self.cache_key, fresh=cached is None
+            )
+        else:
+            self.components = self.label_components()
+        # tiles with fuel, manpower or resources and the points of interest
+        self.resource_index = ResourceIndex(self.terrain, points_of_interest)
+        # which region holds each tile, see set_occupation
+        self.ownership = Ownership(self.terrain)
+
+    def restore_cached_layers(self, cache: MapCache, key: str, fresh: bool):
+        if fresh:
+            cache.store_terrain(key, self.terrain)
+            state = None
+        else:
+            state = cache.load(key, "components")
+        if state is None:
+            components = self.label_components()
+            if isinstance(components, LandComponents):
+                cache.store(key, "components", components.state())
+        else:
+            components = LandComponents.from_state(self.terrain, state)
+        self.components = components
+
+        for profile, (costs, ready) in (cache.load(key, "edge_costs") or {}).items():
+            edges = self.terrain.edge_costs(*profile)
+            edges.costs = costs
+            edges.ready = ready
+
+        state = cache.load(key, "neighbor_graph")
+        if state is not None:
+            self.neighbor_graphs[True] = NeighborGraph.from_state(
+                self.terrain, True, state
+            )
+
+    def label_components(self) -> Components:
+        # every land tile is labeled up front on small flat maps; chunked
+        # and large maps flood from a tile the first time it is asked about
+        if self.chunk_size:
+            # reachability floods stop after 4 chunks' worth of land
+            return BoundedComponents(self.terrain, 4 * self.chunk_size**2)
+        if self.size * self.size > FULL_LABELING_LIMIT:
+            return BoundedComponents(self.terrain)
+        return LandComponents(self.terrain)
+
+    def pristine_cache(self) -> Optional[Tuple[MapCache, str]]:
+        # the map cache and this map's key in it; only layers of the map as
+        # generated are worth keeping, so None once the terrain was edited
+        if self.map_cache is None or self.cache_key is None:
+            return None
+        if self.terrain_version != 0:
+            return None
+        return self.map_cache, self.cache_key
+
+    def cache_derived_layers(self):
+        # saves edge costs priced so far for the next run
+        entry = self.pristine_cache()
+        if entry is None:
+            return
+        cache, key = entry
+        tables = {
+            profile: (edges.costs, edges.ready)
+            for profile, edges in self.terrain._edge_costs.items()
+        }
+        cache.store(key, "edge_costs", tables)
+        graph = self.neighbor_graphs.get(True)
+        if isinstance(graph, NeighborGraph):
+            cache.store(key, "neighbor_graph", graph.state())
+
+    @staticmethod
+    def _chunk_generator(height_func):
+        def generate(chunk: TerrainLayers, origin: Position, seed: int):
+            apply_elevation_function(chunk, chunk.size, height_func, seed, origin)
+
+        return generate
 
     def get_tile(self, position) -> "Tile":
-        x, y = position
-        return self.tiles[x][y]
+        return Tile(self, position)
 
-    def find_path(self, unit_weight, start, goal):
-        planner = AStar(self, start, goal, unit_weight)
-        return planner.find_path()
+    def neighbor_graph(self, diagonal=True) -> Graph:
+        # 8-connected by default, 4-connected with diagonal=False
+        graph = self.neighbor_graphs.get(diagonal)
+        if graph is None:
+            if self.chunk_size:
+                graph = DenseGraph(self.terrain, diagonal)
+            else:
+                graph = NeighborGraph(self.terrain, diagonal)
+            self.neighbor_graphs[diagonal] = graph
+        return graph
 
-    def get_adjacent(self, position: Tuple[int, int]) -> List[Tile]:
+    def field_profile(self, unit_weight=1.0, stealth_priority=0.0):
+        # pathfinding for this profile then only reads costs; chunked maps
+        # keep pricing lazily so that chunks are still generated on touch
+        profile = (unit_weight, stealth_priority)
+        if profile in self.fielded_profiles:
+            return
+        self.fielded_profiles.add(profile)
+        if not self.chunk_size:
+            self.terrain.edge_costs(*profile).build()
+
+    def field_units(self, units: Iterable["Unit"]):
+        # setup step once the units are placed: prices their profiles and
+        # the land graph, then keeps both in the map cache for the next run
+        for unit in units:
+            self.field_profile(unit_weight=unit.armor_rating)
+        if not self.chunk_size:
+            self.neighbor_graph()
+        self.cache_derived_layers()
+
+    def neighbors(self, position: Position, diagonal=False) -> List[Position]:
+        # land tiles one step from ``position``
+        graph = self.neighbor_graph(diagonal)
+        size = self.size
+        return [divmod(i, size) for i in graph.neighbors(self.terrain.index(position))]
+
+    def move_unit(self, unit: "Unit", position: Position):
+        self.unit_index.move(unit, position)
+        self.side_vision.unit_moved(unit, position)
+
+    def turn_unit(self, unit: "Unit", direction: int):
+        if unit.direction != direction:
+            unit.direction = direction
+            self.side_vision.mark(unit)
+
+    def update_vision(self):
+        # recount the views of units that moved or turned or that had a
+        # tile edited within their range, or of every unit once the whole
+        # terrain has been replaced
+        vision = self.side_vision
+        if vision.version != self.terrain_version:
+            vision.version = self.terrain_version
+            for unit in self.unit_index.positions:
+                vision.mark(unit)
+        if not vision.dirty:
+            return
+
+        changed = []
+        for unit in list(vision.dirty):
+            if unit not in self.unit_index:
+                vision.remove(unit)
+                continue
+            if unit.side is None:
+                # counted for no side, so there is nothing to cast
+                vision.set_view(unit, None, ())
+                continue
+            observer = (
+                unit.position,
+                unit.direction,
+                unit.vision_cone,
+                unit.vision_range,
+            )
+            if vision.view_key(unit) != (observer, self.terrain_version):
+                changed.append((unit, observer))
+        vision.dirty.clear()
+        seen = self.observe([observer for _, observer in changed])
+        for (unit, observer), (cells, _) in zip(changed, seen):
+            vision.set_view(unit, (observer, self.terrain_version), cells)
+
+    def visible_to(self, side: Optional[str], position: Position) -> bool:
+        # whether any unit of ``side`` sees the tile; None is no side and
+        # sees nothing
+        self.update_vision()
+        return self.side_vision.sees(side, position)
+
+    def visible_enemies(self, side: Optional[str]) -> List["Unit"]:
+        # units of other sides standing where ``side`` can see them, none
+        # for a side of None
+        self.update_vision()
+        return self.side_vision.seen_units(side)
+
+    def find_path(
+        self, unit_weight, start, goal, stealth_priority=0.0, heuristic=None
+    ):
+        if self.flow_field_mode:
+            field = self.flow_field(goal, unit_weight, stealth_priority)
+            return field.path_from(start)
+        if not self.is_reachable(start, goal):
+            return []
+        if self.long_range(start, goal):
+            return self.find_path_hierarchical(
+                unit_weight, start, goal, stealth_priority
+            )
+        heuristic = heuristic or self.heuristic
+        key = (start, goal, unit_weight, stealth_priority, heuristic)
+        path = self.path_cache.get(key, self.terrain_version)
+        if path is not None:
+            return path
+        planner = GridAStar(
+            self, start, goal, unit_weight, stealth_priority, heuristic
+        )
+        path = planner.find_path()
+        self.record_expansions(heuristic, planner.expanded)
+        self.path_cache.put(key, self.terrain_version, path)
+        return path
+
+    def long_range(self, start: Position, goal: Position) -> bool:
+        if self.hierarchical_range is None:
+            return False
+        distance = max(abs(start[0] - goal[0]), abs(start[1] - goal[1]))
+        return distance >= self.hierarchical_range
+
+    def is_reachable(self, start: Position, goal: Position) -> bool:
+        return self.components.reachable(
+            self.terrain.index(start), self.terrain.index(goal)
+        )
+
+    def component_of(self, position: Position) -> int:
+        return self.components.label(self.terrain.index(position))
+
+    @property
+    def budgeted_planning(self) -> bool:
+        return self.plan_max_nodes is not None or self.plan_max_micros is not None
+
+    def resumable_planner(
+        self, start: Position, goal: Position, unit_weight=1.0, stealth_priority=0.0
+    ) -> ResumableAStar:
+        planner = ResumableAStar(
+            self, start, goal, unit_weight, stealth_priority, self.heuristic
+        )
+        key = (start, goal, unit_weight, stealth_priority, self.heuristic)
+        if not self.is_reachable(start, goal):
+            planner.finish([])
+        else:
+            cached = self.path_cache.get(key, self.terrain_version)
+            if cached is not None:
+                planner.finish(cached)
+        return planner
+
+    def advance_planner(self, planner: ResumableAStar) -> bool:
+        # run one budgeted slice; finished routes are shared via the path cache
+        if planner.done:
+            return True
+        if not planner.step(self.plan_max_nodes, self.plan_max_micros):
+            return False
+        self.record_expansions(planner.heuristic, planner.expanded)
+        if planner.version == self.terrain_version:
+            key = (
+                planner.start,
+                planner.goal,
+                planner.unit_weight,
+                planner.stealth_priority,
+                planner.heuristic,
+            )
+            self.path_cache.put(key, self.terrain_version, planner.path)
+        return True
+
+    def record_expansions(self, heuristic: str, expanded: int):
+        stats = self.heuristic_stats.setdefault(
+            heuristic, {"queries": 0, "expanded": 0}
+        )
+        stats["queries"] += 1
+        stats["expanded"] += expanded
+
+    def landmarks(self, unit_weight=1.0, stealth_priority=0.0) -> Landmarks:
+        # ALT tables are exact costs, so they are rebuilt after any terrain edit
+        key = (unit_weight, stealth_priority)
+        landmarks = self.landmark_sets.get(key, self.terrain_version)
+        if landmarks is not None:
+            return landmarks
+        entry = self.pristine_cache()
+        name = f"landmarks-{unit_weight}-{stealth_priority}"
+        state = entry[0].load(entry[1], name) if entry is not None else None
+        if state is not None:
+            landmarks = Landmarks.from_state(self.terrain, *key, state)
+        else:
+            landmarks = Landmarks(self.terrain, unit_weight, stealth_priority)
+            if entry is not None:
+                entry[0].store(entry[1], name, landmarks.state())
+        self.landmark_sets.put(key, self.terrain_version, landmarks)
+        return landmarks
+
+    def find_paths(self, requests: List[tuple]) -> List[List[Position]]:
+        # requests are (start, goal, unit_weight[, stealth_priority]) planned
+        # with the map's heuristic; results come back in request order and
+        # are independent of path_workers
+        if self.flow_field_mode:
+            return [self.find_path(r[2], r[0], r[1], *r[3:]) for r in requests]
+
+        # unreachable goals keep the empty path
+        results: List[List[Position]] = [[] for _ in requests]
+        pending: Dict[PathRequest, List[int]] = {}
+        for i, request in enumerate(requests):
+            start, goal, unit_weight = request[:3]
+            stealth_priority = request[3] if len(request) > 3 else 0.0
+            if not self.is_reachable(start, goal):
+                continue
+            key = (start, goal, unit_weight, stealth_priority, self.heuristic)
+            path = self.path_cache.get(key, self.terrain_version)
+            if path is not None:
+                results[i] = path
+            else:
+                pending.setdefault(key, []).append(i)
+
+        keys = list(pending)
+        if self.path_workers > 1 and len(keys) > 1:
+            planned = self.path_pool.run(self.terrain, self.terrain_version, keys)
+        else:
+            planned = []
+            for key in keys:
+                planner = GridAStar(self, *key)
+                planned.append((planner.find_path(), planner.expanded))
+
+        paths = []
+        for key, (path, expanded) in zip(keys, planned):
+            self.record_expansions(key[4], expanded)
+            paths.append(path)
+
+        for key, path in zip(keys, paths):
+            self.path_cache.put(key, self.terrain_version, path)
+            for i in pending[key]:
+                results[i] = list(path)
+        return results
+
+    def distance_field(
+        self,
+        sources: List[Position],
+        unit_weight=1.0,
+        stealth_priority=0.0,
+    ) -> DistanceField:
+        key = (tuple(sources), unit_weight, stealth_priority)
+        field = self.distance_fields.get(key, self.terrain_version)
+        if field is None:
+            field = DistanceField(self.terrain, sources, unit_weight, stealth_priority)
+            self.distance_fields.put(key, self.terrain_version, field)
+        return field
+
+    def flow_field(self, goal: Position, unit_weight=1.0, stealth_priority=0.0):
+        key = (goal, unit_weight, stealth_priority)
+        field = self.flow_fields.get(key, self.terrain_version)
+        if field is None:
+            field = FlowField(self.terrain, goal, unit_weight, stealth_priority)
+            self.flow_fields.put(key, self.terrain_version, field)
+        return field
+
+    def incremental_planner(
+        self, start: Position, goal: Position, unit_weight=1.0, stealth_priority=0.0
+    ) -> DStarLite:
+        # the planner is told about every later terrain edit until dropped
+        planner = DStarLite(self.terrain, start, goal, unit_weight, stealth_priority)
+        self.incremental_planners.add(planner)
+        return planner
+
+    def hierarchical_planner(
+        self, unit_weight=1.0, stealth_priority=0.0, cluster_size=16
+    ) -> HierarchicalPlanner:
+        key = (unit_weight, stealth_priority)
+        planner = self.hierarchical_planners.get(key)
+        if planner is None or planner.cluster_size != cluster_size:
+            planner = HierarchicalPlanner(
+                self.terrain, cluster_size, unit_weight, stealth_priority
+            )
+            self.hierarchical_planners[key] = planner
+        return planner
+
+    def find_path_hierarchical(self, unit_weight, start, goal, stealth_priority=0.0):
+        # approximate long-range route; see HierarchicalPlanner
+        if not self.is_reachable(start, goal):
+            return []
+        key = (start, goal, unit_weight, stealth_priority, "hierarchical")
+        path = self.path_cache.get(key, self.terrain_version)
+        if path is not None:
+            return path
+        planner = self.hierarchical_planner(unit_weight, stealth_priority)
+        path = planner.find_path(start, goal)
+        if not path:
+            # the goal is reachable but the abstract graph found no way
+            # there; search the tiles instead
+            planner = GridAStar(
+                self, start, goal, unit_weight, stealth_priority, self.heuristic
+            )
+            path = planner.find_path()
+            self.record_expansions(self.heuristic, planner.expanded)
+        if path:
+            # an empty path is not kept, the next query searches again
+            self.path_cache.put(key, self.terrain_version, path)
+        return path
+
+    def path_cache_stats(self):
+        return self.path_cache.stats()
+
+    def on_tile_changed(self, tile: Tile):
+        # the layer has already been written by the tile
+        self.terrain.invalidate(tile.index)
+        # no-op unless the tile turned to or from water
+        self.components.tile_changed(tile.index)
+        for graph in self.neighbor_graphs.values():
+            graph.tile_changed(tile.index)
+        self.terrain_version += 1
+        self.side_vision.tile_changed(tile.position, self.terrain_version)
+        for planner in self.hierarchical_planners.values():
+            planner.tile_changed(tile.position)
+        for route in list(self.incremental_planners):
+            route.tiles_changed([tile.position])
+
+    def on_resources_changed(self, tile: Tile):
+        self.resource_index.tile_changed(tile.index)
+
+    def register_region(self, region: "RegionControl"):
+        self.regions[region.region_id] = region
+
+    def set_occupation(self, tile: Tile, occupation: Occupation):
+        # every change of hands lands here, the regions on both sides of it
+        # are told
+        owner = self.ownership.owner_id(occupation)
+        previous = self.ownership.set_owner(tile.position, owner)
+        if previous == owner:
+            return
+        for changed in (previous, owner):
+            region = self.regions.get(self.terrain.occupants[changed][1] or "")
+            if region is not None:
+                region.tile_changed_hands(tile.position)
+
+    def adjacent(self, position: Position) -> List[Position]:
+        # the four tiles around ``position``, water included
         x, y = position
         adj = []
         for dx, dy in [(-1, 0), (1, 0), (0, -1), (0, 1)]:
             nx, ny = x + dx, y + dy
             if 0 <= nx < self.size and 0 <= ny < self.size:
-                adj.append(self.tiles[nx][ny])
+                adj.append((nx, ny))
         return adj
 
+    def get_adjacent(self, position: Tuple[int, int]) -> List[Tile]:
+        return [Tile(self, adj) for adj in self.adjacent(position)]
+
     def get_visible_tiles(
         self,
         unit_pos: Position,
@@ -119,70 +728,128 @@ class GameMap:
         vision_range: int,
         max_occlusion: int = 100,
         elevation_threshold: int = 5,
-    ) -> Set[Position]:
+    ) -> FrozenSet[Position]:
+        observer = (unit_pos, direction_deg, vision_cone_deg, vision_range)
+        return self.observe([observer], max_occlusion, elevation_threshold)[0][1]
 
-        visible = set()
-        direction_deg = direction_deg % 360
-        start_elev = self.tiles[unit_pos[0]][unit_pos[1]].elevation
+    def visible_cells(
+        self,
+        observers: List[Observer],
+        max_occlusion: int = 100,
+        elevation_threshold: int = 5,
+    ) -> List[Tuple[int, ...]]:
+        # one sorted tuple of cell indices per (position, direction, cone,
+        # range), all observers of a tick in one call
+        return [
+            cells
+            for cells, _ in self.observe(observers, max_occlusion, elevation_threshold)
+        ]
 
-        half_cone = vision_cone_deg // 2
-        for angle in range(
-            direction_deg - half_cone, direction_deg + half_cone + 1, 10
-        ):
-            dx, dy = unit_vector_from_angle(angle)
-            occlusion = 0
-            for r in range(1, vision_range + 1):
-                tx = unit_pos[0] + round(dx * r)
-                ty = unit_pos[1] + round(dy * r)
+    def units_visible_tiles(
+        self, units: List["Unit"]
+    ) -> Dict["Unit", FrozenSet[Position]]:
+        # Unit.get_visible_tiles for many units at once
+        seen = self.observe(
+            [
+                (unit.position, unit.direction, unit.vision_cone, unit.vision_range)
+                for unit in units
+            ]
+        )
+        return {unit: positions for unit, (_, positions) in zip(units, seen)}
 
-                if tx < 0 or tx >= self.size or ty < 0 or ty >= self.size:
-                    break
+    def observe(
+        self,
+        observers: List[Observer],
+        max_occlusion: int = 100,
+        elevation_threshold: int = 5,
+    ) -> List[Seen]:
+        # answered from the visibility cache where possible, the misses are
+        # cast together with the map's vision model
+        version = self.terrain_version
+        # misses hold UNSEEN until they are cast
+        seen: List[Seen] = []
+        missed = []
+        for observer in observers:
+            position, direction, cone, vision_range = observer
+            key = (
+                position,
+                direction % 360,
+                cone,
+                vision_range,
+                max_occlusion,
+                elevation_threshold,
+            )
+            entry = self.visibility_cache.get(key, version)
+            if entry is None:
+                missed.append((len(seen), key, observer))
+                entry = UNSEEN
+            seen.append(entry)
+        if not missed:
+            return seen
 
-                tile = self.tiles[tx][ty]
-                if tile.elevation - start_elev > elevation_threshold:
-                    break
+        missed_observers = [observer for _, _, observer in missed]
+        if self.vision_model == "rays":
+            found = visible_cells(
+                self.terrain,
+                self.ray_templates,
+                missed_observers,
+                max_occlusion,
+                elevation_threshold,
+            )
+        else:
+            found = [
+                shadowcast(
+                    self.terrain,
+                    self.viewshed_templates.get(direction, cone, vision_range),
+                    position,
+                    max_occlusion,
+                    elevation_threshold,
+                )
+                for position, direction, cone, vision_range in missed_observers
+            ]
+        for (i, key, _), cells in zip(missed, found):
+            seen[i] = self.visibility_cache.put(key, version, cells, self.size)
+        return seen
 
-                occlusion += tile.concealment_score + tile.cover_score
-                if occlusion >= max_occlusion:
-                    break
+    def close(self):
+        # stops the find_paths worker processes; the map stays usable and
+        # a later batch starts them again
+        self.path_pool.shutdown()
 
-                visible.add((tx, ty))
+    def __enter__(self) -> "GameMap":
+        return self
 
-        return visible
+    def __exit__(self, *exc_info):
+        self.close()
 
     def save_map(self, filename):
-        with open(filename, "w") as f:
-            for row in self.tiles:
-                for tile in row:
-                    data = {
-                        "x": tile.x,
-                        "y": tile.y,
-                        "maneuver": tile.maneuver_score,
-                        "elevation": tile.elevation,
-                        "concealment": tile.concealment_score,
-                        "fuel": tile.fuel,
-                        "manpower": tile.manpower,
-                        "resources": tile.resources,
-                        "isWater": tile.isWater,
-                    }
-                    f.write(json.dumps(data) + "\n")
+        save_terrain(self.terrain, filename)
+
+    def _read_map(self, filename, size) -> TerrainLayers:
+        # binary map files are mapped, not read; JSON-lines files from older
+        # save_map calls are still parsed
+        if is_binary_map(filename):
+            terrain = open_terrain(filename)
+            if terrain.size != size:
+                raise MapFormatError(
+                    f"{filename}: map size is {terrain.size}, expected {size}"
+                )
+            return terrain
+        return read_json_lines(filename, size)
 
     def load_map(self, filename, size):
-        tiles = [[Tile((x, y)) for y in range(size)] for x in range(size)]
-        with open(filename) as f:
-            for line in f:
-                data = json.loads(line)
-                tile = Tile((data["x"], data["y"]))
-                tile.maneuver_score = data["maneuver"]
-                tile.elevation = data["elevation"]
-                tile.concealment_score = data["concealment"]
-                tile.fuel = data["fuel"]
-                tile.manpower = data["manpower"]
-                tile.resources = data["resources"]
-                tile.isWater = data.get("isWater", False)
-                tiles[tile.x][tile.y] = tile
-
-        self.tiles = tiles
+        terrain = self._read_map(filename, size)
+        # ownership is game state, not terrain, and carries over
+        terrain.occupation[:] = self.terrain.occupation
+        terrain.occupants = self.terrain.occupants
+        terrain._occupant_ids = self.terrain._occupant_ids
+        self.ownership.layers = terrain
+        self.terrain = terrain
+        self.components = self.label_components()
+        self.terrain_version += 1
+        self.hierarchical_planners.clear()
+        self.neighbor_graphs.clear()
+        self.resource_index = ResourceIndex(self.terrain, self.points_of_interest)
 
     def print_colored_map(self, coordinates: List[Tuple[int, int]], color="RED"):
         digits = string.digits + string.ascii_lowercase
@@ -198,7 +865,7 @@ class GameMap:
         for y in reversed(range(self.size)):
             row = ""
             for x in range(self.size):
-                val = self.tiles[x][y].elevation // 100
+                val = self.terrain.elevation[x * self.size + y] // 100
                 sym = to_base36(val).rjust(2)
                 if (x, y) in coordinates:
                     sym = color_code + "██" + bcolors.ENDC
@@ -225,10 +892,10 @@ class GameMap:
         for y in reversed(range(self.size)):
             row = []
             for x in range(self.size):
-                val = self.tiles[x][y].elevation
+                val = self.terrain.elevation[x * self.size + y]
                 sym = to_base36(val).rjust(2)
 
-                if self.tiles[x][y].isWater:
+                if self.terrain.water[x * self.size + y]:
                     sym = bcolors.BLUE + "██" + bcolors.ENDC
                     row += sym
                     continue
@@ -238,12 +905,12 @@ class GameMap:
                     if region.is_coord_bound((x, y)):
                         changed = True
                         sym = f"{bcolors.MAGENTA}{sym}{bcolors.ENDC}"
-                    if (x, y) in region.local_paths:
+                    if (x, y) in region.local_direction_weights:
                         sym = "▒▒"
                     if (x, y) in region.controlled_tiles:
                         if (x, y) in self.points_of_interest:
                             sym = "▛▟"
-                        elif (x, y) in region.local_paths:
+                        elif (x, y) in region.local_direction_weights:
                             sym = "▒▒"
                         else:
                             sym = "░░"
@@ -253,45 +920,48 @@ class GameMap:
                             sym = f"{bcolors.YELLOW}{sym}{bcolors.ENDC}"
 
                 # Units (rendered last to ensure they are visible)
-                for region in regions:
-                    for unit in region.units:
-                        if (x, y) == unit.position:
-                            match unit.direction:
-                                case -1:
-                                    sym = "╳╳"
-                                case 90:
-                                    sym = "↑↑"
-                                case 45:
-                                    sym = "↗↗"
-                                case 0:
-                                    sym = "→→"
-                                case 315:
-                                    sym = "↘↘"
-                                case 180:
-                                    sym = "↓↓"
-                                case 225:
-                                    sym = "↙↙"
-                                case 270:
-                                    sym = "←←"
-                                case 135:
-                                    sym = "↖↖"
-                                case _:
-                                    assert 1 == 0, (
-                                        "Unknown direction:",
-                                        unit.direction,
-                                    )
-
-                            if (x, y) in self.points_of_interest:
-                                sym = "▛▟"
-                            else:
-                                # sym = "██"
-                                if unit.holding_defense:
-                                    "╳╳"
-
-                            if unit.side == "B":
-                                sym = f"{bcolors.RED}{sym}{bcolors.ENDC}"
-                            else:
-                                sym = f"{bcolors.CYAN}{sym}{bcolors.ENDC}"
+                shown = [
+                    unit
+                    for unit in self.unit_index.at((x, y))
+                    if unit.assigned_region in regions
+                ]
+                for unit in shown[-1:]:
+                    match unit.direction:
+                        case -1:
+                            sym = "╳╳"
+                        case 90:
+                            sym = "↑↑"
+                        case 45:
+                            sym = "↗↗"
+                        case 0:
+                            sym = "→→"
+                        case 315:
+                            sym = "↘↘"
+                        case 180:
+                            sym = "↓↓"
+                        case 225:
+                            sym = "↙↙"
+                        case 270:
+                            sym = "←←"
+                        case 135:
+                            sym = "↖↖"
+                        case _:
+                            assert 1 == 0, (
+                                "Unknown direction:",
+                                unit.direction,
+                            )
+
+                    if (x, y) in self.points_of_interest:
+                        sym = "▛▟"
+                    else:
+                        # sym = "██"
+                        if unit.holding_defense:
+                            "╳╳"
+
+                    if unit.side == "B":
+                        sym = f"{bcolors.RED}{sym}{bcolors.ENDC}"
+                    else:
+                        sym = f"{bcolors.CYAN}{sym}{bcolors.ENDC}"
 
                 # Default color for unclaimed tiles
                 if sym == to_base36(val).rjust(2) and not changed:
@@ -325,7 +995,7 @@ class GameMap:
             row = ""
             for x in range(self.size):
                 # val = self.tiles[x][y].maneuver_score + self.tiles[x][y].elevation
-                val = self.tiles[x][y].elevation
+                val = self.terrain.elevation[x * self.size + y]
                 sym = to_base36(val).rjust(2)
                 has_changed = False
 
@@ -0,0 +1,166 @@
+from array import array
+from typing import Callable, List, Tuple, TYPE_CHECKING
+
+from distance_field import DistanceField, FlowField
+from terrain import INF, table_bytes
+
+if TYPE_CHECKING:
+    from terrain import TerrainLayers
+
+Position = Tuple[int, int]
+Heuristic = Callable[[int], float]
+
+# cheapest possible step: cover_maneuver_penalty is at least 1 and the other
+# terms of edge_cost are never negative for non-negative unit parameters
+MIN_STEP_COST = 1
+
+HEURISTICS = ("manhattan", "octile", "alt")
+
+
+def manhattan(size: int, goal: int) -> Heuristic:
+    # original AStar estimate; overestimates once diagonal moves are taken
+    gx, gy = divmod(goal, size)
+
+    def estimate(index: int):
+        x, y = divmod(index, size)
+        return abs(x - gx) + abs(y - gy)
+
+    return estimate
+
+
+def octile(
+    size: int,
+    goal: int,
+    straight: float = MIN_STEP_COST,
+    diagonal: float = MIN_STEP_COST,
+) -> Heuristic:
+    # diagonal steps cost the same as straight ones in edge_cost, so with
+    # the defaults this is Chebyshev distance times the cheapest step
+    gx, gy = divmod(goal, size)
+    diagonal_saving = diagonal - 2 * straight
+
+    def estimate(index: int):
+        x, y = divmod(index, size)
+        dx = abs(x - gx)
+        dy = abs(y - gy)
+        return straight * (dx + dy) + diagonal_saving * min(dx, dy)
+
+    return estimate
+
+
+def choose_landmarks(layers: "TerrainLayers", count: int) -> List[int]:
+    # land tiles closest to the corners, then to the edge midpoints, spread
+    # the landmarks around the rim where they give the tightest bounds
+    size = layers.size
+    last = size - 1
+    half = last // 2
+    anchors = [
+        (0, 0),
+        (last, last),
+        (0, last),
+        (last, 0),
+        (half, 0),
+        (half, last),
+        (0, half),
+        (last, half),
+    ]
+    water = layers.water
+    chosen: List[int] = []
+    for ax, ay in anchors[:count]:
+        best, best_distance = -1, INF
+        for index in range(size * size):
+            if water[index] or index in chosen:
+                continue
+            x, y = divmod(index, size)
+            distance = max(abs(x - ax), abs(y - ay))
+            if distance < best_distance:
+                best, best_distance = index, distance
+                if distance == 0:
+                    break
+        if best != -1:
+            chosen.append(best)
+    return chosen
+
+
+class Landmarks:
+    """
+    ALT (A*, landmarks, triangle inequality) lower bounds for one movement
+    profile. For every landmark ``L`` the exact costs ``d(L, v)`` and
+    ``d(v, L)`` are precomputed, which bounds the remaining cost from ``v``
+    to the goal ``t`` from below by ``d(L, t) - d(L, v)`` and
+    ``d(v, L) - d(t, L)``. Costs are directed, so both tables are needed.
+    """
+
+    def __init__(
+        self,
+        layers: "TerrainLayers",
+        unit_weight: float = 1.0,
+        stealth_priority: float = 0.0,
+        count: int = 4,
+    ):
+        self.layers = layers
+        self.unit_weight = unit_weight
+        self.stealth_priority = stealth_priority
+        self.landmarks = choose_landmarks(layers, count)
+        self.from_landmark: List[array] = []
+        self.to_landmark: List[array] = []
+        for landmark in self.landmarks:
+            position = layers.position(landmark)
+            outward = DistanceField(layers, [position], unit_weight, stealth_priority)
+            outward.expand()
+            inward = FlowField(layers, position, unit_weight, stealth_priority)
+            inward.expand()
+            self.from_landmark.append(outward.cost)
+            self.to_landmark.append(inward.cost)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(map(table_bytes, self.from_landmark + self.to_landmark))
+
+    def state(self) -> dict:
+        return {
+            "landmarks": self.landmarks,
+            "from_landmark": self.from_landmark,
+            "to_landmark": self.to_landmark,
+        }
+
+    @classmethod
+    def from_state(
+        cls,
+        layers: "TerrainLayers",
+        unit_weight: float,
+        stealth_priority: float,
+        state: dict,
+    ) -> "Landmarks":
+        # tables saved with ``state`` for the same, unedited terrain
+        landmarks = cls.__new__(cls)
+        landmarks.layers = layers
+        landmarks.unit_weight = unit_weight
+        landmarks.stealth_priority = stealth_priority
+        landmarks.landmarks = state["landmarks"]
+        landmarks.from_landmark = state["from_landmark"]
+        landmarks.to_landmark = state["to_landmark"]
+        return landmarks
+
+    def heuristic(self, goal: int) -> Heuristic:
+        size = self.layers.size
+        chebyshev = octile(size, goal)
+        tables = [
+            (from_landmark, from_landmark[goal], to_landmark, to_landmark[goal])
+            for from_landmark, to_landmark in zip(self.from_landmark, self.to_landmark)
+        ]
+
+        def estimate(index: int):
+            best = chebyshev(index)
+            for from_landmark, from_goal, to_landmark, to_goal in tables:
+                # an INF bound is exact: it only comes out when the goal is
+                # unreachable from index
+                from_index = from_landmark[index]
+                if from_index != INF and from_goal - from_index > best:
+                    best = from_goal - from_index
+                to_index = to_landmark[index]
+                if to_goal != INF and to_index - to_goal > best:
+                    best = to_index - to_goal
+            return best
+
+        return estimate
@@ -0,0 +1,453 @@
+import heapq
+from typing import Dict, Iterable, List, Optional, Set, Tuple, TYPE_CHECKING
+
+from terrain import DIRECTIONS, INF
+
+if TYPE_CHECKING:
+    from terrain import TerrainLayers
+
+Position = Tuple[int, int]
+ClusterKey = Tuple[int, int]
+# ("v", cx, cy) separates cluster (cx, cy) from (cx + 1, cy),
+# ("h", cx, cy) separates cluster (cx, cy) from (cx, cy + 1);
+# ("d", cx, cy) and ("a", cx, cy) are the two diagonals through the corner
+# where (cx, cy) .. (cx + 1, cy + 1) meet: "d" joins (cx, cy) to
+# (cx + 1, cy + 1), "a" joins (cx, cy + 1) to (cx + 1, cy)
+BorderKey = Tuple[str, int, int]
+
+# open stretches of border at least this long get an entrance at each end
+# and one every half cluster in between, instead of a single one in the
+# middle
+LONG_ENTRANCE = 6
+
+# DIRECTIONS index of each step
+DIRECTION_OF = {step: d for d, step in enumerate(DIRECTIONS)}
+
+
+class HierarchicalPlanner:
+    """
+    HPA*-style planner. The map is cut into ``cluster_size`` square clusters;
+    open stretches of each cluster border become entrance nodes, and the
+    cost of crossing a cluster between its entrances is found with a search
+    confined to that cluster. Queries search this abstract graph first and
+    only refine the segments they are asked for into tile paths. The
+    in-cluster search trees are kept with the cluster, so refining a
+    segment walks a stored tree instead of searching again.
+
+    Diagonal steps across a border, and across the corner where four
+    clusters meet, get an entrance of their own where no straight crossing
+    next to them is open, so every land link between clusters is kept.
+
+    Borders are built lazily the first time a query touches them, and an
+    entrance's edges across its cluster the first time the abstract search
+    expands it. A terrain edit only drops the cluster it lands in (plus the
+    neighbor across a border when the tile sits on one). Paths are valid
+    but, as with any HPA*, not guaranteed to be the cheapest.
+    """
+
+    def __init__(
+        self,
+        layers: "TerrainLayers",
+        cluster_size: int = 16,
+        unit_weight: float = 1.0,
+        stealth_priority: float = 0.0,
+    ):
+        self.layers = layers
+        self.cluster_size = cluster_size
+        self.unit_weight = unit_weight
+        self.stealth_priority = stealth_priority
+        self.clusters_per_side = -(-layers.size // cluster_size)
+        # steps are priced from the map's shared table for this profile
+        self.edges = layers.edge_costs(unit_weight, stealth_priority)
+
+        # border -> entrance pairs (lower side, upper side)
+        self._borders: Dict[BorderKey, List[Tuple[int, int]]] = {}
+        # entrance -> [(entrance across the border, cost, border)]
+        self._inter: Dict[int, List[Tuple[int, float, BorderKey]]] = {}
+        # cluster -> entrance -> [(entrance in same cluster, cost)]
+        self._intra: Dict[ClusterKey, Dict[int, List[Tuple[int, float]]]] = {}
+        # cluster -> entrance -> came_from of the search from that entrance
+        self._trees: Dict[ClusterKey, Dict[int, Dict[int, int]]] = {}
+        # search trees of the last query's start and goal, keyed by
+        # (tile, reverse)
+        self._query_trees: Dict[Tuple[int, bool], Dict[int, int]] = {}
+
+        self.last_expanded = 0
+
+    # geometry
+
+    def cluster_of(self, index: int) -> ClusterKey:
+        x, y = divmod(index, self.layers.size)
+        return x // self.cluster_size, y // self.cluster_size
+
+    def cluster_bounds(self, cluster: ClusterKey) -> Tuple[int, int, int, int]:
+        cs = self.cluster_size
+        size = self.layers.size
+        cx, cy = cluster
+        return cx * cs, cy * cs, min((cx + 1) * cs, size), min((cy + 1) * cs, size)
+
+    def cluster_borders(self, cluster: ClusterKey) -> List[BorderKey]:
+        cx, cy = cluster
+        last = self.clusters_per_side - 1
+        borders = []
+        if cx > 0:
+            borders.append(("v", cx - 1, cy))
+        if cx < last:
+            borders.append(("v", cx, cy))
+        if cy > 0:
+            borders.append(("h", cx, cy - 1))
+        if cy < last:
+            borders.append(("h", cx, cy))
+        if cx < last and cy < last:
+            borders.append(("d", cx, cy))
+        if cx > 0 and cy > 0:
+            borders.append(("d", cx - 1, cy - 1))
+        if cx < last and cy > 0:
+            borders.append(("a", cx, cy - 1))
+        if cx > 0 and cy < last:
+            borders.append(("a", cx - 1, cy))
+        return borders
+
+    def border_sides(self, border: BorderKey) -> Tuple[ClusterKey, ClusterKey]:
+        kind, cx, cy = border
+        if kind == "v":
+            return (cx, cy), (cx + 1, cy)
+        if kind == "h":
+            return (cx, cy), (cx, cy + 1)
+        if kind == "d":
+            return (cx, cy), (cx + 1, cy + 1)
+        return (cx, cy + 1), (cx + 1, cy)
+
+    def _boundaries(self, v: int) -> List[int]:
+        # c for each boundary between clusters c and c + 1 that row or
+        # column v lies against
+        cs = self.cluster_size
+        last = self.clusters_per_side - 1
+        return [
+            c
+            for c in sorted({v // cs - 1, v // cs})
+            if 0 <= c < last and v in ((c + 1) * cs - 1, (c + 1) * cs)
+        ]
+
+    def borders_at(self, position: Position) -> List[BorderKey]:
+        # borders whose crossings depend on the tile
+        x, y = position
+        cs = self.cluster_size
+        columns = self._boundaries(x)
+        rows = self._boundaries(y)
+        borders: List[BorderKey] = [("v", bx, y // cs) for bx in columns]
+        borders.extend(("h", x // cs, by) for by in rows)
+        for bx in columns:
+            for by in rows:
+                borders.append(("d", bx, by))
+                borders.append(("a", bx, by))
+        return borders
+
+    def _border_pairs(self, border: BorderKey) -> Iterable[Tuple[int, int]]:
+        # straight steps across a "v" or "h" border, in order along it
+        kind, cx, cy = border
+        cs = self.cluster_size
+        size = self.layers.size
+        if kind == "v":
+            x = (cx + 1) * cs - 1
+            for y in range(cy * cs, min((cy + 1) * cs, size)):
+                yield x * size + y, (x + 1) * size + y
+        else:
+            y = (cy + 1) * cs - 1
+            for x in range(cx * cs, min((cx + 1) * cs, size)):
+                yield x * size + y, x * size + y + 1
+
+    # costs
+
+    def step_cost(self, index: int, d: int) -> float:
+        edges = self.edges
+        if not edges.ready[index]:
+            edges.fill(index)
+        return edges.costs[index * 8 + d]
+
+    def _search(
+        self,
+        cluster: ClusterKey,
+        source: int,
+        targets: Set[int],
+        reverse: bool = False,
+    ) -> Tuple[Dict[int, float], Dict[int, int]]:
+        # Dijkstra confined to one cluster; with reverse=True costs are
+        # measured from each tile *to* the source instead of from it
+        layers = self.layers
+        size = layers.size
+        water = layers.water
+        edges = self.edges
+        costs = edges.costs
+        ready = edges.ready
+        x0, y0, x1, y1 = self.cluster_bounds(cluster)
+        cost = {source: 0.0}
+        came_from: Dict[int, int] = {}
+        if reverse and water[source]:
+            return cost, came_from
+
+        sign = -1 if reverse else 1
+        moves = [
+            (d, sign * dx, sign * dy, sign * layers.offsets[d])
+            for d, (dx, dy) in enumerate(DIRECTIONS)
+        ]
+        remaining = set(targets)
+        done = set()
+        open_set = [(0.0, source)]
+        while open_set and remaining:
+            current_cost, current = heapq.heappop(open_set)
+            if current in done:
+                continue
+            done.add(current)
+            remaining.discard(current)
+            x, y = divmod(current, size)
+            if not (reverse or ready[current]):
+                edges.fill(current)
+            for d, dx, dy, offset in moves:
+                nx = x + dx
+                ny = y + dy
+                if nx < x0 or nx >= x1 or ny < y0 or ny >= y1:
+                    continue
+                neighbor = current + offset
+                if reverse:
+                    if water[neighbor]:
+                        continue
+                    if not ready[neighbor]:
+                        edges.fill(neighbor)
+                    step = costs[neighbor * 8 + d]
+                else:
+                    # blocked edges are priced INF
+                    step = costs[current * 8 + d]
+                tentative = current_cost + step
+                if tentative < cost.get(neighbor, INF):
+                    cost[neighbor] = tentative
+                    came_from[neighbor] = current
+                    heapq.heappush(open_set, (tentative, neighbor))
+
+        return {t: cost[t] for t in targets if t in done}, came_from
+
+    # lazy construction
+
+    def _build_border(self, border: BorderKey) -> List[Tuple[int, int]]:
+        pairs = self._borders.get(border)
+        if pairs is not None:
+            return pairs
+
+        water = self.layers.water
+        if border[0] in ("d", "a"):
+            pairs = self._corner_pairs(border)
+            self._link(border, pairs)
+            return pairs
+
+        runs: List[List[Tuple[int, int]]] = []
+        run: List[Tuple[int, int]] = []
+        straight = list(self._border_pairs(border))
+        for a, b in straight:
+            if water[a] or water[b]:
+                if run:
+                    runs.append(run)
+                    run = []
+                continue
+            run.append((a, b))
+        if run:
+            runs.append(run)
+
+        pairs = []
+        spacing = max(self.cluster_size // 2, 1)
+        for run in runs:
+            if len(run) >= LONG_ENTRANCE:
+                pairs.extend(run[:-1:spacing])
+                pairs.append(run[-1])
+            else:
+                pairs.append(run[len(run) // 2])
+
+        # a diagonal step is the only way across where the straight
+        # crossings at both of its ends are blocked
+        for (a0, b0), (a1, b1) in zip(straight, straight[1:]):
+            if water[b0] and water[a1] and not (water[a0] or water[b1]):
+                pairs.append((a0, b1))
+            if water[a0] and water[b1] and not (water[a1] or water[b0]):
+                pairs.append((a1, b0))
+
+        self._link(border, pairs)
+        return pairs
+
+    def _corner_pairs(self, border: BorderKey) -> List[Tuple[int, int]]:
+        # the diagonal step through a cluster corner, when neither of the
+        # tiles it passes between is land
+        kind, cx, cy = border
+        size = self.layers.size
+        water = self.layers.water
+        x = (cx + 1) * self.cluster_size
+        y = (cy + 1) * self.cluster_size
+        if kind == "d":
+            a, b = (x - 1) * size + y - 1, x * size + y
+            others = ((x - 1) * size + y, x * size + y - 1)
+        else:
+            a, b = (x - 1) * size + y, x * size + y - 1
+            others = ((x - 1) * size + y - 1, x * size + y)
+        if water[a] or water[b] or not all(water[i] for i in others):
+            return []
+        return [(a, b)]
+
+    def _link(self, border: BorderKey, pairs: List[Tuple[int, int]]):
+        size = self.layers.size
+        for a, b in pairs:
+            (ax, ay), (bx, by) = divmod(a, size), divmod(b, size)
+            forward = DIRECTION_OF[(bx - ax, by - ay)]
+            backward = DIRECTION_OF[(ax - bx, ay - by)]
+            self._inter.setdefault(a, []).append(
+                (b, self.step_cost(a, forward), border)
+            )
+            self._inter.setdefault(b, []).append(
+                (a, self.step_cost(b, backward), border)
+            )
+        self._borders[border] = pairs
+
+    def cluster_entrances(self, cluster: ClusterKey) -> Set[int]:
+        entrances = set()
+        for border in self.cluster_borders(cluster):
+            for a, b in self._build_border(border):
+                entrances.add(a if self.cluster_of(a) == cluster else b)
+        return entrances
+
+    def _entrance_edges(self, entrance: int) -> List[Tuple[int, float]]:
+        cluster = self.cluster_of(entrance)
+        edges = self._intra.setdefault(cluster, {})
+        found = edges.get(entrance)
+        if found is None:
+            entrances = self.cluster_entrances(cluster)
+            costs, tree = self._search(cluster, entrance, entrances - {entrance})
+            self._trees.setdefault(cluster, {})[entrance] = tree
+            found = list(costs.items())
+            edges[entrance] = found
+        return found
+
+    def build_all(self):
+        for cx in range(self.clusters_per_side):
+            for cy in range(self.clusters_per_side):
+                for entrance in self.cluster_entrances((cx, cy)):
+                    self._entrance_edges(entrance)
+
+    def tile_changed(self, position: Position):
+        x, y = position
+        cs = self.cluster_size
+        stale_clusters = {(x // cs, y // cs)}
+        for border in self.borders_at(position):
+            stale_clusters.update(self.border_sides(border))
+            for a, b in self._borders.pop(border, []):
+                for node in (a, b):
+                    kept = [e for e in self._inter.get(node, []) if e[2] != border]
+                    if kept:
+                        self._inter[node] = kept
+                    else:
+                        self._inter.pop(node, None)
+        for stale in stale_clusters:
+            self._intra.pop(stale, None)
+            self._trees.pop(stale, None)
+        self._query_trees.clear()
+
+    # queries
+
+    def find_abstract_path(self, start: Position, goal: Position) -> List[int]:
+        size = self.layers.size
+        s = self.layers.index(start)
+        g = self.layers.index(goal)
+        self.last_expanded = 0
+        if s == g:
+            return [s]
+
+        start_cluster = self.cluster_of(s)
+        goal_cluster = self.cluster_of(g)
+        start_targets = self.cluster_entrances(start_cluster)
+        if goal_cluster == start_cluster:
+            start_targets.add(g)
+        start_edges, start_tree = self._search(start_cluster, s, start_targets)
+        to_goal, goal_tree = self._search(
+            goal_cluster, g, self.cluster_entrances(goal_cluster), reverse=True
+        )
+        self._query_trees = {(s, False): start_tree, (g, True): goal_tree}
+
+        gx, gy = goal
+        g_score = {s: 0.0}
+        came_from: Dict[int, int] = {}
+        open_set = [(0.0, s)]
+        closed = set()
+        while open_set:
+            _, current = heapq.heappop(open_set)
+            if current in closed:
+                continue
+            closed.add(current)
+            self.last_expanded += 1
+            if current == g:
+                path = [current]
+                while current in came_from:
+                    current = came_from[current]
+                    path.append(current)
+                return path[::-1]
+
+            if current == s:
+                edges = [(n, c) for n, c in start_edges.items() if n != s]
+            else:
+                edges = list(self._entrance_edges(current))
+                if current in to_goal:
+                    edges.append((g, to_goal[current]))
+            edges.extend((n, c) for n, c, _ in self._inter.get(current, ()))
+
+            current_g = g_score[current]
+            for neighbor, step in edges:
+                tentative = current_g + step
+                if tentative < g_score.get(neighbor, float("inf")):
+                    g_score[neighbor] = tentative
+                    came_from[neighbor] = current
+                    nx, ny = divmod(neighbor, size)
+                    # every step costs at least 1, so Chebyshev distance is a
+                    # lower bound on the remaining cost
+                    h = max(abs(nx - gx), abs(ny - gy))
+                    heapq.heappush(open_set, (tentative + h, neighbor))
+
+        return []
+
+    def _segment(self, a: int, b: int) -> List[int]:
+        # tiles after a up to b, both in the same cluster
+        tree = self._query_trees.get((b, True))
+        if tree is not None and a in tree:
+            segment = []
+            current = a
+            while current != b:
+                current = tree[current]
+                segment.append(current)
+            return segment
+
+        tree = self._query_trees.get((a, False))
+        if tree is None or b not in tree:
+            cluster = self.cluster_of(a)
+            tree = self._trees.get(cluster, {}).get(a)
+            if tree is None or b not in tree:
+                _, tree = self._search(cluster, a, {b})
+        segment = [b]
+        while segment[-1] != a:
+            segment.append(tree[segment[-1]])
+        return segment[-2::-1]
+
+    def refine(
+        self, abstract_path: List[int], segments: Optional[int] = None, first: int = 0
+    ) -> List[Position]:
+        # tile path of ``segments`` hops of the abstract path starting at hop
+        # ``first``, so a route can be refined a stretch at a time
+        size = self.layers.size
+        if not abstract_path[first:]:
+            return []
+        path = [divmod(abstract_path[first], size)]
+        hops = list(zip(abstract_path[first:], abstract_path[first + 1 :]))
+        if segments is not None:
+            hops = hops[:segments]
+        for a, b in hops:
+            if self.cluster_of(a) != self.cluster_of(b):
+                path.append(divmod(b, size))
+                continue
+            path.extend(divmod(i, size) for i in self._segment(a, b))
+        return path
+
+    def find_path(self, start: Position, goal: Position) -> List[Position]:
+        return self.refine(self.find_abstract_path(start, goal))
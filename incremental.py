@@ -0,0 +1,192 @@
+import heapq
+from typing import Dict, Iterable, List, Tuple, TYPE_CHECKING
+
+from terrain import DIRECTIONS, INF
+
+if TYPE_CHECKING:
+    from terrain import TerrainLayers
+
+Position = Tuple[int, int]
+Key = Tuple[float, float]
+
+
+class DStarLite:
+    """
+    D* Lite planner that keeps its search state between calls. The search
+    runs backward from the goal, so the unit can advance along the route
+    (``move_to``) and tiles can change under it (``tiles_changed``) without
+    starting over: the next ``find_path`` only repairs the part of the
+    search that the change actually touched.
+
+    Edge costs are read from the map's terrain layers at call time, so the
+    layers must already reflect a change before it is reported here.
+    """
+
+    def __init__(
+        self,
+        layers: "TerrainLayers",
+        start: Position,
+        goal: Position,
+        unit_weight: float = 1.0,
+        stealth_priority: float = 0.0,
+    ):
+        self.layers = layers
+        self.unit_weight = unit_weight
+        self.stealth_priority = stealth_priority
+        self.start = layers.index(start)
+        self.goal = layers.index(goal)
+
+        self.g: Dict[int, float] = {}
+        self.rhs: Dict[int, float] = {self.goal: 0.0}
+        self._open: List[Tuple[Key, int]] = []
+        self._open_keys: Dict[int, Key] = {}
+        self.km = 0.0
+
+        # set when a reported change may have invalidated the current route
+        self.dirty = True
+        self.expanded = 0
+        self._push(self.goal)
+
+    def heuristic(self, a: int, b: int) -> float:
+        # every step costs at least 1, so Chebyshev distance never overestimates
+        ax, ay = divmod(a, self.layers.size)
+        bx, by = divmod(b, self.layers.size)
+        return max(abs(ax - bx), abs(ay - by))
+
+    def key(self, index: int) -> Key:
+        best = min(self.g.get(index, INF), self.rhs.get(index, INF))
+        return (best + self.heuristic(self.start, index) + self.km, best)
+
+    def _push(self, index: int):
+        key = self.key(index)
+        self._open_keys[index] = key
+        heapq.heappush(self._open, (key, index))
+
+    def _top(self):
+        # drop heap entries that were superseded or removed
+        while self._open:
+            key, index = self._open[0]
+            if self._open_keys.get(index) == key:
+                return key, index
+            heapq.heappop(self._open)
+        return (INF, INF), -1
+
+    def _successors(self, index: int, costs, ready, fill):
+        if not ready[index]:
+            fill(index)
+        offsets = self.layers.offsets
+        base = index * 8
+        for d in range(8):
+            step = costs[base + d]
+            if step != INF:
+                yield index + offsets[d], step
+
+    def _predecessors(self, index: int, costs, ready, fill):
+        size = self.layers.size
+        x, y = divmod(index, size)
+        for d, (dx, dy) in enumerate(DIRECTIONS):
+            px, py = x - dx, y - dy
+            if not (0 <= px < size and 0 <= py < size):
+                continue
+            previous = px * size + py
+            if not ready[previous]:
+                fill(previous)
+            step = costs[previous * 8 + d]
+            if step != INF:
+                yield previous, step
+
+    def _update_vertex(self, index: int, costs, ready, fill):
+        if index != self.goal:
+            g = self.g
+            best = INF
+            for successor, step in self._successors(index, costs, ready, fill):
+                candidate = step + g.get(successor, INF)
+                if candidate < best:
+                    best = candidate
+            self.rhs[index] = best
+        if self.g.get(index, INF) != self.rhs.get(index, INF):
+            self._push(index)
+        else:
+            self._open_keys.pop(index, None)
+
+    def _compute(self):
+        edges = self.layers.edge_costs(self.unit_weight, self.stealth_priority)
+        costs, ready, fill = edges.costs, edges.ready, edges.fill
+        g = self.g
+        rhs = self.rhs
+        start = self.start
+        while True:
+            top_key, u = self._top()
+            start_g = g.get(start, INF)
+            start_rhs = rhs.get(start, INF)
+            if u == -1 or (top_key >= self.key(start) and start_g == start_rhs):
+                break
+            heapq.heappop(self._open)
+            del self._open_keys[u]
+            self.expanded += 1
+
+            new_key = self.key(u)
+            if top_key < new_key:
+                self._push(u)
+            elif g.get(u, INF) > rhs.get(u, INF):
+                g[u] = rhs[u]
+                for previous, _ in self._predecessors(u, costs, ready, fill):
+                    self._update_vertex(previous, costs, ready, fill)
+            else:
+                g[u] = INF
+                self._update_vertex(u, costs, ready, fill)
+                for previous, _ in self._predecessors(u, costs, ready, fill):
+                    self._update_vertex(previous, costs, ready, fill)
+
+    def find_path(self) -> List[Position]:
+        self._compute()
+        self.dirty = False
+        size = self.layers.size
+        if self.g.get(self.start, INF) == INF:
+            return []
+
+        edges = self.layers.edge_costs(self.unit_weight, self.stealth_priority)
+        costs, ready, fill = edges.costs, edges.ready, edges.fill
+        g = self.g
+        current = self.start
+        path = [divmod(current, size)]
+        seen = {current}
+        while current != self.goal:
+            best, best_cost = -1, INF
+            for successor, step in self._successors(current, costs, ready, fill):
+                candidate = step + g.get(successor, INF)
+                if candidate < best_cost:
+                    best, best_cost = successor, candidate
+            if best == -1 or best in seen:
+                return []
+            seen.add(best)
+            current = best
+            path.append(divmod(current, size))
+        return path
+
+    def move_to(self, position: Position):
+        index = self.layers.index(position)
+        self.km += self.heuristic(self.start, index)
+        self.start = index
+
+    def tiles_changed(self, positions: Iterable[Position]):
+        size = self.layers.size
+        edges = self.layers.edge_costs(self.unit_weight, self.stealth_priority)
+        costs, ready, fill = edges.costs, edges.ready, edges.fill
+        touched = set()
+        for x, y in positions:
+            # the tile's own out-edges and every edge into it changed
+            around = [
+                nx * size + ny
+                for nx in (x - 1, x, x + 1)
+                for ny in (y - 1, y, y + 1)
+                if 0 <= nx < size and 0 <= ny < size
+            ]
+            # nothing near an unexplored tile can affect the current search
+            if any(i in self.rhs or i in self.g for i in around):
+                touched.update(around)
+        if not touched:
+            return
+        for index in touched:
+            self._update_vertex(index, costs, ready, fill)
+        self.dirty = True
@@ -0,0 +1,202 @@
+import hashlib
+import os
+import pickle
+import random
+import shutil
+import types
+from typing import Any, Callable, List, Optional, Sequence, Set, Tuple
+
+from map_format import open_terrain, save_terrain
+from terrain import TerrainLayers
+
+# bump when the entry layout or the meaning of a stored layer changes
+CACHE_FORMAT = 4
+
+TERRAIN_FILE = "terrain.omap"
+
+
+def _code_parts(code: types.CodeType) -> List[bytes]:
+    # bytecode and constants only; file names and line numbers are left out
+    # so that moving a function around does not invalidate its maps
+    parts = [code.co_code, repr(code.co_names).encode()]
+    for const in code.co_consts:
+        if isinstance(const, types.CodeType):
+            parts.extend(_code_parts(const))
+        else:
+            parts.append(repr(const).encode())
+    return parts
+
+
+def _global_names(code: types.CodeType) -> List[str]:
+    names = list(code.co_names)
+    for const in code.co_consts:
+        if isinstance(const, types.CodeType):
+            names.extend(_global_names(const))
+    return names
+
+
+class UnseededGeneration(ValueError):
+    # the generation function draws from a random state shared across calls
+    pass
+
+
+def _shared_random(value: Any, names: Sequence[str]) -> bool:
+    if isinstance(value, random.Random):
+        return True
+    if isinstance(getattr(value, "__self__", None), random.Random):
+        # random.uniform and friends are methods of one shared instance
+        return True
+    if isinstance(value, types.ModuleType):
+        if value is random:
+            return True
+        # numpy.random reached through its package, as in np.random.uniform
+        inner = getattr(value, "random", None)
+        return isinstance(inner, types.ModuleType) and "random" in names
+    return False
+
+
+def _value_parts(value: Any, seen: Set[int]) -> List[bytes]:
+    if isinstance(value, types.ModuleType):
+        return [value.__name__.encode()]
+    if isinstance(value, types.FunctionType):
+        return function_fingerprint(value, seen)
+    return [repr(value).encode()]
+
+
+def function_fingerprint(
+    func: Callable, seen: Optional[Set[int]] = None
+) -> List[bytes]:
+    # also covers the values of the globals and closure cells the function
+    # reads, so that retuning a module-level constant gives a new key;
+    # functions it calls are fingerprinted in turn. Raises
+    # UnseededGeneration when any of them reads a shared random state, as
+    # such a function gives a different map on every call
+    if seen is None:
+        seen = set()
+    if id(func) in seen:
+        return [func.__qualname__.encode()]
+    seen.add(id(func))
+    code = func.__code__
+    names = _global_names(code)
+    parts = _code_parts(code)
+    parts.append(repr(func.__defaults__).encode())
+    values = [cell.cell_contents for cell in func.__closure__ or ()]
+    namespace = func.__globals__
+    for name in sorted(set(names)):
+        if name in namespace:
+            parts.append(name.encode())
+            values.append(namespace[name])
+    for value in values:
+        if _shared_random(value, names):
+            raise UnseededGeneration(func.__qualname__)
+        parts.extend(_value_parts(value, seen))
+    return parts
+
+
+def generation_key(
+    size: int,
+    height_func: Callable,
+    points_of_interest: Sequence[Tuple[int, int]],
+    seed: Optional[int],
+    array_generation: bool,
+) -> Optional[str]:
+    # None when the map cannot be cached: without a seed, or with a
+    # generation function that rolls a shared random state, the same
+    # parameters do not give the same map
+    if seed is None:
+        return None
+    try:
+        fingerprint = function_fingerprint(height_func)
+    except UnseededGeneration:
+        return None
+    digest = hashlib.sha256()
+    header = (CACHE_FORMAT, size, tuple(points_of_interest), seed, array_generation)
+    digest.update(repr(header).encode())
+    for part in fingerprint:
+        digest.update(len(part).to_bytes(8, "little"))
+        digest.update(part)
+    return digest.hexdigest()
+
+
+class MapCache:
+    """
+    Directory of generated maps keyed by a hash of their generation
+    parameters. Each entry holds the terrain in the binary map format plus
+    any derived layers stored next to it (pickled under a name). Entries
+    are touched on every read and the least recently used ones are removed
+    once the directory grows past ``max_bytes``.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = 512 * 2**20):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    def _entry(self, key: str) -> str:
+        return os.path.join(self.directory, key)
+
+    def _path(self, key: str, name: str) -> str:
+        return os.path.join(self._entry(key), name)
+
+    def _touch(self, key: str):
+        os.utime(self._entry(key))
+
+    def _write(self, key: str, name: str, write: Callable[[str], None]):
+        os.makedirs(self._entry(key), exist_ok=True)
+        path = self._path(key, name)
+        # readers never see a half-written file
+        temporary = f"{path}.{os.getpid()}.tmp"
+        write(temporary)
+        os.replace(temporary, path)
+        self._touch(key)
+        self.evict(keep=key)
+
+    def load_terrain(self, key: str) -> Optional[TerrainLayers]:
+        path = self._path(key, TERRAIN_FILE)
+        if not os.path.exists(path):
+            return None
+        self._touch(key)
+        return open_terrain(path)
+
+    def store_terrain(self, key: str, terrain: TerrainLayers):
+        self._write(key, TERRAIN_FILE, lambda path: save_terrain(terrain, path))
+
+    def load(self, key: str, name: str) -> Optional[Any]:
+        path = self._path(key, name)
+        if not os.path.exists(path):
+            return None
+        self._touch(key)
+        with open(path, "rb") as f:
+            return pickle.load(f)
+
+    def store(self, key: str, name: str, value: Any):
+        def write(path: str):
+            with open(path, "wb") as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+        self._write(key, name, write)
+
+    def entry_sizes(self) -> List[Tuple[float, int, str]]:
+        # (last used, bytes, key) for every entry
+        entries = []
+        for key in os.listdir(self.directory):
+            entry = self._entry(key)
+            if not os.path.isdir(entry):
+                continue
+            size = sum(
+                os.path.getsize(os.path.join(entry, name))
+                for name in os.listdir(entry)
+            )
+            entries.append((os.path.getmtime(entry), size, key))
+        return entries
+
+    def evict(self, keep: Optional[str] = None):
+        entries = sorted(self.entry_sizes())
+        total = sum(size for _, size, _ in entries)
+        for _, size, key in entries:
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            shutil.rmtree(self._entry(key), ignore_errors=True)
+            total -= size
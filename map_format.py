@@ -0,0 +1,144 @@
+"""
+Binary map files: a fixed header, a table of layers, then one fixed-width
+array per layer stored in x * size + y order. Files are opened with a
+private (copy-on-write) memory map, so loading only reads the pages that
+are touched and edits never reach the file.
+
+    header  magic, version, byte order, size, layer count
+    table   per layer: name, typecode, item size, data offset
+    data    each layer's cells, every layer 8-byte aligned
+"""
+
+import json
+import mmap
+import struct
+import sys
+from array import array
+from typing import Dict, Sequence
+
+from terrain import LAYERS, TerrainLayers
+
+MAGIC = b"OMENMAP\0"
+FORMAT_VERSION = 1
+
+HEADER = struct.Struct("<8sHcxII")
+LAYER_ENTRY = struct.Struct("<16scxHQ")
+
+# layers written to map files; occupation is game state, not terrain
+MAP_LAYERS = tuple(name for name in LAYERS if name != "occupation")
+TYPECODES = {name: "B" if name == "water" else "i" for name in MAP_LAYERS}
+BYTE_ORDER = b"<" if sys.byteorder == "little" else b">"
+
+
+class MapFormatError(ValueError):
+    pass
+
+
+def _align(offset: int) -> int:
+    return -(-offset // 8) * 8
+
+
+def _layer_bytes(layer: Sequence[int], typecode: str) -> bytes:
+    if isinstance(layer, (array, bytearray, memoryview)):
+        return memoryview(layer).tobytes()
+    # chunked layers have no buffer of their own
+    return array(typecode, (layer[i] for i in range(len(layer)))).tobytes()
+
+
+def is_binary_map(filename: str) -> bool:
+    with open(filename, "rb") as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+def save_terrain(terrain: TerrainLayers, filename: str):
+    offset = _align(HEADER.size + LAYER_ENTRY.size * len(MAP_LAYERS))
+    entries = []
+    blobs = []
+    for name in MAP_LAYERS:
+        typecode = TYPECODES[name]
+        itemsize = array(typecode).itemsize
+        entries.append(
+            LAYER_ENTRY.pack(name.encode(), typecode.encode(), itemsize, offset)
+        )
+        blob = _layer_bytes(getattr(terrain, name), typecode)
+        blobs.append((offset, blob))
+        offset = _align(offset + len(blob))
+
+    with open(filename, "wb") as f:
+        f.write(
+            HEADER.pack(
+                MAGIC, FORMAT_VERSION, BYTE_ORDER, terrain.size, len(MAP_LAYERS)
+            )
+        )
+        for entry in entries:
+            f.write(entry)
+        for offset, blob in blobs:
+            f.write(b"\0" * (offset - f.tell()))
+            f.write(blob)
+
+
+def open_terrain(filename: str) -> TerrainLayers:
+    with open(filename, "rb") as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+
+    if len(mapped) < HEADER.size:
+        raise MapFormatError(f"{filename}: truncated header")
+    magic, version, byte_order, size, layer_count = HEADER.unpack_from(mapped)
+    if magic != MAGIC:
+        raise MapFormatError(f"{filename}: not a binary map file")
+    if version != FORMAT_VERSION:
+        raise MapFormatError(f"{filename}: unsupported format version {version}")
+    if byte_order != BYTE_ORDER:
+        raise MapFormatError(f"{filename}: written with the other byte order")
+
+    cell_count = size * size
+    view = memoryview(mapped)
+    layers: Dict[str, Sequence[int]] = {}
+    for i in range(layer_count):
+        raw_name, raw_typecode, itemsize, offset = LAYER_ENTRY.unpack_from(
+            mapped, HEADER.size + i * LAYER_ENTRY.size
+        )
+        name = raw_name.rstrip(b"\0").decode()
+        typecode = raw_typecode.decode()
+        if name not in TYPECODES:
+            # layers added by later writers are skipped
+            continue
+        if typecode != TYPECODES[name] or itemsize != array(typecode).itemsize:
+            raise MapFormatError(f"{filename}: layer {name} has an unexpected type")
+        end = offset + cell_count * itemsize
+        if end > len(mapped):
+            raise MapFormatError(f"{filename}: layer {name} is truncated")
+        layers[name] = view[offset:end].cast(typecode)
+
+    missing = set(MAP_LAYERS) - set(layers)
+    if missing:
+        raise MapFormatError(f"{filename}: missing layers {sorted(missing)}")
+    layers["occupation"] = array("H", [0]) * cell_count
+    return TerrainLayers.wrap(size, layers)
+
+
+def read_json_lines(filename: str, size: int) -> TerrainLayers:
+    # the original save_map format, one JSON object per tile
+    terrain = TerrainLayers(size)
+    with open(filename) as f:
+        for line in f:
+            data = json.loads(line)
+            i = terrain.index((data["x"], data["y"]))
+            terrain.maneuver[i] = data["maneuver"]
+            terrain.elevation[i] = data["elevation"]
+            terrain.concealment[i] = data["concealment"]
+            terrain.fuel[i] = data["fuel"]
+            terrain.manpower[i] = data["manpower"]
+            terrain.resources[i] = data["resources"]
+            terrain.water[i] = 1 if data.get("isWater", False) else 0
+    return terrain
+
+
+def convert_json_lines(source: str, destination: str, size: int):
+    save_terrain(read_json_lines(source, size), destination)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 4:
+        sys.exit("usage: python map_format.py MAP.jsonl MAP.omap SIZE")
+    convert_json_lines(sys.argv[1], sys.argv[2], int(sys.argv[3]))
@@ -0,0 +1,175 @@
+from array import array
+from typing import List, TYPE_CHECKING, Union
+
+from terrain import DIRECTIONS, EdgeCosts
+
+if TYPE_CHECKING:
+    from terrain import TerrainLayers
+
+
+class NeighborGraph:
+    """
+    Adjacency of the map in compressed sparse row form: the neighbors of
+    cell ``i`` are ``indices[indptr[i]:ends[i]]``, listed in ``DIRECTIONS``
+    order (only the first four with ``diagonal=False``). Each row has room
+    for every on-map step, ``indptr[i + 1]`` being where the next row
+    starts, so a row is rewritten in place when water around it changes.
+    Costs are not kept here: ``cost_slots[e]`` is where edge ``e`` sits in
+    the terrain's ``EdgeCosts`` tables (``i * 8`` plus its ``DIRECTIONS``
+    index), so every planner reads and invalidates the same costs.
+
+    Steps onto water are left out. Steps off it are kept, as units may
+    stand on water, so water cells still have out-edges.
+    """
+
+    def __init__(self, layers: "TerrainLayers", diagonal: bool = True):
+        self.layers = layers
+        self.diagonal = diagonal
+        size = layers.size
+        water = layers.water
+        directions = DIRECTIONS if diagonal else DIRECTIONS[:4]
+
+        steps = list(enumerate(dx * size + dy for dx, dy in directions))
+        indptr = array("i", [0]) * (size * size + 1)
+        ends = array("i", [0]) * (size * size)
+        indices: List[int] = []
+        cost_slots: List[int] = []
+        for x in range(size):
+            border_row = x == 0 or x == size - 1
+            for y in range(size):
+                index = x * size + y
+                if border_row or y == 0 or y == size - 1:
+                    room = 0
+                    for slot, (dx, dy) in enumerate(directions):
+                        nx, ny = x + dx, y + dy
+                        if 0 <= nx < size and 0 <= ny < size:
+                            room += 1
+                            neighbor = nx * size + ny
+                            if not water[neighbor]:
+                                indices.append(neighbor)
+                                cost_slots.append(index * 8 + slot)
+                else:
+                    # every step from an inner cell stays on the map
+                    room = len(steps)
+                    for slot, offset in steps:
+                        if not water[index + offset]:
+                            indices.append(index + offset)
+                            cost_slots.append(index * 8 + slot)
+                ends[index] = len(indices)
+                unused = indptr[index] + room - len(indices)
+                indices.extend([-1] * unused)
+                cost_slots.extend([-1] * unused)
+                indptr[index + 1] = len(indices)
+        self.indptr = indptr
+        self.ends = ends
+        self.indices = array("i", indices)
+        self.cost_slots = array("i", cost_slots)
+        # water as it was when the rows were last laid out
+        self.water = bytearray(water)
+
+    def state(self) -> dict:
+        return {
+            "indptr": self.indptr,
+            "ends": self.ends,
+            "indices": self.indices,
+            "cost_slots": self.cost_slots,
+            "water": self.water,
+        }
+
+    @classmethod
+    def from_state(
+        cls, layers: "TerrainLayers", diagonal: bool, state: dict
+    ) -> "NeighborGraph":
+        # rows saved with ``state`` for the same, unedited terrain
+        graph = cls.__new__(cls)
+        graph.layers = layers
+        graph.diagonal = diagonal
+        graph.indptr = state["indptr"]
+        graph.ends = state["ends"]
+        graph.indices = state["indices"]
+        graph.cost_slots = state["cost_slots"]
+        graph.water = state["water"]
+        return graph
+
+    def neighbors(self, index: int) -> List[int]:
+        return self.indices[self.indptr[index] : self.ends[index]].tolist()
+
+    def edge_costs(self, unit_weight: float, stealth_priority: float) -> EdgeCosts:
+        return self.layers.edge_costs(unit_weight, stealth_priority)
+
+    def _lay_out(self, index: int):
+        size = self.layers.size
+        water = self.layers.water
+        x, y = divmod(index, size)
+        edge = self.indptr[index]
+        directions = DIRECTIONS if self.diagonal else DIRECTIONS[:4]
+        for slot, (dx, dy) in enumerate(directions):
+            nx, ny = x + dx, y + dy
+            if 0 <= nx < size and 0 <= ny < size and not water[nx * size + ny]:
+                self.indices[edge] = nx * size + ny
+                self.cost_slots[edge] = index * 8 + slot
+                edge += 1
+        self.ends[index] = edge
+
+    def tile_changed(self, index: int):
+        # only water moves edges, and only those of the cells next to it;
+        # their costs are repriced through the terrain's EdgeCosts
+        water = self.layers.water[index]
+        if self.water[index] == water:
+            return
+        self.water[index] = water
+        for cell in self.layers.around(index):
+            self._lay_out(cell)
+
+
+class _DenseIndices:
+    # neighbor of every (cell, slot) edge, computed on access
+
+    __slots__ = ("offsets",)
+
+    def __init__(self, offsets: List[int]):
+        self.offsets = offsets
+
+    def __getitem__(self, edge: int) -> int:
+        index, slot = divmod(edge, 8)
+        return index + self.offsets[slot]
+
+
+class DenseGraph:
+    """
+    ``NeighborGraph`` stand-in for chunked terrain, where laying out the
+    rows up front would generate every chunk. Every cell gets all eight
+    ``DIRECTIONS`` slots, edge ``e`` being entry ``e`` of the cost tables,
+    so steps off the map or onto water cost ``INF``.
+    """
+
+    def __init__(self, layers: "TerrainLayers", diagonal: bool = True):
+        self.layers = layers
+        self.diagonal = diagonal
+        self.indptr = range(0, 8 * layers.size * layers.size + 1, 8)
+        self.ends = range(8, 8 * layers.size * layers.size + 1, 8)
+        self.indices = _DenseIndices(layers.offsets)
+        self.cost_slots = range(8 * layers.size * layers.size)
+
+    def neighbors(self, index: int) -> List[int]:
+        size = self.layers.size
+        water = self.layers.water
+        x, y = divmod(index, size)
+        found = []
+        for dx, dy in DIRECTIONS if self.diagonal else DIRECTIONS[:4]:
+            nx, ny = x + dx, y + dy
+            if 0 <= nx < size and 0 <= ny < size and not water[nx * size + ny]:
+                found.append(nx * size + ny)
+        return found
+
+    def edge_costs(self, unit_weight: float, stealth_priority: float) -> EdgeCosts:
+        return self.layers.edge_costs(unit_weight, stealth_priority)
+
+    def tile_changed(self, index: int):
+        # water is read on every step, nothing is laid out in advance
+        pass
+
+
+# what GameMap.neighbor_graph hands out, depending on whether the map is
+# chunked
+Graph = Union[NeighborGraph, DenseGraph]
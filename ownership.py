@@ -0,0 +1,172 @@
+from collections.abc import Set as AbstractSet
+from typing import Iterator, List, Tuple, TYPE_CHECKING
+
+try:
+    import numpy as np
+
+    HAVE_NUMPY = True
+except ImportError:  # owned cells are found by scanning the owner's bounds
+    HAVE_NUMPY = False
+
+if TYPE_CHECKING:
+    from terrain import Occupation, TerrainLayers
+
+Position = Tuple[int, int]
+
+# owner id of tiles no region holds
+UNOWNED = 0
+
+
+class Ownership:
+    """
+    Who holds each tile, for every region at once. The terrain's
+    ``occupation`` layer is the raster: each cell holds an owner id into
+    the terrain's ``occupants`` table of ``(side, region_id)`` pairs, so a
+    tile costs two bytes whatever its owner and the side comes with the id.
+
+    Every change of hands goes through ``set_owner``, which keeps each
+    owner's area, coordinate sums and bounding box, so areas and centroids
+    are O(1). Listing an owner's cells or the borders between owners reads
+    the raster as a numpy array when numpy is available.
+    """
+
+    def __init__(self, layers: "TerrainLayers"):
+        # a fresh raster, every cell unowned
+        self.layers = layers
+        self.size = size = layers.size
+        self.areas: List[int] = [size * size]
+        total = size * (size - 1) // 2 * size
+        self.sums_x: List[int] = [total]
+        self.sums_y: List[int] = [total]
+        # (x0, y0, x1, y1) around every cell an owner ever held
+        self.bounds: List[List[int]] = [[0, 0, size - 1, size - 1]]
+
+    def owner_id(self, occupation: "Occupation") -> int:
+        owner = self.layers.occupant_id(occupation)
+        while len(self.areas) <= owner:
+            self.areas.append(0)
+            self.sums_x.append(0)
+            self.sums_y.append(0)
+            self.bounds.append([self.size, self.size, -1, -1])
+        return owner
+
+    def owner(self, position: Position) -> int:
+        x, y = position
+        if not (0 <= x < self.size and 0 <= y < self.size):
+            return UNOWNED
+        return self.layers.occupation[x * self.size + y]
+
+    def side(self, owner: int):
+        return self.layers.occupants[owner][0]
+
+    def set_owner(self, position: Position, owner: int) -> int:
+        # returns the previous owner
+        x, y = position
+        index = x * self.size + y
+        previous = self.layers.occupation[index]
+        if previous == owner:
+            return previous
+        self.layers.occupation[index] = owner
+        self.areas[previous] -= 1
+        self.sums_x[previous] -= x
+        self.sums_y[previous] -= y
+        self.areas[owner] += 1
+        self.sums_x[owner] += x
+        self.sums_y[owner] += y
+        bounds = self.bounds[owner]
+        bounds[0] = min(bounds[0], x)
+        bounds[1] = min(bounds[1], y)
+        bounds[2] = max(bounds[2], x)
+        bounds[3] = max(bounds[3], y)
+        return previous
+
+    def centroid(self, owner: int) -> Position:
+        # mean position, floored like the coordinates it averages
+        area = self.areas[owner]
+        return self.sums_x[owner] // area, self.sums_y[owner] // area
+
+    def _raster(self):
+        if not HAVE_NUMPY:
+            return None
+        try:
+            grid = np.frombuffer(self.layers.occupation, dtype=np.uint16)
+        except TypeError:
+            # chunked layers have no buffer of their own
+            return None
+        return grid.reshape(self.size, self.size)
+
+    def cells(self, owner: int) -> List[int]:
+        # indices of the owner's cells, in index order
+        if not self.areas[owner]:
+            return []
+        x0, y0, x1, y1 = self.bounds[owner]
+        size = self.size
+        grid = self._raster()
+        if grid is not None:
+            xs, ys = np.nonzero(grid[x0 : x1 + 1, y0 : y1 + 1] == owner)
+            return ((xs + x0) * size + ys + y0).tolist()
+        occupation = self.layers.occupation
+        found = []
+        for x in range(x0, x1 + 1):
+            row = x * size
+            for y in range(y0, y1 + 1):
+                if occupation[row + y] == owner:
+                    found.append(row + y)
+        return found
+
+    def borders(self) -> List[int]:
+        # owned cells with a 4-neighbor held by someone else, every owner
+        size = self.size
+        grid = self._raster()
+        if grid is not None:
+            edge = np.zeros((size, size), dtype=bool)
+            differs = grid[1:, :] != grid[:-1, :]
+            edge[1:, :] |= differs
+            edge[:-1, :] |= differs
+            differs = grid[:, 1:] != grid[:, :-1]
+            edge[:, 1:] |= differs
+            edge[:, :-1] |= differs
+            edge &= grid != UNOWNED
+            return np.flatnonzero(edge).tolist()
+        occupation = self.layers.occupation
+        found = []
+        for owner in range(1, len(self.areas)):
+            for index in self.cells(owner):
+                x, y = divmod(index, size)
+                for nx, ny in ((x + 1, y), (x - 1, y), (x, y + 1), (x, y - 1)):
+                    if 0 <= nx < size and 0 <= ny < size:
+                        if occupation[nx * size + ny] != owner:
+                            found.append(index)
+                            break
+        found.sort()
+        return found
+
+
+class OwnedTiles(AbstractSet):
+    """
+    Read-only set of the positions one owner holds, backed by the
+    ``Ownership`` raster; tiles change hands through ``Tile.occupation``.
+    Iteration runs in index order, x then y, whatever order the tiles were
+    taken in, so scans over a region's tiles are reproducible.
+    """
+
+    __slots__ = ("ownership", "owner")
+
+    def __init__(self, ownership: Ownership, owner: int):
+        self.ownership = ownership
+        self.owner = owner
+
+    def __contains__(self, position) -> bool:
+        return self.ownership.owner(position) == self.owner
+
+    def __len__(self) -> int:
+        return self.ownership.areas[self.owner]
+
+    def __iter__(self) -> Iterator[Position]:
+        size = self.ownership.size
+        return (divmod(index, size) for index in self.ownership.cells(self.owner))
+
+    @classmethod
+    def _from_iterable(cls, positions):
+        # set operations give plain sets
+        return set(positions)
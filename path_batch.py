@@ -0,0 +1,95 @@
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Sequence, Tuple, TYPE_CHECKING
+
+from a_star import GridAStar
+from heuristics import Landmarks
+from neighbors import NeighborGraph
+
+if TYPE_CHECKING:
+    from terrain import TerrainLayers
+
+Position = Tuple[int, int]
+# (start, goal, unit_weight, stealth_priority, heuristic)
+PathRequest = Tuple[Position, Position, float, float, str]
+
+
+class TerrainSnapshot:
+    # read-only stand-in for GameMap inside worker processes; the grid
+    # planners only ever read ``terrain``, ``size``, ``neighbor_graph`` and
+    # ``landmarks``
+
+    def __init__(self, terrain: "TerrainLayers"):
+        self.terrain = terrain
+        self.size = terrain.size
+        self._landmarks: Dict[Tuple[float, float], Landmarks] = {}
+        self._graph: Optional[NeighborGraph] = None
+
+    def neighbor_graph(self) -> NeighborGraph:
+        if self._graph is None:
+            self._graph = NeighborGraph(self.terrain)
+        return self._graph
+
+    def landmarks(self, unit_weight=1.0, stealth_priority=0.0) -> Landmarks:
+        # built once per worker for the lifetime of the snapshot
+        key = (unit_weight, stealth_priority)
+        if key not in self._landmarks:
+            self._landmarks[key] = Landmarks(self.terrain, *key)
+        return self._landmarks[key]
+
+
+_worker_map: Optional[TerrainSnapshot] = None
+
+
+def _init_worker(terrain: "TerrainLayers"):
+    global _worker_map
+    _worker_map = TerrainSnapshot(terrain)
+
+
+def _plan(request: PathRequest) -> Tuple[List[Position], int]:
+    planner = GridAStar(_worker_map, *request)
+    return planner.find_path(), planner.expanded
+
+
+class PathWorkerPool:
+    """
+    Process pool that plans independent path requests against a snapshot of
+    the terrain layers. The pool is kept between batches and restarted only
+    when the terrain version moves on. Every request is planned on its own,
+    so results do not depend on the worker count or on scheduling.
+
+    The worker processes live until ``shutdown``; the pool can also be used
+    as a context manager.
+    """
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._version: Optional[int] = None
+
+    def run(
+        self, terrain: "TerrainLayers", version: int, requests: Sequence[PathRequest]
+    ) -> List[Tuple[List[Position], int]]:
+        # (path, nodes expanded) per request
+        if self._executor is None or self._version != version:
+            self.shutdown()
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                initializer=_init_worker,
+                initargs=(terrain.snapshot(),),
+            )
+            self._version = version
+        chunksize = max(1, len(requests) // (self.workers * 4))
+        # map() yields results in submission order
+        return list(self._executor.map(_plan, requests, chunksize=chunksize))
+
+    def __enter__(self) -> "PathWorkerPool":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+            self._version = None
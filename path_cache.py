@@ -0,0 +1,56 @@
+from collections import OrderedDict
+from typing import Dict, Hashable, List, Optional, Tuple
+
+Position = Tuple[int, int]
+
+
+class PathCache:
+    """
+    Bounded LRU cache of planned paths. Every entry is stamped with the
+    terrain version it was planned against and is treated as a miss once
+    the map's version moves on.
+    """
+
+    def __init__(self, max_entries: int = 4096):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, Tuple[int, Tuple[Position, ...]]]" = (
+            OrderedDict()
+        )
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key: Hashable, version: int) -> Optional[List[Position]]:
+        entry = self._entries.get(key)
+        if entry is None or entry[0] != version:
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        # callers consume paths with pop(0), so never hand out the stored one
+        return list(entry[1])
+
+    def put(self, key: Hashable, version: int, path: List[Position]):
+        if self.max_entries <= 0:
+            return
+        self._entries[key] = (version, tuple(path))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+        }
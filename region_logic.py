@@ -1,7 +1,10 @@
-from typing import List, Set, Tuple, Optional, TYPE_CHECKING
+from typing import Dict, List, Set, Tuple, Optional, TYPE_CHECKING
 import math
 from collections import Counter
 
+from enclosure import EnclosureRaster
+from ownership import OwnedTiles
+
 if TYPE_CHECKING:
     from game_map import GameMap
     from unit import Unit
@@ -13,12 +16,6 @@ def max_range(tile_cap: int) -> int:
     return int(math.sqrt(tile_cap / 3.14))
 
 
-def estimated_center(coords):
-    x_avg = sum(x for x, _ in coords) // len(coords)
-    y_avg = sum(y for _, y in coords) // len(coords)
-    return (x_avg, y_avg)
-
-
 class RegionControl:
     def __init__(
         self,
@@ -37,26 +34,61 @@ class RegionControl:
         self.units: List["Unit"] = []
         self.commander: Optional[str] = None  # Could be a unit_id or name
 
-        self.controlled_tiles: Set[Tuple[int, int]] = set()
+        # the region's tiles as held in the map's ownership raster
+        self.owner_id = game_map.ownership.owner_id((side, region_id))
+        self.controlled_tiles = OwnedTiles(game_map.ownership, self.owner_id)
+        # controlled tiles next to uncontrolled land, kept up to date as
+        # tiles change hands
+        self.border_tiles: Dict[Tuple[int, int], None] = {}
+        # answers is_coord_bound, also kept as tiles change hands
+        self.enclosure = EnclosureRaster(game_map.terrain, self.estimated_max_range)
+        # land component -> controlled tiles in it, counted against the
+        # map's labeling in _counted_at and recounted once that moves on
+        self.component_counts: Counter = Counter()
+        self._counted_at: Optional[tuple] = None
 
         self.assigned_positions: Set[Tuple[int, int]] = set()
         self.guarded_positions: Set[Tuple[int, int]] = set()
 
+        game_map.register_region(self)
         for pos in list_of_positions:
             tile = self.map.get_tile(pos)
             self.add_tile(tile)
         self.calibrate_tasking()
 
     def calibrate_tasking(self):
-        self.center = estimated_center(self.controlled_tiles)
+        self.center = self.map.ownership.centroid(self.owner_id)
         self.potential_points_of_interest = self.get_nearest_points_of_interest()
         self.local_direction_weights = self.get_local_direction_weights()
         self.local_paths = list(self.local_direction_weights.keys())
 
+    def owned_components(self) -> Counter:
+        components = self.map.components
+        if self._counted_at != (components, components.version):
+            label = components.label
+            self.component_counts = Counter(
+                label(i) for i in self.map.ownership.cells(self.owner_id)
+            )
+            self._counted_at = (components, components.version)
+        return self.component_counts
+
+    def reachable_components(self) -> Set[int]:
+        # land components that the region's tiles or units can walk within
+        labels = set(self.owned_components())
+        for unit in self.units:
+            index = self.map.terrain.index(unit.position)
+            labels.update(self.map.components.start_labels(index))
+        return labels
+
     def get_nearest_points_of_interest(self):
-        map_points_of_interest = self.map.points_of_interest
         reachable_points = []
-        for point in map_points_of_interest:
+        components = self.reachable_components()
+        # within estimated_max_range of half the Manhattan distance
+        for point in self.map.resource_index.points_in_radius(
+            self.center, 2 * self.estimated_max_range
+        ):
+            if self.map.component_of(point) not in components:
+                continue
             tile = self.map.get_tile(point)
             if (
                 tile.occupation
@@ -64,24 +96,26 @@ class RegionControl:
                 and tile.occupation[1] != self.region_id
             ):
                 continue
-            distance = self.manhattan_distance(self.center, point) / 2
-            if distance <= self.estimated_max_range:
-                reachable_points.append(point)
+            reachable_points.append(point)
 
         return reachable_points
 
     def get_local_direction_weights(self):
+        # how many of the routes between the nearby points of interest cross
+        # each tile. The routes are read off one distance field per point
+        # rather than planned with find_path as units plan theirs: both are
+        # cheapest routes at unit_weight 1.0, but where several routes tie
+        # the field may settle on another one than A*. That only moves the
+        # weight between equally cheap tiles, and saves a search per pair,
+        # so the difference is deliberate
         path_coords = Counter()
         for point in self.potential_points_of_interest:
+            # one search per point covers the paths to every other point
+            field = self.map.distance_field([point], unit_weight=1.0)
             for other_point in self.potential_points_of_interest:
                 if point == other_point:
                     continue
-                path = self.map.find_path(
-                    unit_weight=1.0,
-                    start=point,
-                    goal=other_point,
-                )
-                path_coords.update(path)
+                path_coords.update(field.path_to(other_point))
         return dict(path_coords)
 
     def can_expand(self) -> bool:
@@ -92,13 +126,40 @@ class RegionControl:
             self.tile_cap > len(self.controlled_tiles)
             and tile.position not in self.controlled_tiles
         ):
-            self.controlled_tiles.add(tile.position)
             tile.occupation = (self.side, self.region_id)
             if tile.position in self.assigned_positions:
                 self.assigned_positions.remove(tile.position)
 
     def remove_tile(self, tile: "Tile"):
-        self.controlled_tiles.discard(tile.position)
+        if tile.position in self.controlled_tiles:
+            tile.occupation = (None, None)
+
+    def tile_changed_hands(self, position: Tuple[int, int]):
+        # called by the map when the region gains or loses ``position``
+        gained = position in self.controlled_tiles
+        if gained:
+            self.enclosure.mark(position)
+        else:
+            self.enclosure.unmark(position)
+        components = self.map.components
+        if self._counted_at == (components, components.version):
+            label = components.label(self.map.terrain.index(position))
+            self.component_counts[label] += 1 if gained else -1
+            if not self.component_counts[label]:
+                del self.component_counts[label]
+        self.update_border(position)
+
+    def update_border(self, position: Tuple[int, int]):
+        # ``position`` changed hands, so it and the tiles next to it may have
+        # gained or lost an uncontrolled neighbor, water counting as one
+        x, y = position
+        for pos in ((x, y), (x + 1, y), (x - 1, y), (x, y + 1), (x, y - 1)):
+            if pos in self.controlled_tiles and any(
+                adj not in self.controlled_tiles for adj in self.map.adjacent(pos)
+            ):
+                self.border_tiles[pos] = None
+            else:
+                self.border_tiles.pop(pos, None)
 
     def assign_unit(self, unit: "Unit"):
         if unit not in self.units:
@@ -118,53 +179,42 @@ class RegionControl:
 
     def get_expansion_targets(self) -> List[Tuple[int, int]]:
         frontier = []
-        for pos in self.controlled_tiles:
-            tile = self.map.get_tile(pos)  # tile is a controlled tile
-            for adj in self.map.get_adjacent(tile.position):
-                if adj.position not in self.controlled_tiles:
-                    frontier.append(adj.position)
+        for pos in self.border_tiles:
+            for adj in self.map.adjacent(pos):
+                if adj not in self.controlled_tiles:
+                    frontier.append(adj)
                     break
         return frontier
 
     def is_coord_bound(self, coord):
-        x, y = coord
-
-        # Cast rays in four directions
-        directions = [(1, 0), (-1, 0), (0, 1), (0, -1)]  # Right  # Left  # Down  # Up
-
-        for dx, dy in directions:
-            found_boundary = False
-            for step in range(1, self.estimated_max_range + 1):
-                nx, ny = x + dx * step, y + dy * step
-                if (nx, ny) in self.controlled_tiles:
-                    found_boundary = True
-                    break
-
-            if not found_boundary:
-                return False  # If any ray does not hit a boundary, it's not bound
-
-        return True
+        # controlled tiles within estimated_max_range in all four directions
+        return self.enclosure.enclosed(coord)
 
     def is_near_point_of_interest(self, coord):
-        for point in self.potential_points_of_interest:
-            if self.manhattan_distance(coord, point) / 2 <= 2:
-                return True
-        return False
+        if not self.potential_points_of_interest:
+            return False
+        return any(
+            point in self.potential_points_of_interest
+            for point in self.map.resource_index.points_in_radius(coord, 4)
+        )
 
     def find_expansion_targets(self) -> List[Tuple[float, Tuple[int, int]]]:
         if self.can_expand() is False:
             return []
         frontier = self.get_expansion_targets()
+        components = self.reachable_components()
         candidates: List[Tuple[float, Tuple[int, int]]] = []
         for position in [
             *frontier,
             *self.potential_points_of_interest,
             *self.local_paths,
         ]:
-            tile = self.map.tiles[position[0]][position[1]]
+            tile = self.map.get_tile(position)
 
             if tile.isWater:
                 continue
+            if self.map.component_of(position) not in components:
+                continue
             if tile.position in self.controlled_tiles:
                 continue
             if tile.position in self.assigned_positions:
@@ -182,7 +232,7 @@ class RegionControl:
             if self.is_near_point_of_interest(tile.position):
                 score += 20
 
-            score += tile.fuel + tile.resources + tile.manpower
+            score += self.map.resource_index.value_at(tile.position)
 
             local_weight = self.local_direction_weights.get(tile.position, 0) * 10
 
@@ -230,7 +280,7 @@ class RegionControl:
                 score += 20
 
             # Example scoring logic
-            score += tile.fuel + tile.resources + tile.manpower  # value of the tile
+            score += self.map.resource_index.value_at(pos)  # value of the tile
             score += (
                 tile.concealment_score / 20
             )  # harder to detect unit = better guard post
@@ -364,14 +414,17 @@ class RegionControl:
         all_targets = expansion_targets + guard_targets
         all_targets.sort(reverse=True, key=lambda x: x[0])
 
+        # routes are planned together once every unit has its target
+        assignments: List[Tuple["Unit", Tuple[int, int]]] = []
+
         # Step 2: Assign to available (idle) units first
         for value, position in all_targets:
             if not available_units:
                 break
 
             closest_unit = find_closest_unit(position, available_units)
-            tile = self.map.tiles[position[0]][position[1]]
-            closest_unit.handle_assigned_location(tile.position)
+            tile = self.map.get_tile(position)
+            assignments.append((closest_unit, tile.position))
 
             if (value, position) in expansion_targets:
                 self.assigned_positions.add(tile.position)
@@ -394,8 +447,8 @@ class RegionControl:
                 if closest_unit.defense_position:
                     self.guarded_positions.discard(closest_unit.defense_position)
 
-                tile = self.map.tiles[position[0]][position[1]]
-                closest_unit.handle_assigned_location(tile.position)
+                tile = self.map.get_tile(position)
+                assignments.append((closest_unit, tile.position))
 
                 if (value, position) in expansion_targets:
                     self.assigned_positions.add(tile.position)
@@ -407,4 +460,17 @@ class RegionControl:
 
                 defensive_units.remove(closest_unit)
 
+        if not (self.map.incremental_routes or self.map.budgeted_planning):
+            # warm the path cache in one batch, handle_assigned_location
+            # then picks the routes up from there
+            self.map.find_paths(
+                [
+                    (unit.position, position, unit.armor_rating)
+                    for unit, position in assignments
+                    if not unit.assigned_path and position != unit.position
+                ]
+            )
+        for unit, position in assignments:
+            unit.handle_assigned_location(position)
+
         self.calibrate_tasking()
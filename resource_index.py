@@ -0,0 +1,141 @@
+from typing import Dict, List, Sequence, Tuple, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from terrain import TerrainLayers
+
+Position = Tuple[int, int]
+BucketKey = Tuple[int, int]
+
+
+class ResourceIndex:
+    """
+    Sparse grid index of resource value (``fuel + manpower + resources``)
+    and points of interest. Only tiles with a non-zero value are filed, in
+    ``bucket_size`` square buckets that also keep their total, so radius
+    queries add up whole buckets and only look at tiles in the buckets the
+    radius cuts through.
+
+    A bucket is read from the terrain layers the first time a query touches
+    it, which keeps chunked maps from generating chunks nobody asked about.
+    Later resource edits are reported through ``tile_changed``.
+
+    Distances are Manhattan distances, as used by ``RegionControl``.
+    """
+
+    def __init__(
+        self,
+        layers: "TerrainLayers",
+        points_of_interest: Sequence[Position] = (),
+        bucket_size: int = 8,
+    ):
+        self.layers = layers
+        self.bucket_size = bucket_size
+        # bucket -> {cell index: value} for the tiles with any value
+        self._values: Dict[BucketKey, Dict[int, int]] = {}
+        self._totals: Dict[BucketKey, int] = {}
+        # bucket -> [(order, point)], order being the place in the map's list
+        self._points: Dict[BucketKey, List[Tuple[int, Position]]] = {}
+        for order, point in enumerate(points_of_interest):
+            self._points.setdefault(self._bucket(point), []).append((order, point))
+
+    def _bucket(self, position: Position) -> BucketKey:
+        return position[0] // self.bucket_size, position[1] // self.bucket_size
+
+    def _cell_value(self, index: int) -> int:
+        layers = self.layers
+        return layers.fuel[index] + layers.manpower[index] + layers.resources[index]
+
+    def _scan(self, key: BucketKey) -> Dict[int, int]:
+        size = self.layers.size
+        bucket_size = self.bucket_size
+        values = {}
+        for x in range(key[0] * bucket_size, min((key[0] + 1) * bucket_size, size)):
+            for y in range(
+                key[1] * bucket_size, min((key[1] + 1) * bucket_size, size)
+            ):
+                value = self._cell_value(x * size + y)
+                if value:
+                    values[x * size + y] = value
+        self._values[key] = values
+        self._totals[key] = sum(values.values())
+        return values
+
+    def _bucket_values(self, key: BucketKey) -> Dict[int, int]:
+        values = self._values.get(key)
+        if values is None:
+            values = self._scan(key)
+        return values
+
+    def tile_changed(self, index: int):
+        key = self._bucket(self.layers.position(index))
+        values = self._values.get(key)
+        if values is None:
+            # read when first queried
+            return
+        value = self._cell_value(index)
+        self._totals[key] += value - values.get(index, 0)
+        if value:
+            values[index] = value
+        else:
+            values.pop(index, None)
+
+    def value_at(self, position: Position) -> int:
+        index = self.layers.index(position)
+        return self._bucket_values(self._bucket(position)).get(index, 0)
+
+    def _buckets_in_range(self, center: Position, radius: int):
+        # (bucket, whether every tile of it is within radius)
+        cx, cy = center
+        size = self.layers.size
+        bucket_size = self.bucket_size
+        bx0, by0 = self._bucket((max(cx - radius, 0), max(cy - radius, 0)))
+        bx1, by1 = self._bucket(
+            (min(cx + radius, size - 1), min(cy + radius, size - 1))
+        )
+        for bx in range(bx0, bx1 + 1):
+            x0, x1 = bx * bucket_size, (bx + 1) * bucket_size - 1
+            far_x = max(abs(cx - x0), abs(cx - x1))
+            near_x = max(x0 - cx, cx - x1, 0)
+            for by in range(by0, by1 + 1):
+                y0, y1 = by * bucket_size, (by + 1) * bucket_size - 1
+                near_y = max(y0 - cy, cy - y1, 0)
+                if near_x + near_y > radius:
+                    continue
+                far_y = max(abs(cy - y0), abs(cy - y1))
+                yield (bx, by), far_x + far_y <= radius
+
+    def value_in_radius(self, center: Position, radius: int) -> int:
+        cx, cy = center
+        size = self.layers.size
+        total = 0
+        for key, inside in self._buckets_in_range(center, radius):
+            values = self._bucket_values(key)
+            if inside:
+                total += self._totals[key]
+                continue
+            for index, value in values.items():
+                x, y = divmod(index, size)
+                if abs(x - cx) + abs(y - cy) <= radius:
+                    total += value
+        return total
+
+    def points_in_radius(self, center: Position, radius: int) -> List[Position]:
+        # in the order they were given to the index
+        cx, cy = center
+        points = self._points
+        found = []
+        bucket_size = self.bucket_size
+        by0 = (cy - radius) // bucket_size
+        by1 = (cy + radius) // bucket_size
+        for bx in range(
+            (cx - radius) // bucket_size, (cx + radius) // bucket_size + 1
+        ):
+            for by in range(by0, by1 + 1):
+                bucket = points.get((bx, by))
+                if bucket:
+                    for order, (x, y) in bucket:
+                        if abs(x - cx) + abs(y - cy) <= radius:
+                            found.append((order, (x, y)))
+        if len(found) > 1:
+            found.sort()
+        return [point for _, point in found]
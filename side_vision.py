@@ -0,0 +1,152 @@
+from typing import (
+    Dict,
+    Hashable,
+    List,
+    MutableSequence,
+    Optional,
+    Sequence,
+    Tuple,
+    TYPE_CHECKING,
+)
+
+if TYPE_CHECKING:
+    from terrain import TerrainLayers
+    from unit import Unit
+    from unit_index import UnitIndex
+
+Position = Tuple[int, int]
+
+
+class SideVision:
+    """
+    Fog of war per side: ``counts[side][i]`` is how many of the side's units
+    see cell ``i``. Each unit's last viewshed is kept, so a unit that moved
+    or turned only adds the cells it gained and removes the ones it lost.
+
+    Units of other sides standing on a tile a side sees are tracked as the
+    counts cross zero and as units move, so listing the enemies a side can
+    see costs only the length of the list.
+
+    A unit whose side is None belongs to no side: what it sees is counted
+    for nobody, though the sides still see it as one of another side.
+    """
+
+    def __init__(self, unit_index: "UnitIndex", layers: "TerrainLayers"):
+        self.unit_index = unit_index
+        self.layers = layers
+        self.size = unit_index.size
+        self.counts: Dict[str, MutableSequence[int]] = {}
+        # unit -> (observer key, side, visible cells) it was counted with
+        self.views: Dict["Unit", Tuple[Hashable, Optional[str], Sequence[int]]] = {}
+        # side -> units of other sides on tiles the side sees
+        self.seen: Dict[str, Dict["Unit", None]] = {}
+        # units whose view may have changed since they were last counted
+        self.dirty: Dict["Unit", None] = {}
+        # terrain version the counted views were cast on, apart from the
+        # dirty units
+        self.version: Optional[int] = None
+        # longest vision range of a counted unit
+        self.reach = 0
+
+    def mark(self, unit: "Unit"):
+        self.dirty[unit] = None
+
+    def tile_changed(self, position: Position, version: int):
+        # the terrain moved on to ``version`` by an edit at ``position``;
+        # only units whose view square holds it can see differently
+        if self.version != version - 1:
+            return
+        self.version = version
+        x, y = position
+        reach = self.reach
+        for unit in self.unit_index.in_rect(x - reach, y - reach, x + reach, y + reach):
+            ux, uy = self.unit_index.positions[unit]
+            if max(abs(ux - x), abs(uy - y)) <= unit.vision_range:
+                self.mark(unit)
+
+    def _side(self, side: str) -> MutableSequence[int]:
+        counts = self.counts.get(side)
+        if counts is None:
+            counts = self.layers.cell_table("I", 0)
+            self.counts[side] = counts
+            self.seen[side] = {}
+        return counts
+
+    def view_key(self, unit: "Unit") -> Hashable:
+        return self.views[unit][0] if unit in self.views else None
+
+    def set_view(self, unit: "Unit", key: Hashable, cells: Sequence[int]):
+        side = unit.side
+        old = self.views.get(unit)
+        if old is not None and old[1] != side:
+            # the unit changed sides: its old side no longer sees through
+            # it, and the sides that see it are now another set
+            self._uncount(unit)
+            self._place(unit, self.unit_index.positions[unit])
+            old = None
+        if side is None:
+            # a unit of no side sees for no side; the empty view is kept to
+            # notice it joining one
+            self.views[unit] = (key, side, ())
+            return
+        old_cells = set(old[2]) if old is not None else set()
+        new_cells = set(cells)
+        counts = self._side(side)
+        seen = self.seen[side]
+        size = self.size
+        for i in old_cells - new_cells:
+            counts[i] -= 1
+            if not counts[i]:
+                for other in self.unit_index.at(divmod(i, size), other_than=side):
+                    seen.pop(other, None)
+        for i in new_cells - old_cells:
+            counts[i] += 1
+            if counts[i] == 1:
+                for other in self.unit_index.at(divmod(i, size), other_than=side):
+                    seen[other] = None
+        self.views[unit] = (key, side, cells)
+        self.reach = max(self.reach, unit.vision_range)
+
+    def remove(self, unit: "Unit"):
+        # forget the unit's view and the unit itself
+        self.dirty.pop(unit, None)
+        for seen in self.seen.values():
+            seen.pop(unit, None)
+        self._uncount(unit)
+
+    def _uncount(self, unit: "Unit"):
+        old = self.views.pop(unit, None)
+        if old is None:
+            return
+        _, side, cells = old
+        if side is None:
+            return
+        counts = self.counts[side]
+        seen = self.seen[side]
+        for i in cells:
+            counts[i] -= 1
+            if not counts[i]:
+                for other in self.unit_index.at(divmod(i, self.size), other_than=side):
+                    seen.pop(other, None)
+
+    def _place(self, unit: "Unit", position: Position):
+        # the other sides that see ``position`` see the unit standing there
+        index = position[0] * self.size + position[1]
+        for side, counts in self.counts.items():
+            if side != unit.side and counts[index]:
+                self.seen[side][unit] = None
+            else:
+                self.seen[side].pop(unit, None)
+
+    def unit_moved(self, unit: "Unit", position: Position):
+        # the unit stands on ``position`` now
+        self._place(unit, position)
+        self.mark(unit)
+
+    def sees(self, side: Optional[str], position: Position) -> bool:
+        # nothing is counted for None, see set_view
+        counts = self.counts.get(side) if side is not None else None
+        return counts is not None and counts[position[0] * self.size + position[1]] > 0
+
+    def seen_units(self, side: Optional[str]) -> List["Unit"]:
+        return list(self.seen.get(side, ())) if side is not None else []
@@ -0,0 +1,230 @@
+from array import array
+from typing import Dict, List, Optional, Sequence, Tuple
+
+Position = Tuple[int, int]
+Occupation = Tuple[Optional[str], Optional[str]]
+
+# neighbor order used by every planner, kept identical to the original AStar
+# expansion order so that ties break the same way
+DIRECTIONS: List[Position] = [
+    (0, 1),
+    (1, 0),
+    (0, -1),
+    (-1, 0),
+    (1, 1),
+    (-1, -1),
+    (1, -1),
+    (-1, 1),
+]
+
+INF = float("inf")
+
+# every per-cell layer of TerrainLayers
+LAYERS = (
+    "elevation",
+    "maneuver",
+    "concealment",
+    "cover",
+    "water",
+    "fuel",
+    "manpower",
+    "resources",
+    "occupation",
+)
+
+
+def table_bytes(table: Sequence) -> int:
+    # memory held by a cell table; chunked tables only hold the chunks
+    # that were written to
+    nbytes = getattr(table, "nbytes", None)
+    if nbytes is not None:
+        return nbytes
+    return len(table) * getattr(table, "itemsize", 1)
+
+
+def edge_cost(
+    from_elevation: int,
+    to_elevation: int,
+    to_maneuver: int,
+    to_concealment: int,
+    to_cover: int,
+    unit_weight: float,
+    stealth_priority: float,
+) -> float:
+    maneuver_penalty = max(0, to_maneuver * -1)
+    elevation_difference: int = to_elevation - from_elevation
+
+    elevation_penalty = (
+        abs(elevation_difference) * 1.5
+        if elevation_difference > 0
+        else abs(elevation_difference)
+    )
+
+    concealment_penalty = (100 - to_concealment) * stealth_priority
+    cover_maneuver_penalty: int = 1 + to_cover // 100
+    return float(
+        maneuver_penalty
+        + (elevation_penalty * unit_weight)
+        + concealment_penalty
+        + cover_maneuver_penalty
+    )
+
+
+class EdgeCosts:
+    """
+    Per-direction edge costs for one movement profile, laid out node-major
+    (``costs[index * 8 + d]`` is the cost of stepping ``DIRECTIONS[d]`` out
+    of ``index``). Rows are filled the first time a node is expanded, so a
+    short query never pays for the whole map. Blocked edges cost ``INF``.
+    The tables come from ``TerrainLayers.cell_table``, so on chunked
+    terrain only chunks that were searched hold costs.
+    """
+
+    def __init__(self, layers: "TerrainLayers", unit_weight, stealth_priority):
+        self.layers = layers
+        self.unit_weight = unit_weight
+        self.stealth_priority = stealth_priority
+        self.costs = layers.cell_table("d", INF, 8, derived=True)
+        self.ready = layers.cell_table("B", 0, derived=True)
+
+    def fill(self, index: int):
+        layers = self.layers
+        size = layers.size
+        x, y = divmod(index, size)
+        elevation = layers.elevation
+        maneuver = layers.maneuver
+        concealment = layers.concealment
+        cover = layers.cover
+        water = layers.water
+        from_elevation = elevation[index]
+        base = index * 8
+        for d, (dx, dy) in enumerate(DIRECTIONS):
+            nx, ny = x + dx, y + dy
+            if not (0 <= nx < size and 0 <= ny < size):
+                self.costs[base + d] = INF
+                continue
+            target = nx * size + ny
+            if water[target]:
+                self.costs[base + d] = INF
+                continue
+            self.costs[base + d] = edge_cost(
+                from_elevation,
+                elevation[target],
+                maneuver[target],
+                concealment[target],
+                cover[target],
+                self.unit_weight,
+                self.stealth_priority,
+            )
+        self.ready[index] = 1
+
+    def build(self):
+        # price every edge now so queries only read the table
+        ready = self.ready
+        for index in range(self.layers.size * self.layers.size):
+            if not ready[index]:
+                self.fill(index)
+
+    def invalidate(self, cells: List[int]):
+        for index in cells:
+            self.ready[index] = 0
+
+
+class TerrainLayers:
+    """
+    Flat, integer-indexed storage for every tile attribute. Cell ``(x, y)``
+    lives at index ``x * size + y``; ``Tile`` objects are views onto it.
+
+    Occupations are ``(side, region_id)`` pairs interned in ``occupants``;
+    the ``occupation`` layer holds an index into that table, 0 meaning
+    unoccupied.
+    """
+
+    def __init__(self, size: int):
+        self._setup(size)
+        cell_count = size * size
+        self.elevation = array("i", [0]) * cell_count
+        self.maneuver = array("i", [-1]) * cell_count
+        self.concealment = array("i", [0]) * cell_count
+        self.cover = array("i", [0]) * cell_count
+        self.water = bytearray(cell_count)
+        self.fuel = array("i", [0]) * cell_count
+        self.manpower = array("i", [0]) * cell_count
+        self.resources = array("i", [0]) * cell_count
+        self.occupation = array("H", [0]) * cell_count
+
+    def _setup(self, size: int):
+        self.size = size
+        self.occupants: List[Occupation] = [(None, None)]
+        self._occupant_ids: Dict[Occupation, int] = {(None, None): 0}
+        # offsets of DIRECTIONS in index space
+        self.offsets = [dx * size + dy for dx, dy in DIRECTIONS]
+        self._edge_costs: Dict[Tuple[float, float], EdgeCosts] = {}
+
+    @classmethod
+    def wrap(cls, size: int, layers: Dict[str, Sequence[int]]) -> "TerrainLayers":
+        # use storage owned elsewhere, e.g. views of a memory-mapped file
+        terrain = cls.__new__(cls)
+        terrain._setup(size)
+        for name in LAYERS:
+            setattr(terrain, name, layers[name])
+        return terrain
+
+    def snapshot(self) -> "TerrainLayers":
+        # private copy of the layers pathfinding reads, without any cached
+        # edge costs; the layers may be arrays or typed memoryviews
+        copy = TerrainLayers(self.size)
+        copy.elevation = array("i", self.elevation.tobytes())
+        copy.maneuver = array("i", self.maneuver.tobytes())
+        copy.concealment = array("i", self.concealment.tobytes())
+        copy.cover = array("i", self.cover.tobytes())
+        copy.water = bytearray(self.water)
+        return copy
+
+    def cell_table(self, typecode: str, default, width: int = 1, derived=False):
+        # ``width`` values per cell, all ``default``; ``derived`` tables only
+        # hold values that can be recomputed from the layers
+        return array(typecode, [default]) * (self.size * self.size * width)
+
+    def index(self, position: Position) -> int:
+        return position[0] * self.size + position[1]
+
+    def position(self, index: int) -> Position:
+        return divmod(index, self.size)
+
+    def occupation_of(self, index: int) -> Occupation:
+        return self.occupants[self.occupation[index]]
+
+    def occupant_id(self, occupation: Occupation) -> int:
+        # the layer is written through ownership.Ownership only
+        occupant = self._occupant_ids.get(occupation)
+        if occupant is None:
+            occupant = len(self.occupants)
+            self.occupants.append(occupation)
+            self._occupant_ids[occupation] = occupant
+        return occupant
+
+    def around(self, index: int) -> List[int]:
+        # ``index`` and every in-bounds cell next to it
+        size = self.size
+        x, y = divmod(index, size)
+        return [
+            nx * size + ny
+            for nx in range(max(x - 1, 0), min(x + 2, size))
+            for ny in range(max(y - 1, 0), min(y + 2, size))
+        ]
+
+    def invalidate(self, index: int):
+        # a movement layer changed at ``index``: its out-edges and the edges
+        # into it, which all leave cells next to it, are repriced on next use
+        cells = self.around(index)
+        for costs in self._edge_costs.values():
+            costs.invalidate(cells)
+
+    def edge_costs(self, unit_weight: float, stealth_priority: float) -> EdgeCosts:
+        key = (unit_weight, stealth_priority)
+        costs = self._edge_costs.get(key)
+        if costs is None:
+            costs = EdgeCosts(self, unit_weight, stealth_priority)
+            self._edge_costs[key] = costs
+        return costs
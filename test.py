@@ -1,24 +1,31 @@
 import random
-from game_map import GameMap
+from game_map import GameMap, vectorized
 from unit import Unit
 from region_logic import RegionControl
 import time
-import math
 
-s = random.randint(0, 1000000)
+try:
+    # numpy's functions take whole coordinate arrays as well as single tiles
+    from numpy import cos, hypot, sin
+except ImportError:  # the @vectorized generators then run one tile at a time
+    from math import cos, hypot, sin  # type: ignore[assignment]
 
 map_size = 50
 tile_cap = 1000
+# a fixed seed makes the generated map reusable from map_cache_dir on the
+# next run
+seed = 1
+map_cache_dir = ".map_cache"
 
-waveform = lambda x, y: 20 * math.sin(x / 5) + 20 * math.cos(y / 5)
+waveform = vectorized(lambda x, y: 20 * sin(x / 5) + 20 * cos(y / 5))
 flat_random = lambda x, y: 0 + random.uniform(-5, 5)
-radial_bump = lambda x, y: 50 * math.sin(math.hypot(x - 25, y - 25) / 5)
-valley = lambda x, y: abs(x - y) * 10  # * 100
-hills = lambda x, y: (math.sin(x / 2) + math.cos(y / 2)) * 200
-hills_with_water = (
-    lambda x, y: 10 * math.sin(0.1 * x) * math.cos(0.05 * y)
-    + math.sin(0.5 * x)
-    + math.cos(0.5 * y)
+radial_bump = vectorized(lambda x, y: 50 * sin(hypot(x - 25, y - 25) / 5))
+valley = vectorized(lambda x, y: abs(x - y) * 10)  # * 100
+hills = vectorized(lambda x, y: (sin(x / 2) + cos(y / 2)) * 200)
+hills_with_water = vectorized(
+    lambda x, y: 10 * sin(0.1 * x) * cos(0.05 * y)
+    + sin(0.5 * x)
+    + cos(0.5 * y)
     + 5
 )
 valuable_tiles = [
@@ -35,6 +42,8 @@ game_map = GameMap(
     size=map_size,
     generation_funct=hills_with_water,
     points_of_interest=valuable_tiles,
+    seed=seed,
+    cache_dir=map_cache_dir,
 )
 map_gen_time = time.time() - start_time
 print(f"Map generation time: {map_gen_time:.9f} seconds")
@@ -100,6 +109,7 @@ for _region in region_list:
                 position=random.choice(list(_region.controlled_tiles)),
             )
         )
+game_map.field_units(unit for _region in region_list for unit in _region.units)
 
 
 for _ in range(1000):
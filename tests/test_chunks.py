@@ -0,0 +1,66 @@
+import math
+
+from chunks import layer_bytes
+from game_map import GameMap
+from terrain import TerrainLayers
+
+SIZE = 128
+CHUNK = 16
+
+
+def rolling(x, y):
+    return 10 * math.sin(0.1 * x) * math.cos(0.05 * y) + math.sin(0.5 * x) + 5
+
+
+def chunked_map(tmp_path, chunks_in_memory=6):
+    return GameMap(
+        SIZE,
+        generation_funct=rolling,
+        seed=3,
+        chunk_size=CHUNK,
+        chunk_memory=chunks_in_memory * layer_bytes(TerrainLayers(CHUNK)),
+        chunk_dir=str(tmp_path),
+    )
+
+
+def sweep(game_map):
+    # touches every chunk once
+    return [
+        game_map.get_tile((x, y)).fuel
+        for x in range(0, SIZE, CHUNK)
+        for y in range(0, SIZE, CHUNK)
+    ]
+
+
+def test_chunks_are_generated_on_demand_and_evicted(tmp_path):
+    game_map = chunked_map(tmp_path)
+    store = game_map.terrain.store
+    assert store.generated == 0
+    assert game_map.get_tile((70, 90)).elevation == int(rolling(70, 90))
+    assert store.generated == 1
+    sweep(game_map)
+    assert len(store.chunks) <= store.max_chunks
+    assert store.generated >= (SIZE // CHUNK) ** 2
+
+
+def test_evicted_chunks_come_back_unchanged(tmp_path):
+    game_map = chunked_map(tmp_path)
+    first = sweep(game_map)
+    tile = game_map.get_tile((5, 6))
+    tile.elevation = 1234
+    tile.occupation = ("A", "Alpha")
+    # clean chunks are regenerated, edited ones read back from the spill
+    assert sweep(game_map) == first
+    assert (0, 0) in game_map.terrain.store.spilled
+    tile = game_map.get_tile((5, 6))
+    assert tile.elevation == 1234
+    assert tile.occupation == ("A", "Alpha")
+
+
+def test_chunked_paths_match_the_flat_map(tmp_path):
+    game_map = chunked_map(tmp_path)
+    flat = GameMap(SIZE, generation_funct=rolling, seed=3)
+    for start, goal in (((2, 3), (60, 70)), ((100, 20), (10, 110))):
+        assert game_map.find_path(1.0, start, goal) == flat.find_path(
+            1.0, start, goal
+        )
@@ -0,0 +1,60 @@
+import math
+import random
+
+from game_map import GameMap
+
+SIZE = 30
+
+
+def hills(x, y):
+    return (math.sin(x / 2) + math.cos(y / 2)) * 200
+
+
+def land(game_map, rng):
+    while True:
+        position = (rng.randrange(SIZE), rng.randrange(SIZE))
+        if not game_map.get_tile(position).isWater:
+            return position
+
+
+def assert_labels_match_searches(game_map, rng):
+    for _ in range(10):
+        start = land(game_map, rng)
+        field = game_map.distance_field([start])
+        for x in range(SIZE):
+            for y in range(SIZE):
+                if game_map.get_tile((x, y)).isWater:
+                    assert not game_map.is_reachable(start, (x, y))
+                    continue
+                reachable = not math.isinf(field.distance((x, y)))
+                assert game_map.is_reachable(start, (x, y)) == reachable
+
+
+def test_components_follow_water_edits():
+    game_map = GameMap(SIZE, generation_funct=hills)
+    rng = random.Random(2)
+    assert_labels_match_searches(game_map, rng)
+    for _ in range(8):
+        for _ in range(15):
+            tile = game_map.get_tile((rng.randrange(SIZE), rng.randrange(SIZE)))
+            tile.isWater = not tile.isWater
+        assert_labels_match_searches(game_map, rng)
+
+
+def test_unreachable_goals_fail_without_a_search():
+    game_map = GameMap(SIZE, generation_funct=hills)
+    # wall off an island
+    for i in range(10, 21):
+        for position in ((i, 10), (i, 20), (10, i), (20, i)):
+            game_map.get_tile(position).isWater = True
+    game_map.get_tile((15, 15)).isWater = False
+    start = next(
+        (x, y)
+        for x in range(SIZE)
+        for y in range(SIZE)
+        if not (10 <= x <= 20 and 10 <= y <= 20)
+        and not game_map.get_tile((x, y)).isWater
+    )
+    assert not game_map.is_reachable(start, (15, 15))
+    assert game_map.find_path(1.0, start, (15, 15)) == []
+    assert game_map.path_cache_stats()["misses"] == 0
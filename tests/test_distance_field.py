@@ -0,0 +1,106 @@
+import math
+import random
+from collections import Counter
+
+from a_star import AStar
+from game_map import GameMap
+from region_logic import RegionControl
+
+SIZE = 40
+
+
+def rolling(x, y):
+    return 10 * math.sin(0.1 * x) * math.cos(0.05 * y) + math.sin(0.5 * x) + 5
+
+
+def path_cost(game_map, path, unit_weight=1.0, stealth_priority=0.0):
+    costs = AStar(game_map, path[0], path[-1], unit_weight, stealth_priority)
+    tiles = [game_map.get_tile(position) for position in path]
+    return sum(costs.cost(a, b) for a, b in zip(tiles, tiles[1:]))
+
+
+def random_pairs(seed, count):
+    rng = random.Random(seed)
+    return [
+        (
+            (rng.randrange(SIZE), rng.randrange(SIZE)),
+            (rng.randrange(SIZE), rng.randrange(SIZE)),
+        )
+        for _ in range(count)
+    ]
+
+
+def test_distance_field_matches_path_costs():
+    game_map = GameMap(SIZE, generation_funct=rolling)
+    for start, goal in random_pairs(4, 20):
+        field = game_map.distance_field([start])
+        path = field.path_to(goal)
+        if not path:
+            assert math.isinf(field.distance(goal))
+            assert AStar(game_map, start, goal).find_path() == []
+            continue
+        assert path[0] == start and path[-1] == goal
+        assert math.isclose(path_cost(game_map, path), field.distance(goal))
+        # never dearer than the heuristic-guided route
+        a_star_path = AStar(game_map, start, goal).find_path()
+        assert field.distance(goal) <= path_cost(game_map, a_star_path) + 1e-9
+
+
+def test_multi_source_field_takes_the_nearest_source():
+    game_map = GameMap(SIZE, generation_funct=rolling)
+    sources = [(2, 2), (35, 5), (20, 30)]
+    combined = game_map.distance_field(sources)
+    single = [game_map.distance_field([source]) for source in sources]
+    for x in range(0, SIZE, 3):
+        for y in range(0, SIZE, 3):
+            nearest = min(field.distance((x, y)) for field in single)
+            assert math.isclose(combined.distance((x, y)), nearest) or (
+                math.isinf(nearest) and math.isinf(combined.distance((x, y)))
+            )
+
+
+def test_direction_weights_follow_one_field_per_point():
+    points = [(5, 20), (35, 30), (6, 30), (34, 20)]
+    game_map = GameMap(SIZE, generation_funct=rolling, points_of_interest=points)
+    region = RegionControl("Alpha", "A", 3000, game_map, [(20, 25)])
+    points = region.potential_points_of_interest
+    assert len(points) > 2
+    expected = Counter()
+    for point in points:
+        field = game_map.distance_field([point])
+        for other in points:
+            if other != point:
+                expected.update(field.path_to(other))
+    assert region.get_local_direction_weights() == dict(expected)
+
+
+def test_direction_weights_are_cheapest_routes():
+    # pinned: the weights count routes read off distance fields, which may
+    # take other tiles than the A* routes units walk where routes tie, but
+    # are never dearer than them
+    points = [(2, 3), (12, 10), (3, 12)]
+    game_map = GameMap(16, generation_funct=rolling, points_of_interest=points)
+    region = RegionControl("Alpha", "A", 300, game_map, [(8, 8)])
+    assert region.potential_points_of_interest == points
+    weights = region.get_local_direction_weights()
+    assert weights == {
+        (2, 3): 4, (2, 4): 1, (2, 5): 1, (2, 6): 1, (2, 7): 1, (2, 8): 1,
+        (2, 9): 1, (2, 10): 1, (2, 11): 1, (3, 2): 1, (3, 4): 2, (3, 5): 1,
+        (3, 6): 1, (3, 7): 1, (3, 8): 1, (3, 9): 1, (3, 10): 1, (3, 11): 1,
+        (3, 12): 4, (4, 2): 1, (4, 5): 1, (4, 11): 2, (5, 3): 1, (5, 6): 1,
+        (5, 10): 2, (6, 4): 1, (6, 7): 1, (6, 9): 2, (7, 5): 1, (7, 8): 2,
+        (7, 9): 1, (8, 6): 1, (8, 7): 1, (8, 9): 1, (8, 10): 1, (9, 7): 2,
+        (9, 10): 1, (9, 11): 1, (10, 8): 2, (10, 10): 1, (10, 12): 1,
+        (11, 9): 2, (11, 11): 2, (12, 10): 4,
+    }
+    differs = False
+    for point in points:
+        field = game_map.distance_field([point])
+        for other in points:
+            if other == point:
+                continue
+            route = field.path_to(other)
+            walked = game_map.find_path(1.0, point, other)
+            assert math.isclose(path_cost(game_map, route), path_cost(game_map, walked))
+            differs = differs or route != walked
+    assert differs
@@ -0,0 +1,35 @@
+import math
+import random
+
+from game_map import GameMap
+from terrain import EdgeCosts
+
+SIZE = 30
+
+
+def rolling(x, y):
+    return 10 * math.sin(0.1 * x) * math.cos(0.05 * y) + math.sin(0.5 * x) + 5
+
+
+def test_fielded_profiles_are_repriced_around_edits():
+    game_map = GameMap(SIZE, generation_funct=rolling)
+    profiles = [(1.0, 0.0), (2.5, 0.3)]
+    for unit_weight, stealth_priority in profiles:
+        game_map.field_profile(unit_weight, stealth_priority)
+    rng = random.Random(9)
+    for _ in range(30):
+        tile = game_map.get_tile((rng.randrange(SIZE), rng.randrange(SIZE)))
+        if rng.random() < 0.3:
+            tile.isWater = not tile.isWater
+        else:
+            tile.elevation += rng.choice([-15, 15])
+        game_map.find_path(1.0, (0, 0), (SIZE - 1, SIZE - 1))
+    for profile in profiles:
+        edges = game_map.terrain.edge_costs(*profile)
+        fresh = EdgeCosts(game_map.terrain, *profile)
+        for index in range(SIZE * SIZE):
+            if not edges.ready[index]:
+                continue
+            fresh.fill(index)
+            for d in range(8):
+                assert edges.costs[index * 8 + d] == fresh.costs[index * 8 + d]
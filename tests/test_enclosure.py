@@ -0,0 +1,49 @@
+import math
+import random
+
+from game_map import GameMap
+from region_logic import RegionControl
+
+SIZE = 30
+
+
+def rolling(x, y):
+    return 10 * math.sin(0.1 * x) * math.cos(0.05 * y) + math.sin(0.5 * x) + 5
+
+
+def ray_walk(region, coord):
+    # the original is_coord_bound: a controlled tile within range each way
+    x, y = coord
+    for dx, dy in [(1, 0), (-1, 0), (0, 1), (0, -1)]:
+        if not any(
+            (x + dx * step, y + dy * step) in region.controlled_tiles
+            for step in range(1, region.estimated_max_range + 1)
+        ):
+            return False
+    return True
+
+
+def test_enclosure_matches_the_ray_walk():
+    game_map = GameMap(SIZE, generation_funct=rolling)
+    region = RegionControl("Alpha", "A", 300, game_map, [(15, 15)])
+    rival = RegionControl("Bravo", "B", 300, game_map, [(2, 2)])
+    rng = random.Random(5)
+    for step in range(900):
+        tile = game_map.get_tile(
+            (rng.randrange(8, 22), rng.randrange(8, 22))
+            if rng.random() < 0.8
+            else (rng.randrange(SIZE), rng.randrange(SIZE))
+        )
+        roll = rng.random()
+        if roll < 0.6:
+            region.add_tile(tile)
+        elif roll < 0.8:
+            region.remove_tile(tile)
+        else:
+            # taken by the other side
+            rival.add_tile(tile)
+        if step % 100:
+            continue
+        for x in range(-2, SIZE + 2):
+            for y in range(-2, SIZE + 2):
+                assert region.is_coord_bound((x, y)) == ray_walk(region, (x, y))
@@ -0,0 +1,183 @@
+import math
+import random
+
+import pytest
+
+from field_of_view import (
+    RayTemplates,
+    TemplateCache,
+    ViewshedTemplate,
+    _cast_rays_arrays,
+    _layer_array,
+    cast_rays,
+)
+from game_map import GameMap
+
+SIZE = 40
+
+
+def rolling(x, y):
+    return 10 * math.sin(0.1 * x) * math.cos(0.05 * y) + math.sin(0.5 * x) + 5
+
+
+def see_through_map(vision_model="rays"):
+    game_map = GameMap(SIZE, generation_funct=rolling, vision_model=vision_model)
+    rng = random.Random(1)
+    for x in range(SIZE):
+        for y in range(SIZE):
+            tile = game_map.get_tile((x, y))
+            tile.concealment_score = rng.randrange(0, 15)
+            tile.cover_score = rng.randrange(0, 15)
+            if rng.random() < 0.05:
+                tile.elevation += 10
+    return game_map
+
+
+def ray_walk(game_map, unit_pos, direction_deg, vision_cone_deg, vision_range):
+    # the original get_visible_tiles, one ray at a time
+    visible = set()
+    direction_deg = direction_deg % 360
+    start_elev = game_map.get_tile(unit_pos).elevation
+    half_cone = vision_cone_deg // 2
+    for angle in range(direction_deg - half_cone, direction_deg + half_cone + 1, 10):
+        radians = math.radians(angle)
+        dx, dy = math.cos(radians), math.sin(radians)
+        occlusion = 0
+        for r in range(1, vision_range + 1):
+            tx = unit_pos[0] + round(dx * r)
+            ty = unit_pos[1] + round(dy * r)
+            if tx < 0 or tx >= SIZE or ty < 0 or ty >= SIZE:
+                break
+            tile = game_map.get_tile((tx, ty))
+            if tile.elevation - start_elev > 5:
+                break
+            occlusion += tile.concealment_score + tile.cover_score
+            if occlusion >= 100:
+                break
+            visible.add((tx, ty))
+    return visible
+
+
+def random_observers(count):
+    rng = random.Random(2)
+    return [
+        (
+            (rng.randrange(SIZE), rng.randrange(SIZE)),
+            rng.choice(range(0, 360, 45)),
+            rng.choice([60, 90, 120]),
+            rng.choice([0, 3, 8, 15]),
+        )
+        for _ in range(count)
+    ]
+
+
+def test_templates_match_the_ray_walk():
+    game_map = see_through_map()
+    for observer in random_observers(80):
+        assert game_map.get_visible_tiles(*observer) == ray_walk(game_map, *observer)
+
+
+def test_batched_observers_match_the_ray_walk():
+    game_map = see_through_map()
+    observers = random_observers(80)
+    # observers sharing a template are evaluated together
+    observers += [((x, 20), 90, 90, 8) for x in range(0, SIZE, 3)]
+    found = game_map.visible_cells(observers)
+    for observer, cells in zip(observers, found):
+        assert list(cells) == sorted(cells)
+        expected = ray_walk(game_map, *observer)
+        assert {game_map.terrain.position(i) for i in cells} == expected
+
+
+def test_array_casting_matches_cast_rays():
+    pytest.importorskip("numpy")
+    game_map = see_through_map()
+    layers = game_map.terrain
+    arrays = [
+        _layer_array(layers.elevation),
+        _layer_array(layers.concealment),
+        _layer_array(layers.cover),
+    ]
+    templates = RayTemplates(SIZE)
+    rng = random.Random(5)
+    # corners and edges cut rays short, the middle leaves them whole
+    edges = [(0, 0), (0, SIZE - 1), (SIZE - 1, 0), (SIZE - 1, SIZE - 1), (3, 20)]
+    for direction in range(0, 360, 45):
+        for cone, vision_range in ((60, 3), (120, 8), (360, 15)):
+            template = templates.get(direction, cone, vision_range)
+            positions = edges + [
+                (rng.randrange(SIZE), rng.randrange(SIZE)) for _ in range(10)
+            ]
+            for max_occlusion, threshold in ((100, 5), (20, 0)):
+                found = _cast_rays_arrays(
+                    layers, template, positions, max_occlusion, threshold, *arrays
+                )
+                assert found == [
+                    cast_rays(layers, template, position, max_occlusion, threshold)
+                    for position in positions
+                ]
+
+
+def test_template_cache_needs_a_builder():
+    with pytest.raises(TypeError):
+        TemplateCache(SIZE)  # type: ignore[abstract]
+
+
+def flat(x, y):
+    return 10
+
+
+def open_map(vision_model):
+    game_map = GameMap(SIZE, generation_funct=flat, vision_model=vision_model)
+    for x in range(SIZE):
+        for y in range(SIZE):
+            tile = game_map.get_tile((x, y))
+            tile.concealment_score = 0
+            tile.cover_score = 0
+    return game_map
+
+
+def test_shadowcast_sees_every_open_tile_in_view():
+    shadowcast = open_map("shadowcast")
+    rays = open_map("rays")
+    skipped = 0
+    for position, direction, cone, vision_range in random_observers(40):
+        template = ViewshedTemplate(direction, cone, vision_range)
+        expected = {
+            (position[0] + ox, position[1] + oy)
+            for ox, oy in template.in_view
+            if 0 <= position[0] + ox < SIZE and 0 <= position[1] + oy < SIZE
+        }
+        seen = shadowcast.get_visible_tiles(position, direction, cone, vision_range)
+        assert seen == expected
+        skipped += len(
+            expected - rays.get_visible_tiles(position, direction, cone, vision_range)
+        )
+    # far tiles between two sampled rays
+    assert skipped
+
+
+def test_high_ground_hides_what_lies_behind_it():
+    for vision_model in ("rays", "shadowcast"):
+        game_map = open_map(vision_model)
+        for y in range(15, 26):
+            game_map.get_tile((24, y)).elevation = 30
+        seen = game_map.get_visible_tiles((20, 20), 0, 90, 12)
+        assert (23, 20) in seen
+        assert (24, 20) not in seen
+        assert not any((x, 20) in seen for x in range(25, 32))
+
+
+def test_visibility_cache_answers_until_the_terrain_changes():
+    game_map = see_through_map()
+    observer = ((20, 20), 90, 90, 8)
+    first = game_map.visible_cells([observer])[0]
+    hits = game_map.visibility_cache.hits
+    assert game_map.visible_cells([observer])[0] == first
+    assert game_map.visibility_cache.hits == hits + 1
+
+    seen = [game_map.terrain.position(i) for i in first]
+    game_map.get_tile(seen[0]).elevation += 50
+    after = game_map.visible_cells([observer])[0]
+    assert game_map.visibility_cache.hits == hits + 1
+    assert game_map.terrain.index(seen[0]) not in after
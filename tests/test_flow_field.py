@@ -0,0 +1,56 @@
+import math
+import random
+
+from a_star import AStar
+from game_map import GameMap
+
+SIZE = 40
+
+
+def rolling(x, y):
+    return 10 * math.sin(0.1 * x) * math.cos(0.05 * y) + math.sin(0.5 * x) + 5
+
+
+def path_cost(game_map, path, unit_weight=1.0):
+    costs = AStar(game_map, path[0], path[-1], unit_weight)
+    tiles = [game_map.get_tile(position) for position in path]
+    return sum(costs.cost(a, b) for a, b in zip(tiles, tiles[1:]))
+
+
+def test_flow_field_routes_are_optimal():
+    game_map = GameMap(SIZE, generation_funct=rolling)
+    goal = (20, 25)
+    field = game_map.flow_field(goal, unit_weight=2.5)
+    rng = random.Random(1)
+    for _ in range(30):
+        start = (rng.randrange(SIZE), rng.randrange(SIZE))
+        expected = game_map.distance_field([start], unit_weight=2.5).distance(goal)
+        path = field.path_from(start)
+        if math.isinf(expected):
+            assert path == []
+            continue
+        assert path[0] == start and path[-1] == goal
+        assert math.isclose(field.distance(start), expected)
+        assert math.isclose(path_cost(game_map, path, 2.5), expected)
+        if len(path) > 1:
+            assert field.next_step(start) == path[1]
+
+
+def test_units_share_one_field_per_goal():
+    game_map = GameMap(SIZE, generation_funct=rolling, flow_fields=True)
+    goal = (20, 25)
+    first = game_map.find_path(1.0, (2, 3), goal)
+    second = game_map.find_path(1.0, (30, 10), goal)
+    assert first[-1] == goal and second[-1] == goal
+    assert game_map.flow_field(goal) is game_map.flow_field(goal)
+
+
+def test_flow_field_is_rebuilt_after_terrain_edits():
+    game_map = GameMap(SIZE, generation_funct=rolling, flow_fields=True)
+    goal = (20, 25)
+    field = game_map.flow_field(goal)
+    path = game_map.find_path(1.0, (2, 3), goal)
+    blocked = path[len(path) // 2]
+    game_map.get_tile(blocked).isWater = True
+    assert game_map.flow_field(goal) is not field
+    assert blocked not in game_map.find_path(1.0, (2, 3), goal)
@@ -0,0 +1,50 @@
+import math
+import random
+
+from a_star import AStar
+from game_map import GameMap
+
+SIZE = 40
+
+
+def rolling(x, y):
+    return 10 * math.sin(0.1 * x) * math.cos(0.05 * y) + math.sin(0.5 * x) + 5
+
+
+def hills(x, y):
+    return (math.sin(x / 2) + math.cos(y / 2)) * 200
+
+
+def random_pairs(seed, count):
+    rng = random.Random(seed)
+    return [
+        (
+            (rng.randrange(SIZE), rng.randrange(SIZE)),
+            (rng.randrange(SIZE), rng.randrange(SIZE)),
+        )
+        for _ in range(count)
+    ]
+
+
+def test_grid_a_star_matches_a_star():
+    for height in (rolling, hills):
+        game_map = GameMap(SIZE, generation_funct=height)
+        rng = random.Random(2)
+        for start, goal in random_pairs(3, 60):
+            unit_weight = rng.choice([0, 1.0, 2.5])
+            stealth_priority = rng.choice([0.0, 0.3])
+            expected = AStar(
+                game_map, start, goal, unit_weight, stealth_priority
+            ).find_path()
+            found = game_map.find_path(unit_weight, start, goal, stealth_priority)
+            assert found == expected, (start, goal, unit_weight)
+
+
+def test_tile_edits_reach_the_planner():
+    game_map = GameMap(SIZE, generation_funct=rolling)
+    before = game_map.find_path(1.0, (2, 2), (30, 30))
+    for position in before[5:8]:
+        game_map.get_tile(position).elevation += 500
+    after = game_map.find_path(1.0, (2, 2), (30, 30))
+    assert after == AStar(game_map, (2, 2), (30, 30), 1.0).find_path()
+    assert after != before
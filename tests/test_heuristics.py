@@ -0,0 +1,68 @@
+import math
+import random
+
+from a_star import AStar
+from game_map import GameMap
+from heuristics import octile
+
+SIZE = 30
+
+
+def hills(x, y):
+    return (math.sin(x / 2) + math.cos(y / 2)) * 200
+
+
+def rolling(x, y):
+    return 10 * math.sin(0.1 * x) * math.cos(0.05 * y) + math.sin(0.5 * x) + 5
+
+
+PROFILES = [(1.0, 0.0), (0, 0.3), (2.5, 0.3)]
+
+
+def path_cost(game_map, path, unit_weight, stealth_priority):
+    costs = AStar(game_map, path[0], path[-1], unit_weight, stealth_priority)
+    tiles = [game_map.get_tile(position) for position in path]
+    return sum(costs.cost(a, b) for a, b in zip(tiles, tiles[1:]))
+
+
+def test_octile_and_alt_never_overestimate():
+    for height in (rolling, hills):
+        game_map = GameMap(SIZE, generation_funct=height)
+        rng = random.Random(3)
+        for unit_weight, stealth_priority in PROFILES:
+            landmarks = game_map.landmarks(unit_weight, stealth_priority)
+            for _ in range(3):
+                goal = game_map.terrain.index((rng.randrange(SIZE), rng.randrange(SIZE)))
+                field = game_map.flow_field(
+                    game_map.terrain.position(goal), unit_weight, stealth_priority
+                )
+                field.expand()
+                chebyshev = octile(SIZE, goal)
+                alt = landmarks.heuristic(goal)
+                for index in range(SIZE * SIZE):
+                    exact = field.cost[index]
+                    assert chebyshev(index) <= exact + 1e-9
+                    assert alt(index) <= exact + 1e-9
+
+
+def test_admissible_heuristics_find_optimal_paths():
+    game_map = GameMap(SIZE, generation_funct=hills)
+    rng = random.Random(8)
+    for _ in range(25):
+        start = (rng.randrange(SIZE), rng.randrange(SIZE))
+        goal = (rng.randrange(SIZE), rng.randrange(SIZE))
+        unit_weight, stealth_priority = rng.choice(PROFILES)
+        expected = game_map.distance_field(
+            [start], unit_weight, stealth_priority
+        ).distance(goal)
+        for heuristic in ("octile", "alt"):
+            path = game_map.find_path(
+                unit_weight, start, goal, stealth_priority, heuristic=heuristic
+            )
+            if math.isinf(expected):
+                assert path == []
+                continue
+            assert path[0] == start and path[-1] == goal
+            cost = path_cost(game_map, path, unit_weight, stealth_priority)
+            assert math.isclose(cost, expected)
+    assert game_map.heuristic_stats["alt"]["queries"] > 0
@@ -0,0 +1,91 @@
+import math
+import random
+
+from a_star import AStar
+from game_map import GameMap
+
+SIZE = 48
+
+
+def rolling(x, y):
+    return 10 * math.sin(0.1 * x) * math.cos(0.05 * y) + math.sin(0.5 * x) + 5
+
+
+def path_cost(game_map, path, unit_weight=1.0):
+    costs = AStar(game_map, path[0], path[-1], unit_weight)
+    tiles = [game_map.get_tile(position) for position in path]
+    return sum(costs.cost(a, b) for a, b in zip(tiles, tiles[1:]))
+
+
+def assert_walkable(game_map, path, start, goal):
+    assert path[0] == start and path[-1] == goal
+    for (ax, ay), (bx, by) in zip(path, path[1:]):
+        assert max(abs(ax - bx), abs(ay - by)) == 1
+        assert not game_map.get_tile((bx, by)).isWater
+
+
+def test_hierarchical_paths_are_walkable_and_near_optimal():
+    game_map = GameMap(SIZE, generation_funct=rolling)
+    rng = random.Random(1)
+    found = 0
+    while found < 15:
+        start = (rng.randrange(SIZE), rng.randrange(SIZE))
+        goal = (rng.randrange(SIZE), rng.randrange(SIZE))
+        optimal = game_map.distance_field([start]).distance(goal)
+        if start == goal or math.isinf(optimal):
+            continue
+        path = game_map.find_path_hierarchical(1.0, start, goal)
+        assert_walkable(game_map, path, start, goal)
+        assert path_cost(game_map, path) <= 1.5 * optimal + 1e-9
+        found += 1
+
+
+def test_hierarchical_paths_follow_terrain_edits():
+    game_map = GameMap(SIZE, generation_funct=rolling)
+    start, goal = (3, 40), (35, 4)
+    before = game_map.find_path_hierarchical(1.0, start, goal)
+    assert before
+    blocked = before[len(before) // 2]
+    game_map.get_tile(blocked).isWater = True
+    after = game_map.find_path_hierarchical(1.0, start, goal)
+    assert_walkable(game_map, after, start, goal)
+    assert blocked not in after
+
+
+def walled(land):
+    # water along column 8 and row 8, the cluster edges at cluster_size 8,
+    # except for the tiles in ``land``
+    def height(x, y):
+        if (x, y) in land:
+            return 5
+        return -1 if x in (7, 8) or y in (7, 8) else 5
+
+    return height
+
+
+def test_hierarchical_paths_cross_diagonal_only_links():
+    cases = [
+        # straight across a border is blocked on both sides of the step
+        ({(7, 3), (8, 4)}, (0, 0), (15, 3)),
+        # through the corner of four clusters, both ways
+        ({(7, 7), (8, 8)}, (0, 0), (15, 15)),
+        ({(7, 8), (8, 7)}, (0, 15), (15, 0)),
+    ]
+    for land, start, goal in cases:
+        game_map = GameMap(16, generation_funct=walled(land))
+        assert game_map.is_reachable(start, goal)
+        planner = game_map.hierarchical_planner(1.0, cluster_size=8)
+        path = planner.find_path(start, goal)
+        assert_walkable(game_map, path, start, goal)
+        assert game_map.find_path_hierarchical(1.0, start, goal) == path
+
+
+def test_corner_links_follow_terrain_edits():
+    game_map = GameMap(16, generation_funct=walled({(7, 7), (8, 8), (8, 7)}))
+    planner = game_map.hierarchical_planner(1.0, cluster_size=8)
+    assert (8, 7) in planner.find_path((0, 0), (15, 15))
+    # flooding the tile next to the corner leaves only the diagonal step
+    game_map.get_tile((8, 7)).isWater = True
+    path = planner.find_path((0, 0), (15, 15))
+    assert_walkable(game_map, path, (0, 0), (15, 15))
+    assert (8, 7) not in path
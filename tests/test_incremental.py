@@ -0,0 +1,40 @@
+import math
+import random
+
+from a_star import AStar
+from game_map import GameMap
+
+SIZE = 40
+
+
+def rolling(x, y):
+    return 10 * math.sin(0.1 * x) * math.cos(0.05 * y) + math.sin(0.5 * x) + 5
+
+
+def path_cost(game_map, path, unit_weight=1.0):
+    costs = AStar(game_map, path[0], path[-1], unit_weight)
+    tiles = [game_map.get_tile(position) for position in path]
+    return sum(costs.cost(a, b) for a, b in zip(tiles, tiles[1:]))
+
+
+def test_d_star_lite_repairs_to_optimal_after_edits():
+    game_map = GameMap(SIZE, generation_funct=rolling)
+    rng = random.Random(5)
+    for _ in range(8):
+        start = (rng.randrange(SIZE), rng.randrange(SIZE))
+        goal = (rng.randrange(SIZE), rng.randrange(SIZE))
+        planner = game_map.incremental_planner(start, goal, unit_weight=1.0)
+        planner.find_path()
+        for _ in range(10):
+            tile = game_map.get_tile((rng.randrange(SIZE), rng.randrange(SIZE)))
+            if rng.random() < 0.3:
+                tile.isWater = not tile.isWater
+            else:
+                tile.elevation += rng.choice([-20, 20])
+            path = planner.find_path()
+            expected = game_map.distance_field([start]).distance(goal)
+            if math.isinf(expected):
+                assert path == []
+            else:
+                assert path[0] == start and path[-1] == goal
+                assert math.isclose(path_cost(game_map, path), expected)
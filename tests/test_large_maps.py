@@ -0,0 +1,85 @@
+import math
+import random
+
+import a_star
+import game_map as game_map_module
+from connectivity import BoundedComponents, LandComponents
+from distance_field import DistanceFieldCache
+from game_map import GameMap
+from region_logic import RegionControl
+
+SIZE = 40
+
+
+def rolling(x, y):
+    return 10 * math.sin(0.1 * x) * math.cos(0.05 * y) + math.sin(0.5 * x) + 5
+
+
+def test_sparse_search_scores_match_the_tables(monkeypatch):
+    game_map = GameMap(SIZE, generation_funct=rolling)
+    rng = random.Random(3)
+    pairs = [
+        (
+            (rng.randrange(SIZE), rng.randrange(SIZE)),
+            (rng.randrange(SIZE), rng.randrange(SIZE)),
+        )
+        for _ in range(30)
+    ]
+    dense = [a_star.GridAStar(game_map, s, g).find_path() for s, g in pairs]
+    monkeypatch.setattr(a_star, "DENSE_SEARCH_LIMIT", 0)
+    sparse = [a_star.GridAStar(game_map, s, g).find_path() for s, g in pairs]
+    assert sparse == dense
+
+
+def test_large_maps_label_land_on_demand(monkeypatch, tmp_path):
+    small = GameMap(SIZE, generation_funct=rolling)
+    assert isinstance(small.components, LandComponents)
+    monkeypatch.setattr(game_map_module, "FULL_LABELING_LIMIT", SIZE * SIZE - 1)
+    game_map = GameMap(SIZE, generation_funct=rolling)
+    assert isinstance(game_map.components, BoundedComponents)
+    assert not game_map.components.labels
+    assert game_map.find_path(1.0, (2, 2), (30, 30))
+    # loading a map keeps the on-demand labeling
+    filename = str(tmp_path / "map.omap")
+    game_map.save_map(filename)
+    game_map.load_map(filename, SIZE)
+    assert isinstance(game_map.components, BoundedComponents)
+    # so does a map read back from the map cache
+    cached = GameMap(SIZE, generation_funct=rolling, seed=1, cache_dir=str(tmp_path))
+    assert isinstance(cached.components, BoundedComponents)
+
+
+def test_field_caches_are_capped_by_bytes():
+    game_map = GameMap(SIZE, generation_funct=rolling)
+    field = game_map.distance_field([(0, 0)])
+    cache = DistanceFieldCache(max_bytes=3 * field.nbytes)
+    for x in range(6):
+        cache.put(x, 0, game_map.distance_field([(x, 0)]))
+    assert cache.nbytes <= 3 * field.nbytes
+    assert cache.get(5, 0) is not None and cache.get(0, 0) is None
+    # a single field larger than the budget is still kept
+    small = DistanceFieldCache(max_bytes=1)
+    small.put("a", 0, field)
+    assert small.get("a", 0) is field
+
+    capped = GameMap(SIZE, generation_funct=rolling, field_memory=2 * field.nbytes)
+    for x in range(5):
+        capped.distance_field([(x, 0)])
+    assert capped.distance_fields.nbytes <= 2 * field.nbytes
+
+
+def test_enclosure_tables_cover_the_region_only():
+    size = 400
+    game_map = GameMap(size, generation_funct=lambda x, y: 5)
+    region = RegionControl("Alpha", "A", 300, game_map, [(200, 200)])
+    for x in range(195, 206):
+        for y in range(195, 206):
+            region.add_tile(game_map.get_tile((x, y)))
+    enclosure = region.enclosure
+    assert enclosure.width * enclosure.height < size * size // 50
+    assert region.is_coord_bound((200, 200))
+    assert not region.is_coord_bound((0, 0))
+    # a tile far away grows the window to take it in
+    region.add_tile(game_map.get_tile((390, 10)))
+    assert enclosure.x0 + enclosure.width > 390 and enclosure.y0 <= 10
+    assert region.is_coord_bound((200, 200))
@@ -0,0 +1,93 @@
+import math
+import os
+import random
+from random import uniform
+
+from game_map import GameMap
+from map_cache import generation_key
+
+SIZE = 30
+LAYER_NAMES = (
+    "elevation",
+    "maneuver",
+    "concealment",
+    "cover",
+    "water",
+    "fuel",
+    "manpower",
+    "resources",
+)
+
+
+def rolling(x, y):
+    return 10 * math.sin(0.1 * x) * math.cos(0.05 * y) + math.sin(0.5 * x) + 5
+
+
+def steeper(x, y):
+    return 20 * math.sin(0.1 * x) * math.cos(0.05 * y) + math.sin(0.5 * x) + 5
+
+
+def noisy(x, y):
+    return rolling(x, y) + random.uniform(-1, 1)
+
+
+def imported_noise(x, y):
+    return rolling(x, y) + uniform(-1, 1)
+
+
+def layers_of(terrain):
+    return {name: list(getattr(terrain, name)) for name in LAYER_NAMES}
+
+
+def test_cache_hit_reproduces_the_generated_map(tmp_path):
+    cache_dir = str(tmp_path)
+    generated = GameMap(SIZE, generation_funct=rolling, seed=4, cache_dir=cache_dir)
+    assert len(os.listdir(cache_dir)) == 1
+    cached = GameMap(SIZE, generation_funct=rolling, seed=4, cache_dir=cache_dir)
+    assert len(os.listdir(cache_dir)) == 1
+    # a hit maps the stored file instead of generating
+    assert isinstance(cached.terrain.elevation, memoryview)
+    assert layers_of(cached.terrain) == layers_of(generated.terrain)
+    assert cached.find_path(1.0, (1, 1), (25, 20)) == generated.find_path(
+        1.0, (1, 1), (25, 20)
+    )
+
+
+def test_changed_parameters_miss(tmp_path):
+    cache_dir = str(tmp_path)
+    GameMap(SIZE, generation_funct=rolling, seed=4, cache_dir=cache_dir)
+    other = GameMap(SIZE, generation_funct=steeper, seed=4, cache_dir=cache_dir)
+    GameMap(SIZE, generation_funct=rolling, seed=5, cache_dir=cache_dir)
+    assert len(os.listdir(cache_dir)) == 3
+    assert layers_of(other.terrain) == layers_of(
+        GameMap(SIZE, generation_funct=steeper, seed=4).terrain
+    )
+
+
+def test_fingerprint_ignores_location_but_not_code():
+    def local_rolling(x, y):
+        return 10 * math.sin(0.1 * x) * math.cos(0.05 * y) + math.sin(0.5 * x) + 5
+
+    def scaled(factor):
+        return lambda x, y: factor * math.sin(0.1 * x)
+
+    key = generation_key(SIZE, rolling, [], 4, False)
+    assert generation_key(SIZE, local_rolling, [], 4, False) == key
+    assert generation_key(SIZE, steeper, [], 4, False) != key
+    assert generation_key(SIZE, rolling, [(1, 2)], 4, False) != key
+    assert generation_key(SIZE, scaled(2), [], 4, False) != generation_key(
+        SIZE, scaled(3), [], 4, False
+    )
+
+
+def test_unseeded_generation_is_not_cached(tmp_path):
+    cache_dir = str(tmp_path)
+    unseeded = GameMap(SIZE, generation_funct=rolling, cache_dir=cache_dir)
+    assert unseeded.map_cache is None
+    # generators rolling the global random state give a new map every call
+    for funct in (noisy, imported_noise):
+        assert generation_key(SIZE, funct, [], 4, False) is None
+        game_map = GameMap(SIZE, generation_funct=funct, seed=4, cache_dir=cache_dir)
+        assert game_map.map_cache is None
+    assert generation_key(SIZE, lambda x, y: noisy(x, y) * 2, [], 4, False) is None
+    assert os.listdir(cache_dir) == []
@@ -0,0 +1,108 @@
+import json
+import math
+
+import pytest
+
+from game_map import GameMap
+from map_format import MapFormatError, is_binary_map, open_terrain
+
+SIZE = 30
+LAYER_NAMES = (
+    "elevation",
+    "maneuver",
+    "concealment",
+    "cover",
+    "water",
+    "fuel",
+    "manpower",
+    "resources",
+)
+
+
+def rolling(x, y):
+    return 10 * math.sin(0.1 * x) * math.cos(0.05 * y) + math.sin(0.5 * x) + 5
+
+
+def layers_of(terrain):
+    return {name: list(getattr(terrain, name)) for name in LAYER_NAMES}
+
+
+def test_binary_save_load_roundtrip(tmp_path):
+    game_map = GameMap(
+        SIZE, generation_funct=rolling, seed=1, points_of_interest=[(3, 4)]
+    )
+    game_map.get_tile((5, 5)).isWater = True
+    filename = str(tmp_path / "map.omap")
+    game_map.save_map(filename)
+    assert is_binary_map(filename)
+
+    loaded = GameMap(SIZE, map_encoding=filename)
+    expected = layers_of(game_map.terrain)
+    # the old format has no cover, tiles read back with the tile default
+    del expected["cover"]
+    found = layers_of(loaded.terrain)
+    del found["cover"]
+    assert found == expected
+    assert loaded.find_path(1.0, (1, 1), (25, 20)) == game_map.find_path(
+        1.0, (1, 1), (25, 20)
+    )
+    # edits stay in memory, the file is mapped copy-on-write
+    loaded.get_tile((1, 1)).elevation = 999
+    assert open_terrain(filename).elevation[loaded.terrain.index((1, 1))] != 999
+
+
+def test_json_lines_maps_still_load(tmp_path):
+    game_map = GameMap(SIZE, generation_funct=rolling, seed=1)
+    filename = str(tmp_path / "map.jsonl")
+    with open(filename, "w") as f:
+        for x in range(SIZE):
+            for y in range(SIZE):
+                tile = game_map.get_tile((x, y))
+                data = {
+                    "x": x,
+                    "y": y,
+                    "maneuver": tile.maneuver_score,
+                    "elevation": tile.elevation,
+                    "concealment": tile.concealment_score,
+                    "fuel": tile.fuel,
+                    "manpower": tile.manpower,
+                    "resources": tile.resources,
+                    "isWater": tile.isWater,
+                }
+                f.write(json.dumps(data) + "\n")
+    assert not is_binary_map(filename)
+    loaded = GameMap(SIZE, map_encoding=filename)
+    expected = layers_of(game_map.terrain)
+    # the old format has no cover, tiles read back with the tile default
+    del expected["cover"]
+    found = layers_of(loaded.terrain)
+    del found["cover"]
+    assert found == expected
+
+
+def test_damaged_files_are_rejected(tmp_path):
+    game_map = GameMap(SIZE, generation_funct=rolling, seed=1)
+    filename = str(tmp_path / "map.omap")
+    game_map.save_map(filename)
+    with open(filename, "rb") as f:
+        data = f.read()
+    with open(filename, "wb") as f:
+        f.write(data[: len(data) // 2])
+    with pytest.raises(MapFormatError):
+        open_terrain(filename)
+    game_map.save_map(filename)
+    with pytest.raises(MapFormatError):
+        GameMap(SIZE + 1, map_encoding=filename)
+
+
+def test_load_map_keeps_ownership(tmp_path):
+    game_map = GameMap(SIZE, generation_funct=rolling, seed=1)
+    filename = str(tmp_path / "map.omap")
+    game_map.save_map(filename)
+    game_map.get_tile((2, 3)).occupation = ("A", "Alpha")
+
+    game_map.load_map(filename, SIZE)
+    assert game_map.get_tile((2, 3)).occupation == ("A", "Alpha")
+    assert layers_of(game_map.terrain)["elevation"] == layers_of(
+        GameMap(SIZE, map_encoding=filename).terrain
+    )["elevation"]
@@ -0,0 +1,57 @@
+import math
+import random
+
+from a_star import AStar
+from game_map import GameMap
+from terrain import DIRECTIONS
+
+SIZE = 30
+
+
+def hills(x, y):
+    return (math.sin(x / 2) + math.cos(y / 2)) * 200
+
+
+def scanned(game_map, position, diagonal):
+    x, y = position
+    found = []
+    for dx, dy in DIRECTIONS if diagonal else DIRECTIONS[:4]:
+        nx, ny = x + dx, y + dy
+        if 0 <= nx < SIZE and 0 <= ny < SIZE:
+            if not game_map.get_tile((nx, ny)).isWater:
+                found.append((nx, ny))
+    return found
+
+
+def assert_rows_match(game_map):
+    for x in range(SIZE):
+        for y in range(SIZE):
+            for diagonal in (False, True):
+                assert game_map.neighbors((x, y), diagonal) == scanned(
+                    game_map, (x, y), diagonal
+                )
+
+
+def test_neighbor_rows_follow_water_edits():
+    game_map = GameMap(SIZE, generation_funct=hills)
+    assert_rows_match(game_map)
+    rng = random.Random(6)
+    for _ in range(5):
+        for _ in range(20):
+            tile = game_map.get_tile((rng.randrange(SIZE), rng.randrange(SIZE)))
+            tile.isWater = not tile.isWater
+        assert_rows_match(game_map)
+
+
+def test_paths_after_water_edits_match_a_star():
+    game_map = GameMap(SIZE, generation_funct=hills)
+    rng = random.Random(7)
+    for _ in range(10):
+        for _ in range(10):
+            tile = game_map.get_tile((rng.randrange(SIZE), rng.randrange(SIZE)))
+            tile.isWater = not tile.isWater
+        start = (rng.randrange(SIZE), rng.randrange(SIZE))
+        goal = (rng.randrange(SIZE), rng.randrange(SIZE))
+        assert game_map.find_path(1.0, start, goal) == AStar(
+            game_map, start, goal, 1.0
+        ).find_path()
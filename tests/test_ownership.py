@@ -0,0 +1,73 @@
+import math
+import random
+
+from game_map import GameMap
+from region_logic import RegionControl
+
+SIZE = 30
+
+
+def rolling(x, y):
+    return 10 * math.sin(0.1 * x) * math.cos(0.05 * y) + math.sin(0.5 * x) + 5
+
+
+def test_regions_read_their_tiles_off_the_raster():
+    game_map = GameMap(SIZE, generation_funct=rolling)
+    alpha = RegionControl("Alpha", "A", 500, game_map, [(5, 5)])
+    bravo = RegionControl("Bravo", "B", 500, game_map, [(25, 25)])
+    rng = random.Random(3)
+    for step in range(600):
+        tile = game_map.get_tile((rng.randrange(SIZE), rng.randrange(SIZE)))
+        region = rng.choice([alpha, bravo])
+        if rng.random() < 0.7:
+            region.add_tile(tile)
+        else:
+            region.remove_tile(tile)
+        if step % 100:
+            continue
+        for region in (alpha, bravo):
+            held = [
+                (x, y)
+                for x in range(SIZE)
+                for y in range(SIZE)
+                if game_map.get_tile((x, y)).occupation
+                == (region.side, region.region_id)
+            ]
+            # index order, whichever way the raster is read
+            assert list(region.controlled_tiles) == held
+            assert len(region.controlled_tiles) == len(held)
+            assert game_map.ownership.centroid(region.owner_id) == (
+                sum(x for x, _ in held) // len(held),
+                sum(y for _, y in held) // len(held),
+            )
+
+
+def test_owned_tiles_iterate_in_index_order():
+    game_map = GameMap(SIZE, generation_funct=rolling)
+    taken = [(20, 3), (4, 17), (20, 2), (9, 9), (4, 16)]
+    region = RegionControl("Alpha", "A", 500, game_map, taken[:1])
+    for position in taken[1:]:
+        region.add_tile(game_map.get_tile(position))
+    assert list(region.controlled_tiles) == sorted(taken)
+
+
+def test_borders_between_owners_match_a_scan():
+    game_map = GameMap(SIZE, generation_funct=rolling)
+    alpha = RegionControl("Alpha", "A", 500, game_map, [(5, 5)])
+    bravo = RegionControl("Bravo", "B", 500, game_map, [(25, 25)])
+    rng = random.Random(4)
+    for _ in range(400):
+        tile = game_map.get_tile((rng.randrange(SIZE), rng.randrange(SIZE)))
+        rng.choice([alpha, bravo]).add_tile(tile)
+    occupation = game_map.terrain.occupation
+    expected = []
+    for index in range(SIZE * SIZE):
+        if not occupation[index]:
+            continue
+        x, y = divmod(index, SIZE)
+        for nx, ny in ((x + 1, y), (x - 1, y), (x, y + 1), (x, y - 1)):
+            if 0 <= nx < SIZE and 0 <= ny < SIZE:
+                if occupation[nx * SIZE + ny] != occupation[index]:
+                    expected.append(index)
+                    break
+    assert game_map.ownership.borders() == expected
@@ -0,0 +1,58 @@
+import math
+import random
+
+from game_map import GameMap
+
+SIZE = 40
+
+
+def rolling(x, y):
+    return 10 * math.sin(0.1 * x) * math.cos(0.05 * y) + math.sin(0.5 * x) + 5
+
+
+def batch(count):
+    rng = random.Random(4)
+    requests = []
+    for _ in range(count):
+        start = (rng.randrange(SIZE), rng.randrange(SIZE))
+        goal = (rng.randrange(SIZE), rng.randrange(SIZE))
+        requests.append((start, goal, rng.choice([1.0, 2.5]), rng.choice([0.0, 0.3])))
+    # repeats are planned once and handed out to each asker
+    return requests + requests[:5]
+
+
+def serial(game_map, requests):
+    return [
+        game_map.find_path(unit_weight, start, goal, stealth_priority)
+        for start, goal, unit_weight, stealth_priority in requests
+    ]
+
+
+def test_find_paths_matches_find_path():
+    requests = batch(30)
+    expected = serial(GameMap(SIZE, generation_funct=rolling), requests)
+    game_map = GameMap(SIZE, generation_funct=rolling)
+    assert game_map.find_paths(requests) == expected
+
+
+def test_worker_pool_matches_serial_planning():
+    requests = batch(30)
+    expected = serial(GameMap(SIZE, generation_funct=rolling), requests)
+    with GameMap(SIZE, generation_funct=rolling, path_workers=2) as game_map:
+        assert game_map.find_paths(requests) == expected
+        # the pool is restarted on the edited terrain
+        game_map.get_tile(expected[0][len(expected[0]) // 2]).isWater = True
+        reference = GameMap(SIZE, generation_funct=rolling)
+        reference.get_tile(expected[0][len(expected[0]) // 2]).isWater = True
+        assert game_map.find_paths(requests) == serial(reference, requests)
+
+
+def test_closed_pool_starts_again():
+    requests = batch(10)
+    expected = serial(GameMap(SIZE, generation_funct=rolling), requests)
+    game_map = GameMap(SIZE, generation_funct=rolling, path_workers=2)
+    assert game_map.find_paths(requests) == expected
+    game_map.close()
+    game_map.path_cache.clear()
+    assert game_map.find_paths(requests) == expected
+    game_map.close()
@@ -0,0 +1,53 @@
+import math
+
+from game_map import GameMap
+from path_cache import PathCache
+
+SIZE = 30
+
+
+def rolling(x, y):
+    return 10 * math.sin(0.1 * x) * math.cos(0.05 * y) + math.sin(0.5 * x) + 5
+
+
+def test_repeated_queries_hit_the_cache():
+    game_map = GameMap(SIZE, generation_funct=rolling)
+    first = game_map.find_path(1.0, (1, 1), (25, 20))
+    second = game_map.find_path(1.0, (1, 1), (25, 20))
+    assert second == first
+    stats = game_map.path_cache_stats()
+    assert stats["hits"] == 1 and stats["misses"] == 1
+    # callers pop from the path they get, the cached one must not change
+    second.pop(0)
+    assert game_map.find_path(1.0, (1, 1), (25, 20)) == first
+
+
+def test_profiles_are_cached_separately():
+    game_map = GameMap(SIZE, generation_funct=rolling)
+    game_map.find_path(1.0, (1, 1), (25, 20))
+    game_map.find_path(2.5, (1, 1), (25, 20))
+    assert game_map.path_cache_stats()["misses"] == 2
+
+
+def test_terrain_edits_invalidate_cached_paths():
+    game_map = GameMap(SIZE, generation_funct=rolling)
+    before = game_map.find_path(1.0, (1, 1), (25, 20))
+    for position in before[3:6]:
+        game_map.get_tile(position).elevation += 500
+    after = game_map.find_path(1.0, (1, 1), (25, 20))
+    assert game_map.path_cache_stats()["hits"] == 0
+    assert after != before
+    assert not set(before[3:6]) & set(after)
+
+
+def test_cache_evicts_least_recently_used():
+    cache = PathCache(max_entries=2)
+    cache.put("a", 0, [(0, 0)])
+    cache.put("b", 0, [(0, 1)])
+    assert cache.get("a", 0) == [(0, 0)]
+    cache.put("c", 0, [(0, 2)])
+    assert cache.get("b", 0) is None
+    assert cache.get("a", 0) == [(0, 0)]
+    # stale versions count as misses and are dropped
+    assert cache.get("c", 1) is None
+    assert len(cache) == 1
@@ -0,0 +1,69 @@
+import math
+import random
+from collections import Counter
+
+from game_map import GameMap
+from region_logic import RegionControl
+
+SIZE = 40
+
+
+def rolling(x, y):
+    return 10 * math.sin(0.1 * x) * math.cos(0.05 * y) + math.sin(0.5 * x) + 5
+
+
+def recomputed_border(game_map, region):
+    return {
+        position
+        for position in region.controlled_tiles
+        if any(
+            adj not in region.controlled_tiles for adj in game_map.adjacent(position)
+        )
+    }
+
+
+def recomputed_targets(game_map, region):
+    # the frontier as first written: the first tile around each controlled
+    # tile that the region does not hold, water included
+    frontier = []
+    for position in region.controlled_tiles:
+        for adj in game_map.get_adjacent(position):
+            if adj.position not in region.controlled_tiles:
+                frontier.append(adj.position)
+                break
+    return frontier
+
+
+def test_incremental_borders_match_recompute():
+    game_map = GameMap(SIZE, generation_funct=rolling, seed=3)
+    alpha = RegionControl("Alpha", "A", 3000, game_map, [(10, 10), (10, 11)])
+    bravo = RegionControl("Bravo", "B", 3000, game_map, [(30, 30)])
+    rng = random.Random(7)
+    for step in range(2000):
+        tile = game_map.get_tile((rng.randrange(SIZE), rng.randrange(SIZE)))
+        roll = rng.random()
+        if roll < 0.4:
+            alpha.add_tile(tile)
+        elif roll < 0.7:
+            # may take tiles from alpha
+            bravo.add_tile(tile)
+        elif roll < 0.85:
+            alpha.remove_tile(tile)
+        elif roll < 0.9:
+            tile.isWater = not tile.isWater
+        else:
+            bravo.remove_tile(tile)
+        if step % 50:
+            continue
+        for region in (alpha, bravo):
+            assert set(region.border_tiles) == recomputed_border(game_map, region)
+            assert sorted(region.get_expansion_targets()) == sorted(
+                recomputed_targets(game_map, region)
+            )
+            label = game_map.components.label
+            assert region.owned_components() == Counter(
+                label(game_map.terrain.index(position))
+                for position in region.controlled_tiles
+            )
+        assert not set(alpha.controlled_tiles) & set(bravo.controlled_tiles)
+
@@ -0,0 +1,43 @@
+import math
+import random
+
+from game_map import GameMap
+
+SIZE = 40
+
+
+def rolling(x, y):
+    return 10 * math.sin(0.1 * x) * math.cos(0.05 * y) + math.sin(0.5 * x) + 5
+
+
+def scanned_value(game_map, center, radius):
+    total = 0
+    for x in range(SIZE):
+        for y in range(SIZE):
+            if abs(x - center[0]) + abs(y - center[1]) <= radius:
+                tile = game_map.get_tile((x, y))
+                total += tile.fuel + tile.manpower + tile.resources
+    return total
+
+
+def test_radius_queries_match_a_scan_after_edits():
+    rng = random.Random(2)
+    points = [(rng.randrange(SIZE), rng.randrange(SIZE)) for _ in range(25)]
+    game_map = GameMap(SIZE, generation_funct=rolling, points_of_interest=points)
+    index = game_map.resource_index
+    for step in range(60):
+        tile = game_map.get_tile((rng.randrange(SIZE), rng.randrange(SIZE)))
+        setattr(tile, rng.choice(["fuel", "manpower", "resources"]), rng.randint(0, 9))
+        center = (rng.randrange(SIZE), rng.randrange(SIZE))
+        radius = rng.randrange(0, 25)
+        assert index.value_in_radius(center, radius) == scanned_value(
+            game_map, center, radius
+        )
+        assert index.points_in_radius(center, radius) == [
+            point
+            for point in points
+            if abs(point[0] - center[0]) + abs(point[1] - center[1]) <= radius
+        ]
+        assert index.value_at(tile.position) == (
+            tile.fuel + tile.manpower + tile.resources
+        )
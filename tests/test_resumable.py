@@ -0,0 +1,58 @@
+import math
+
+from a_star import GridAStar, ResumableAStar
+from game_map import GameMap
+
+SIZE = 40
+
+
+def rolling(x, y):
+    return 10 * math.sin(0.1 * x) * math.cos(0.05 * y) + math.sin(0.5 * x) + 5
+
+
+def test_sliced_search_keeps_its_budget_and_finds_the_full_path():
+    game_map = GameMap(SIZE, generation_funct=rolling)
+    start, goal = (2, 3), (35, 30)
+    planner = ResumableAStar(game_map, start, goal, 1.0)
+    slices = 0
+    while True:
+        expanded = planner.expanded
+        done = planner.step(max_nodes=25)
+        assert planner.expanded - expanded <= 25
+        slices += 1
+        if done:
+            break
+        partial = planner.best_partial_path()
+        assert partial[0] == start
+    assert slices > 1
+    assert planner.path == GridAStar(game_map, start, goal, 1.0).find_path()
+
+
+def test_time_budget_returns_unfinished():
+    game_map = GameMap(SIZE, generation_funct=rolling)
+    planner = ResumableAStar(game_map, (2, 3), (35, 30), 1.0)
+    assert not planner.step(max_micros=0)
+    assert planner.step()
+
+
+def test_terrain_edits_restart_the_search():
+    game_map = GameMap(SIZE, generation_funct=rolling)
+    start, goal = (2, 3), (35, 30)
+    planner = ResumableAStar(game_map, start, goal, 1.0)
+    assert not planner.step(max_nodes=10)
+    route = GridAStar(game_map, start, goal, 1.0).find_path()
+    blocked = route[len(route) // 2]
+    game_map.get_tile(blocked).isWater = True
+    while not planner.step(max_nodes=10):
+        pass
+    assert blocked not in planner.path
+    assert planner.path == GridAStar(game_map, start, goal, 1.0).find_path()
+
+
+def test_budgeted_map_answers_repeat_queries_from_the_cache():
+    game_map = GameMap(SIZE, generation_funct=rolling, plan_max_nodes=50)
+    planner = game_map.resumable_planner((2, 3), (35, 30), 1.0)
+    while not game_map.advance_planner(planner):
+        pass
+    again = game_map.resumable_planner((2, 3), (35, 30), 1.0)
+    assert again.done and again.path == planner.path
@@ -0,0 +1,120 @@
+import math
+import random
+from collections import Counter
+
+from game_map import GameMap
+from region_logic import RegionControl
+from unit import Unit
+
+SIZE = 40
+
+
+def rolling(x, y):
+    return 10 * math.sin(0.1 * x) * math.cos(0.05 * y) + math.sin(0.5 * x) + 5
+
+
+def field_two_sides(rng):
+    game_map = GameMap(SIZE, generation_funct=rolling)
+    for x in range(SIZE):
+        for y in range(SIZE):
+            tile = game_map.get_tile((x, y))
+            tile.concealment_score = rng.randrange(0, 15)
+            tile.cover_score = rng.randrange(0, 15)
+    regions = {
+        "Alpha": RegionControl("Alpha", "A", 500, game_map, [(10, 10)]),
+        "Bravo": RegionControl("Bravo", "B", 500, game_map, [(30, 30)]),
+    }
+    units = []
+    for i in range(30):
+        region = regions["Alpha"] if i % 2 else regions["Bravo"]
+        units.append(
+            Unit(
+                game_map=game_map,
+                region_map=regions,
+                assigned_region_id=region.region_id,
+                agent_id=i,
+                side=region.side,
+                position=(rng.randrange(10, 30), rng.randrange(10, 30)),
+                direction=rng.choice(range(0, 360, 45)),
+                vision_range=rng.choice([3, 5, 8]),
+            )
+        )
+    return game_map, units
+
+
+def assert_fog_matches_views(game_map, units):
+    expected = {"A": Counter(), "B": Counter()}
+    for unit in units:
+        if unit.side is not None:
+            expected[unit.side].update(unit.get_visible_tiles())
+    for side, counts in expected.items():
+        for x in range(SIZE):
+            for y in range(SIZE):
+                assert game_map.visible_to(side, (x, y)) == bool(counts[(x, y)])
+                index = game_map.terrain.index((x, y))
+                assert game_map.side_vision.counts[side][index] == counts[(x, y)]
+        enemies = {
+            unit for unit in units if unit.side != side and counts[unit.position]
+        }
+        assert set(game_map.visible_enemies(side)) == enemies
+
+
+def test_fog_of_war_follows_moves_turns_and_edits():
+    rng = random.Random(4)
+    game_map, units = field_two_sides(rng)
+    assert_fog_matches_views(game_map, units)
+    for step in range(40):
+        for unit in rng.sample(units, 6):
+            x, y = unit.position
+            unit.assigned_path = [
+                (
+                    min(SIZE - 1, max(0, x + rng.choice([-1, 0, 1]))),
+                    min(SIZE - 1, max(0, y + rng.choice([-1, 0, 1]))),
+                )
+            ]
+            unit.act()
+        game_map.turn_unit(rng.choice(units), rng.choice(range(0, 360, 45)))
+        if step % 4 == 0:
+            tile = game_map.get_tile((rng.randrange(SIZE), rng.randrange(SIZE)))
+            tile.elevation += rng.choice([-10, 10])
+        if step % 5 == 0:
+            assert_fog_matches_views(game_map, units)
+
+
+def test_units_of_no_side_count_for_nobody():
+    rng = random.Random(5)
+    game_map, units = field_two_sides(rng)
+    regions = units[0].region_map
+    observers = [
+        Unit(
+            game_map=game_map,
+            region_map=regions,
+            assigned_region_id=regions["Alpha"].region_id,
+            agent_id=100 + i,
+            side=None,
+            position=position,
+            direction=0,
+            vision_range=8,
+        )
+        for i, position in enumerate([(20, 20), (15, 25)])
+    ]
+    assert game_map.visible_enemies(None) == []
+    assert not any(
+        game_map.visible_to(None, (x, y)) for x in range(SIZE) for y in range(SIZE)
+    )
+    assert set(game_map.side_vision.counts) == {"A", "B"}
+    # the sides still see them standing on their tiles
+    assert_fog_matches_views(game_map, units + observers)
+
+    # a unit that leaves its side takes its view along
+    deserter = units[1]
+    deserter.side = None
+    game_map.side_vision.mark(deserter)
+    assert deserter not in game_map.visible_enemies(None)
+    assert_fog_matches_views(game_map, units + observers)
+
+    # and one that joins a side sees for it, and is no longer its enemy
+    observers[0].side = "B"
+    game_map.side_vision.mark(observers[0])
+    assert observers[0] not in game_map.visible_enemies("B")
+    assert_fog_matches_views(game_map, units + observers)
@@ -0,0 +1,38 @@
+import math
+
+from game_map import GameMap
+
+SIZE = 20
+
+
+def rolling(x, y):
+    return 10 * math.sin(0.1 * x) * math.cos(0.05 * y) + math.sin(0.5 * x) + 5
+
+
+def test_tiles_are_views_of_the_layers():
+    game_map = GameMap(SIZE, generation_funct=rolling)
+    tile = game_map.get_tile((3, 4))
+    tile.elevation = 42
+    tile.fuel = 7
+    tile.occupation = ("A", "Alpha")
+    index = game_map.terrain.index((3, 4))
+    assert game_map.terrain.elevation[index] == 42
+    assert game_map.terrain.fuel[index] == 7
+    again = game_map.get_tile((3, 4))
+    assert again == tile and hash(again) == hash(tile)
+    assert again.elevation == 42 and again.occupation == ("A", "Alpha")
+    assert game_map.get_tile((4, 3)).occupation == (None, None)
+
+
+def test_only_movement_layers_bump_the_terrain_version():
+    game_map = GameMap(SIZE, generation_funct=rolling)
+    tile = game_map.get_tile((3, 4))
+    version = game_map.terrain_version
+    tile.fuel = tile.fuel + 1
+    tile.occupation = ("B", "Bravo")
+    assert game_map.terrain_version == version
+    tile.elevation = tile.elevation + 1
+    assert game_map.terrain_version == version + 1
+    # writing the same value is not an edit
+    tile.isWater = tile.isWater
+    assert game_map.terrain_version == version + 1
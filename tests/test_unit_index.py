@@ -0,0 +1,87 @@
+import random
+
+from unit_index import UnitIndex
+
+SIZE = 50
+
+
+class Marker:
+    # stands in for Unit, the index only reads side
+    def __init__(self, side):
+        self.side = side
+
+
+def brute(index, keep, side=None, other_than=None):
+    return {
+        unit
+        for unit, position in index.positions.items()
+        if keep(position)
+        and (side is None or unit.side == side)
+        and (other_than is None or unit.side != other_than)
+    }
+
+
+def test_queries_match_a_scan_of_every_unit():
+    rng = random.Random(1)
+    index = UnitIndex(SIZE, bucket_size=8)
+    units = [Marker(rng.choice(["A", "B", None])) for _ in range(150)]
+    for unit in units:
+        index.move(unit, (rng.randrange(SIZE), rng.randrange(SIZE)))
+    for step in range(300):
+        unit = rng.choice(units)
+        if rng.random() < 0.1:
+            index.remove(unit)
+        else:
+            x, y = index.positions.get(unit, (25, 25))
+            index.move(
+                unit,
+                (
+                    min(SIZE - 1, max(0, x + rng.randint(-3, 3))),
+                    min(SIZE - 1, max(0, y + rng.randint(-3, 3))),
+                ),
+            )
+        cx, cy = rng.randrange(SIZE), rng.randrange(SIZE)
+        radius = rng.uniform(0, 12)
+        for side, other_than in ((None, None), ("A", None), (None, "B")):
+            assert set(index.at((cx, cy), side, other_than)) == brute(
+                index, lambda p: p == (cx, cy), side, other_than
+            )
+            assert set(index.in_radius((cx, cy), radius, side, other_than)) == brute(
+                index,
+                lambda p: (p[0] - cx) ** 2 + (p[1] - cy) ** 2 <= radius * radius,
+                side,
+                other_than,
+            )
+            assert set(
+                index.in_rect(cx - 4, cy - 2, cx + 3, cy + 5, side, other_than)
+            ) == brute(
+                index,
+                lambda p: cx - 4 <= p[0] <= cx + 3 and cy - 2 <= p[1] <= cy + 5,
+                side,
+                other_than,
+            )
+            assert set(
+                index.adjacent((cx, cy), True, side, other_than)
+            ) == brute(
+                index,
+                lambda p: max(abs(p[0] - cx), abs(p[1] - cy)) == 1,
+                side,
+                other_than,
+            )
+    assert len(index) == len(index.positions)
+
+
+def test_units_on_a_tile_keep_their_arrival_order():
+    index = UnitIndex(SIZE)
+    first, second, third = Marker("A"), Marker("B"), Marker("A")
+    for unit in (first, second, third):
+        index.move(unit, (3, 3))
+    assert index.at((3, 3)) == [first, second, third]
+    index.move(second, (3, 4))
+    index.move(second, (3, 3))
+    assert index.at((3, 3)) == [first, third, second]
+    assert index.at((3, 3), other_than="A") == [second]
+    index.remove(first)
+    index.remove(third)
+    index.remove(second)
+    assert not list(index.occupied())
@@ -2,36 +2,95 @@ from typing import Tuple, Optional, List, TYPE_CHECKING
 import random
 
 if TYPE_CHECKING:
+    from game_map import GameMap
     from unit import Unit
 
 
+class LayerAttribute:
+    # tile attribute stored in one of the map's terrain layers; edits to the
+    # layers pathfinding reads are reported to the map so it can bump its
+    # terrain version, edits to resource layers so it can reindex the tile
+
+    def __init__(self, layer: str, terrain: bool = False, resource: bool = False):
+        self.layer = layer
+        self.terrain = terrain
+        self.resource = resource
+
+    def __get__(self, tile, owner=None):
+        if tile is None:
+            return self
+        return getattr(tile.map.terrain, self.layer)[tile.index]
+
+    def __set__(self, tile, value):
+        layer = getattr(tile.map.terrain, self.layer)
+        if layer[tile.index] == value:
+            return
+        layer[tile.index] = value
+        if self.terrain:
+            tile.map.on_tile_changed(tile)
+        if self.resource:
+            tile.map.on_resources_changed(tile)
+
+
+class WaterAttribute(LayerAttribute):
+    def __get__(self, tile, owner=None):
+        if tile is None:
+            return self
+        return bool(tile.map.terrain.water[tile.index])
+
+    def __set__(self, tile, value):
+        super().__set__(tile, 1 if value else 0)
+
+
 class Tile:
-    def __init__(self, position, data=None):
+    """
+    View of one cell of the map's terrain layers. Tiles hold no state of
+    their own and are created on demand by ``GameMap.get_tile``.
+    """
+
+    __slots__ = ("map", "position", "x", "y", "index")
+
+    elevation = LayerAttribute("elevation", terrain=True)
+    maneuver_score = LayerAttribute("maneuver", terrain=True)
+    # 0 - 100 where 0 is exposed, 100 is completely concealed
+    concealment_score = LayerAttribute("concealment", terrain=True)
+    # 0 - 100 where 0 is no cover, 100 is full cover
+    cover_score = LayerAttribute("cover", terrain=True)
+    isWater = WaterAttribute("water", terrain=True)
+
+    fuel = LayerAttribute("fuel", resource=True)
+    manpower = LayerAttribute("manpower", resource=True)
+    resources = LayerAttribute("resources", resource=True)
+
+    def __init__(self, game_map: "GameMap", position: Tuple[int, int]):
+        self.map = game_map
         self.position = position
         self.x = position[0]
         self.y = position[1]
-        self.data = data
-
-        self.occupation: Tuple[Optional[str], Optional[str]] = (None, None)
-        self.units: List["Unit"] = []
-
-        self.maneuver_score = -1
-        # self.create_test_score()
-        # 0 - 100 where 0 is exposed, 100 is completely concealed
-        self.concealment_score = 0
-        # 0 - 100 where 0 is no cover, 100 is full cover
-        self.cover_score = 0
-
-        self.elevation = 0
-
-        self.fuel = 0
-        self.manpower = 0
-        self.resources = 0
-        self.isWater = False
-        # self.make_test_elevation()
-        # self.make_test_concealment()
-        # self.make_test_cover()
-        # self.make_test_resources()
+        self.index = game_map.terrain.index(position)
+
+    def __eq__(self, other):
+        return (
+            isinstance(other, Tile)
+            and self.map is other.map
+            and self.index == other.index
+        )
+
+    def __hash__(self):
+        return hash(self.position)
+
+    @property
+    def occupation(self) -> Tuple[Optional[str], Optional[str]]:
+        return self.map.terrain.occupation_of(self.index)
+
+    @occupation.setter
+    def occupation(self, value: Tuple[Optional[str], Optional[str]]):
+        self.map.set_occupation(self, value)
+
+    @property
+    def units(self) -> List["Unit"]:
+        # read-only, units are placed with GameMap.move_unit
+        return self.map.unit_index.at(self.position)
 
     def calculate_tile_values(self):
         # Placeholder for tile value calculation logic
@@ -1,7 +1,9 @@
-from typing import TYPE_CHECKING, Optional, Dict, Tuple
+from typing import TYPE_CHECKING, Optional, Dict, List, Tuple
 
 if TYPE_CHECKING:
+    from a_star import ResumableAStar
     from game_map import GameMap
+    from incremental import DStarLite
     from region_logic import RegionControl
 
 unit_behavior_options = ["SAFE", "DEFENSIVE", "AGGRESSIVE", "STEALTHY"]
@@ -39,11 +41,16 @@ class Unit:
         self.vision_range = vision_range
 
         self.assigned_path = []
+        # kept while following a route when the map repairs routes in place
+        self.route_planner: Optional["DStarLite"] = None
+        # route still being searched when the map limits planning per tick
+        self.pending_route: Optional["ResumableAStar"] = None
         self.behavior = "SAFE"
         self.rules_of_engagement = "RETURN_FIRE"
         self.holding_defense = 0
         self.defense_position: Optional[Tuple[int, int]] = None
         self.side: Optional[str] = side  # "A" or "B"
+        game_map.move_unit(self, position)
 
     def assign_region(self, region_id: str):
         self.assigned_region = self.region_map[region_id]
@@ -53,11 +60,29 @@ class Unit:
             return []
 
         if not self.assigned_path:
-            self.assigned_path = self.game_map.find_path(
-                unit_weight=self.armor_rating,
-                start=self.position,
-                goal=position,
-            )
+            if self.game_map.budgeted_planning:
+                if self.pending_route is None or self.pending_route.goal != position:
+                    self.pending_route = self.game_map.resumable_planner(
+                        start=self.position,
+                        goal=position,
+                        unit_weight=self.armor_rating,
+                    )
+                # searching is left to act() so each tick spends one budget
+                if self.pending_route.done:
+                    self.continue_planning()
+            elif self.game_map.incremental_routes:
+                self.route_planner = self.game_map.incremental_planner(
+                    start=self.position,
+                    goal=position,
+                    unit_weight=self.armor_rating,
+                )
+                self.assigned_path = self.route_planner.find_path()
+            else:
+                self.assigned_path = self.game_map.find_path(
+                    unit_weight=self.armor_rating,
+                    start=self.position,
+                    goal=position,
+                )
 
         if not self.assigned_path:
             return []
@@ -67,54 +92,79 @@ class Unit:
 
         return self.assigned_path
 
+    def continue_planning(self):
+        if self.pending_route is None:
+            return
+        if self.game_map.advance_planner(self.pending_route):
+            self.assigned_path = self.pending_route.path
+            self.pending_route = None
+            if self.assigned_path and self.assigned_path[0] == self.position:
+                self.assigned_path.pop(0)
+
     def get_visible_tiles(self):
         return self.game_map.get_visible_tiles(
             self.position, self.direction, self.vision_cone, self.vision_range
         )
 
     def act(self):
+        if self.pending_route is not None:
+            self.continue_planning()
         if self.assigned_path:
             self.move()
         else:
             self.hold()
 
     def get_visible_units(self, visible_tiles=None):
+        # side -> list of every unit of that side standing on a visible tile,
+        # this unit included; a side with no visible unit has no entry
         if visible_tiles is None:
             visible_tiles = self.get_visible_tiles()
-        visible_units = {}
-        for tile_pos in visible_tiles:
-            tile = self.game_map.get_tile(tile_pos)
-            if units := tile.units:
-                for unit in units:
-                    visible_units[unit.side] = unit
+        visible_units: Dict[str, List["Unit"]] = {}
+        if not visible_tiles:
+            return visible_units
+        # visible tiles never lie outside the square of side 2 * vision_range
+        x, y = self.position
+        reach = self.vision_range
+        index = self.game_map.unit_index
+        for unit in index.in_rect(x - reach, y - reach, x + reach, y + reach):
+            if index.positions[unit] in visible_tiles:
+                visible_units.setdefault(unit.side, []).append(unit)
         return visible_units
 
     def handle_contact(self):
         # Placeholder for contact handling logic
         # handle contact that's next to us first
         nearby_units = []
-        nearby_tiles = self.game_map.get_adjacent(self.position)
-        for tile in nearby_tiles:
-            if units := tile.units:
-                for unit in units:
-                    if unit.side != self.side:
-                        nearby_units.append(unit)
+        for position in self.game_map.neighbors(self.position):
+            nearby_units.extend(
+                self.game_map.unit_index.at(position, other_than=self.side)
+            )
 
         ...  # handle contact that's next to us
 
-        # handle contact that's not nearby
-        visible_units = self.get_visible_units()
-        for friendly_unit in visible_units.get(self.side, []):
-            if friendly_unit != self:
-                # check if enemies are near friendly unit
-                ...
+        # handle contact that's not nearby: enemies any unit of our side
+        # sees, read off the map's fog of war
+        for enemy in self.game_map.visible_enemies(self.side):
+            # check if friendly units are near the enemy
+            ...
         pass
 
     def move(self):
+        if self.route_planner is not None and self.route_planner.dirty:
+            # terrain changed under the route, repair it before stepping
+            self.assigned_path = self.route_planner.find_path()
+            if self.assigned_path and self.assigned_path[0] == self.position:
+                self.assigned_path.pop(0)
+
         if not self.assigned_path:
+            self.route_planner = None
             return self.hold()
 
         new_position = self.assigned_path.pop(0)
+        if self.route_planner is not None:
+            self.route_planner.move_to(new_position)
+            if not self.assigned_path:
+                self.route_planner = None
 
         self.current_tasking = "MOVE"
         vector = [
@@ -148,13 +198,10 @@ class Unit:
             case [-1, 1]:
                 self.direction = 135
 
-        tile_moving_off_of = self.game_map.get_tile(self.position)
-        if self in tile_moving_off_of.units:
-            tile_moving_off_of.units.remove(self)
+        self.game_map.move_unit(self, new_position)
         self.position = new_position
 
         new_tile = self.game_map.get_tile(self.position)
-        new_tile.units.append(self)
         if new_tile.occupation[0] != self.side:
             # if tile is occupied by enemy, we need to let enemy know that it's taken
             if prev_occupier := self.region_map.get(new_tile.occupation[1] or ""):
@@ -163,7 +210,11 @@ class Unit:
 
     def hold(self):
         self.current_tasking = "HOLD"
-        self.direction = -1
+        self.game_map.turn_unit(self, -1)
 
     def is_idle(self):
-        return self.current_tasking == "HOLD" and self.holding_defense < 1
+        return (
+            self.current_tasking == "HOLD"
+            and self.holding_defense < 1
+            and self.pending_route is None
+        )
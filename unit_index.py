@@ -0,0 +1,150 @@
+from typing import Dict, Iterable, List, Optional, Tuple, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from unit import Unit
+
+Position = Tuple[int, int]
+BucketKey = Tuple[int, int]
+
+
+class UnitIndex:
+    """
+    Spatial hash of unit positions. Every unit is filed under its tile, for
+    exact lookups, and under the ``bucket_size`` square bucket containing
+    it, for area queries. Both are insertion-ordered dicts used as sets, so
+    moving a unit is O(1) and area queries only visit the buckets they
+    overlap.
+
+    Queries can be narrowed to one ``side`` or to every side but
+    ``other_than``.
+    """
+
+    def __init__(self, size: int, bucket_size: int = 8):
+        self.size = size
+        self.bucket_size = bucket_size
+        self.positions: Dict["Unit", Position] = {}
+        self._tiles: Dict[Position, Dict["Unit", None]] = {}
+        self._buckets: Dict[BucketKey, Dict["Unit", None]] = {}
+
+    def __len__(self):
+        return len(self.positions)
+
+    def __contains__(self, unit: "Unit"):
+        return unit in self.positions
+
+    def _bucket(self, position: Position) -> BucketKey:
+        return position[0] // self.bucket_size, position[1] // self.bucket_size
+
+    def move(self, unit: "Unit", position: Position):
+        # also adds units that are not indexed yet
+        old = self.positions.get(unit)
+        if old == position:
+            return
+        if old is not None:
+            self._discard(unit, old)
+        self.positions[unit] = position
+        self._tiles.setdefault(position, {})[unit] = None
+        self._buckets.setdefault(self._bucket(position), {})[unit] = None
+
+    def remove(self, unit: "Unit"):
+        old = self.positions.pop(unit, None)
+        if old is not None:
+            self._discard(unit, old)
+
+    def _discard(self, unit: "Unit", position: Position):
+        for table, key in (
+            (self._tiles, position),
+            (self._buckets, self._bucket(position)),
+        ):
+            units = table[key]
+            del units[unit]
+            if not units:
+                del table[key]
+
+    @staticmethod
+    def _filter(
+        units: Iterable["Unit"], side: Optional[str], other_than: Optional[str]
+    ) -> List["Unit"]:
+        if side is None and other_than is None:
+            return list(units)
+        return [
+            unit
+            for unit in units
+            if (side is None or unit.side == side)
+            and (other_than is None or unit.side != other_than)
+        ]
+
+    def at(
+        self,
+        position: Position,
+        side: Optional[str] = None,
+        other_than: Optional[str] = None,
+    ) -> List["Unit"]:
+        units = self._tiles.get(position)
+        if not units:
+            return []
+        return self._filter(units, side, other_than)
+
+    def occupied(self) -> Iterable[Position]:
+        return self._tiles.keys()
+
+    def in_rect(
+        self,
+        x0: int,
+        y0: int,
+        x1: int,
+        y1: int,
+        side: Optional[str] = None,
+        other_than: Optional[str] = None,
+    ) -> List["Unit"]:
+        # inclusive bounds
+        found = []
+        positions = self.positions
+        bx0, by0 = self._bucket((x0, y0))
+        bx1, by1 = self._bucket((x1, y1))
+        for bx in range(bx0, bx1 + 1):
+            for by in range(by0, by1 + 1):
+                for unit in self._buckets.get((bx, by), ()):
+                    x, y = positions[unit]
+                    if x0 <= x <= x1 and y0 <= y <= y1:
+                        found.append(unit)
+        return self._filter(found, side, other_than)
+
+    def in_radius(
+        self,
+        center: Position,
+        radius: float,
+        side: Optional[str] = None,
+        other_than: Optional[str] = None,
+    ) -> List["Unit"]:
+        cx, cy = center
+        reach = int(radius)
+        limit = radius * radius
+        positions = self.positions
+        return [
+            unit
+            for unit in self.in_rect(
+                cx - reach, cy - reach, cx + reach, cy + reach, side, other_than
+            )
+            if (positions[unit][0] - cx) ** 2 + (positions[unit][1] - cy) ** 2
+            <= limit
+        ]
+
+    def adjacent(
+        self,
+        position: Position,
+        diagonal: bool = True,
+        side: Optional[str] = None,
+        other_than: Optional[str] = None,
+    ) -> List["Unit"]:
+        # units on the tiles around ``position``, not on it
+        x, y = position
+        found: List["Unit"] = []
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                if (dx, dy) == (0, 0) or (not diagonal and dx and dy):
+                    continue
+                units = self._tiles.get((x + dx, y + dy))
+                if units:
+                    found.extend(units)
+        return self._filter(found, side, other_than)